@@ -10,9 +10,9 @@ import platform
 import tkinter as tk
 from tkinter import messagebox, ttk
 import pandas as pd
-import sqlite3
 
 from Apps.book_browser import BookBrowser
+from Apps.book_data import BookData, get_db
 from Gemini.file_utils import DB_PATH, sanitize_path
 
 # Logger Setup (Nutzt den Ordner der DB)
@@ -27,6 +27,7 @@ class LibraryAnalyzer:
     def __init__(self, master):
         self.master = master
         self.db_path = DB_PATH
+        self.db = get_db(self.db_path)
         self.master.title("Library Analyzer - Statistik & Analyse")
         self.master.geometry("1200x850")
 
@@ -53,7 +54,7 @@ class LibraryAnalyzer:
 
     def load_data(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.db.connection()
             query = """
                     SELECT b.*, a.firstname, a.lastname
                     FROM books b
@@ -61,7 +62,6 @@ class LibraryAnalyzer:
                              LEFT JOIN authors a ON ba.author_id = a.id
                     """
             df = pd.read_sql_query(query, conn)
-            conn.close()
             df['full_author'] = (df['firstname'].fillna('') + ' ' + df['lastname'].fillna('Unbekannt')).str.strip()
             # Pfade normalisieren (wichtig für Mismatch-Suche)
             df['path'] = df['path'].apply(lambda x: sanitize_path(x) if x else "")
@@ -190,10 +190,8 @@ class LibraryAnalyzer:
             # ggf. eine separate Abfrage machen oder die Liste abgleichen.
             # Einfacher Ansatz über SQL (da df nur verknüpfte Daten enthält):
             try:
-                conn = sqlite3.connect(self.db_path)
                 query = "SELECT id, firstname, lastname FROM authors WHERE id NOT IN (SELECT author_id FROM book_authors)"
-                result = pd.read_sql_query(query, conn)
-                conn.close()
+                result = pd.read_sql_query(query, self.db.connection())
                 result['full_author'] = (
                             result['firstname'].fillna('') + ' ' + result['lastname'].fillna('')).str.strip()
                 final_code = "SQL: SELECT * FROM authors WHERE id NOT IN (SELECT author_id FROM book_authors)"
@@ -220,7 +218,7 @@ class LibraryAnalyzer:
         elif self.current_view == "top_series":
             # Wir nutzen SQL für die Top 30 Serien mit Nummern-Check
             try:
-                conn = sqlite3.connect(self.db_path)
+                conn = self.db.connection()
                 # GROUP_CONCAT hilft uns, die vorhandenen Nummern direkt zu sehen
                 query = """
                             SELECT series_name, COUNT(id) as Menge, 
@@ -233,7 +231,6 @@ class LibraryAnalyzer:
 
                 query += " GROUP BY series_name, language ORDER BY Menge DESC LIMIT 30"
                 result = pd.read_sql_query(query, conn)
-                conn.close()
                 final_code = "SQL: GROUP BY series_name ORDER BY count DESC"
             except Exception as e:
                 logger.error(f"Serien-Fehler: {e}")
@@ -414,24 +411,19 @@ class LibraryAnalyzer:
             return
 
         try:
-            # Verbindung manuell öffnen
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # SQLite mitteilen, dass wir Foreign Keys berücksichtigen (sicher ist sicher)
-            cursor.execute("PRAGMA foreign_keys = ON;")
             # Wir bauen einen String für die SQL-Abfrage: (?, ?, ?)
             placeholders = ','.join(['?'] * len(ids))
 
-            # 1. SCHRITT: Zuerst die Einträge in der Link-Tabelle löschen
-            # (Die "Kinder" in der Buch-Autor-Verknüpfung)
-            cursor.execute(f"DELETE FROM book_authors WHERE book_id IN ({placeholders})", ids)
-            logger.debug(f"Links für IDs {ids} aus book_authors entfernt.")
-            # 2. SCHRITT: Jetzt die eigentlichen Bücher löschen
-            cursor.execute(f"DELETE FROM books WHERE id IN ({placeholders})", ids)
-            logger.debug(f"Bücher mit IDs {ids} aus books entfernt.")
-            # 3. SCHRITT: Die Änderungen festschreiben und Verbindung ZU
-            conn.commit()
-            conn.close()
+            # Eine Transaktion über die gemeinsame Verbindung (COMMIT am Ende, ROLLBACK bei Fehler)
+            with self.db.transaction() as conn:
+                cursor = conn.cursor()
+                # 1. SCHRITT: Zuerst die Einträge in den Link-Tabellen löschen
+                # (Die "Kinder": Buch-Autor-Verknüpfung und API-Jobs)
+                BookData.delete_dependents(conn, ids)
+                logger.debug(f"Links für IDs {ids} aus book_authors/enrichment_jobs entfernt.")
+                # 2. SCHRITT: Jetzt die eigentlichen Bücher löschen
+                cursor.execute(f"DELETE FROM books WHERE id IN ({placeholders})", ids)
+                logger.debug(f"Bücher mit IDs {ids} aus books entfernt.")
 
             # 4. SCHRITT: Daten im Programm neu laden
             # Wir holen uns den Stand FRISCH von der Platte, nicht nur aus dem Speicher
@@ -490,7 +482,7 @@ class LibraryAnalyzer:
             params.append(lang)
 
         query += " GROUP BY series_name, language ORDER BY COUNT(id) DESC LIMIT 30"
-        return self.db.execute_query(query, params)
+        return self.db.connection().execute(query, params).fetchall()
 
 
 if __name__ == "__main__":
@@ -160,7 +160,7 @@ class BookBrowser:
             )
 
             # COVER ANZEIGEN (Nutzt jetzt den geheilten self.current_file_path)
-            self.view.display_cover(getattr(book_obj, 'cover_path', None), self.current_file_path)
+            self.view.display_cover(getattr(book_obj, 'image_path', None), self.current_file_path)
 
     # ----------------------------------------------------------------------
     # 3. Laden des Reports
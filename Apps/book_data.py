@@ -5,16 +5,297 @@ BESCHREIBUNG: Book_Data     rDas Herzstück.	Kennt das DB-Schema, verwaltet die
               Book_Scanner	Neue Dateien finden & Metadaten extrahieren.	Erstellt BookData-Objekte und ruft .save() auf.
               Book_Browser	GUI für Anzeige und manuelle Korrektur.	Ruft .load_by_path() auf und modifiziert Attribute.
               BookCleaner	Statistiken, Dubletten-Check, KI-Auswertung.	Liest BookData-Listen für Berechnungen
+              ConnectionManager	Prozessweite DB-Verbindungen (eine pro Thread) statt connect() bei jedem Aufruf, WAL-Modus.
 """
 
+import atexit
+import re
 import sqlite3
+import threading
+import time
+import tracemalloc
 import unicodedata
-from dataclasses import dataclass, asdict, is_dataclass, field
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from dataclasses import dataclass, asdict, is_dataclass, field, fields
 from typing import Any
 
-from Gemini.file_utils import DB_PATH
+from Gemini.file_utils import DB_PATH, file_fingerprint
+
+
+# ----------------------------------------------------------------------
+# VERBINDUNGS-MANAGER
+# ----------------------------------------------------------------------
+class ConnectionManager:
+    """
+    Verwaltet die SQLite-Verbindungen zu einer DB-Datei.
+    Jeder Thread bekommt genau eine Verbindung, die offen bleibt und wiederverwendet wird.
+    So fallen beim Scan von 100k Dateien nicht mehrere connect()/close() pro Buch an.
+    """
+    # Standard-Pragmas, die auf jede neue Verbindung angewendet werden
+    DEFAULT_PRAGMAS = {
+        'journal_mode': 'WAL',     # Leser (Browser, Analyzer) und Schreiber (Scanner) blockieren sich nicht
+        'synchronous': 'NORMAL',   # mit WAL sicher gegen Absturz, fsync nur beim Checkpoint
+        'busy_timeout': 5000,      # ms warten statt sofort "database is locked"
+        'wal_autocheckpoint': 1000,  # Pages, danach überträgt SQLite das WAL selbst
+        'cache_size': -16000,      # ca. 16 MB Page-Cache
+        'temp_store': 'MEMORY',
+    }
+    CACHED_STATEMENTS = 256        # Prepared Statements pro Verbindung
+    CHECKPOINT_EVERY = 100         # Commits, danach ein PASSIVE-Checkpoint (hält die -wal Datei klein)
+    BUSY_RETRIES = 3               # weitere Versuche für BEGIN, wenn busy_timeout abgelaufen ist
+
+    def __init__(self, db_path, pragmas=None):
+        self.db_path = db_path
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections = []
+        self._commits = 0
+
+    def connection(self) -> sqlite3.Connection:
+        """Gibt die Verbindung des aktuellen Threads zurück (wird beim ersten Zugriff erstellt)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=self.CACHED_STATEMENTS,
+                                   check_same_thread=False)
+            self._apply_pragmas(conn, self.pragmas)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.cache = {}
+            with self._lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def connection_cache(self) -> dict:
+        """Ablage für Dinge, die genau so lange gelten wie die Verbindung (z.B. das Tabellen-Schema)."""
+        self.connection()
+        return self._local.cache
+
+    def set_pragmas(self, **pragmas):
+        """Ändert Pragmas für alle künftigen und die bereits offene Verbindung dieses Threads."""
+        self.pragmas.update(pragmas)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._apply_pragmas(conn, pragmas)
 
-@dataclass
+    @staticmethod
+    def _apply_pragmas(conn, pragmas):
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Explizite Transaktion: COMMIT am Ende, ROLLBACK bei Exception.
+        Verschachtelte Aufrufe (z.B. save() innerhalb von save_many()) laufen als SAVEPOINT,
+        damit ein Fehler nur den inneren Teil zurückrollt und nicht vorzeitig committet wird.
+        immediate=True holt sich die Schreibsperre sofort (BEGIN IMMEDIATE).
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            if conn.in_transaction:
+                conn.commit()  # Reste aus impliziten Transaktionen abschließen
+            self._begin(conn, "BEGIN IMMEDIATE" if immediate else "BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if depth == 0:
+                conn.commit()
+                self._after_commit()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        finally:
+            self._local.depth = depth
+
+    def _begin(self, conn, statement):
+        """BEGIN mit Wiederholung: hält ein anderer Prozess die Schreibsperre länger als busy_timeout."""
+        for attempt in range(self.BUSY_RETRIES + 1):
+            try:
+                conn.execute(statement)
+                return
+            except sqlite3.OperationalError as e:
+                busy = 'locked' in str(e) or 'busy' in str(e)
+                if not busy or attempt == self.BUSY_RETRIES:
+                    raise
+                print(f"⏳ DB gesperrt, neuer Versuch {attempt + 1}/{self.BUSY_RETRIES} ...")
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _after_commit(self):
+        """Zählt Commits und stößt regelmäßig einen Checkpoint an (auch wenn Leser das Autocheckpoint bremsen)."""
+        with self._lock:
+            self._commits += 1
+            due = self._commits % self.CHECKPOINT_EVERY == 0
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self, mode='PASSIVE'):
+        """
+        Überträgt das WAL in die DB-Datei. PASSIVE wartet auf niemanden (Leser behalten ihren Stand),
+        TRUNCATE setzt zusätzlich die -wal Datei zurück (z.B. am Ende eines Scans).
+        Gibt (busy, wal_pages, übertragene_pages) zurück oder None, wenn gerade eine Transaktion offen ist.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            return None
+        try:
+            return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Checkpoint ({mode}) fehlgeschlagen: {e}")
+            return None
+
+    def close(self):
+        """Schließt die Verbindung des aktuellen Threads."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with self._lock:
+                if conn in self._all_connections:
+                    self._all_connections.remove(conn)
+            conn.close()
+            self._local.conn = None
+            self._local.cache = {}
+
+    def close_all(self):
+        """Schließt alle Verbindungen aller Threads (z.B. beim Programmende)."""
+        with self._lock:
+            connections, self._all_connections = self._all_connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_db(db_path=DB_PATH) -> ConnectionManager:
+    """Liefert den prozessweiten ConnectionManager für eine DB-Datei."""
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[db_path] = manager
+        return manager
+
+
+@atexit.register
+def close_all_connections():
+    for manager in list(_managers.values()):
+        manager.close_all()
+
+
+# ----------------------------------------------------------------------
+# SCHEMA DER BOOKS-TABELLE
+# ----------------------------------------------------------------------
+class BookSchema:
+    """
+    Liest das Schema der books-Tabelle einmal pro Verbindung (PRAGMA table_info)
+    und hält Spaltenliste und fertige SQL-Statements für save/save_many bereit.
+    """
+    # Felder der Klasse, die bewusst nicht in der books-Tabelle stehen
+    IGNORED = {'authors', 'image_path', 'extension', 'categories', 'series_source'}
+    # Felder, die als Set/Liste im Objekt und als Komma-String in der DB stehen
+    SET_FIELDS = {'keywords', 'regions'}
+
+    def __init__(self, conn, field_names):
+        self.schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        db_cols = [row[1] for row in conn.execute("PRAGMA table_info(books)").fetchall()]
+
+        # Struktur-Check & Alarm: läuft jetzt einmal beim Start statt bei jedem save()
+        self.missing = [f for f in field_names if f not in db_cols and f not in self.IGNORED]
+        if self.missing:
+            print(f"⚠️  ALARM: Spalten fehlen in DB: {self.missing}")
+
+        # Nur Felder, die es in DB UND Klasse gibt (ohne id)
+        self.columns = tuple(c for c in db_cols if c in field_names and c != 'id')
+        col_list = ", ".join(self.columns)
+        self.insert_sql = f"INSERT INTO books ({col_list}) VALUES ({', '.join(['?'] * len(self.columns))})"
+        self.insert_with_id_sql = (f"INSERT INTO books ({col_list}, id) "
+                                   f"VALUES ({', '.join(['?'] * (len(self.columns) + 1))})")
+        self.update_sql = f"UPDATE books SET {', '.join([f'{c} = ?' for c in self.columns])} WHERE id = ?"
+
+    @classmethod
+    def get(cls, db, book_cls, check_version=False):
+        """
+        Liefert das (gecachte) Schema für die Verbindung des aktuellen Threads.
+        check_version=True vergleicht zusätzlich PRAGMA schema_version (z.B. einmal pro save_many),
+        damit ein ALTER TABLE aus einem anderen Prozess bemerkt wird.
+        """
+        cache = db.connection_cache()
+        schema = cache.get('books')
+        if schema is not None and check_version:
+            current = db.connection().execute("PRAGMA schema_version").fetchone()[0]
+            if current != schema.schema_version:
+                schema = None
+        if schema is None:
+            schema = cls(db.connection(), [f.name for f in fields(book_cls)])
+            cache['books'] = schema
+        return schema
+
+    @staticmethod
+    def invalidate(db):
+        """Nach einer Schema-Änderung (ALTER TABLE) neu einlesen lassen."""
+        db.connection_cache().pop('books', None)
+
+    def values(self, book) -> tuple:
+        """Parameter-Tupel in Spaltenreihenfolge – ohne die tiefe Kopie von asdict()."""
+        values = []
+        for col in self.columns:
+            val = getattr(book, col)
+            if col in self.SET_FIELDS:
+                # Wir sortieren für eine saubere Optik in der DB
+                if isinstance(val, (set, list)):
+                    val = ", ".join(sorted(val))
+                elif val is None:
+                    val = ""
+            elif col == 'path' and not val:
+                # Fehlende Dateien als NULL speichern: books.path hat einen UNIQUE-Index (create_db Migration 1)
+                val = None
+            values.append(val)
+        return tuple(values)
+
+
+# ----------------------------------------------------------------------
+# LEICHTE ZEILEN-ANSICHT (für Massen-Durchläufe)
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=64)
+def book_row_type(columns: tuple):
+    """
+    namedtuple-Klasse BookRow für eine Spaltenauswahl (z.B. ('id', 'path')), pro Spaltensatz nur einmal erzeugt.
+    BookRow ist nur lesbar: keine Autoren, keine Sets, keywords bleibt der DB-String.
+    """
+    return namedtuple('BookRow', columns)
+
+
+def _row_view(cursor, skip=0):
+    """Liefert die passende BookRow-Fabrik für das aktuelle Ergebnis eines Cursors."""
+    columns = tuple(d[0] for d in cursor.description[skip:])
+    return book_row_type(columns)._make
+
+
+# Kompakter Scan-Stand eines Buchs (BookData.get_scan_state): reicht für die Entscheidung "scannen oder nicht"
+ScanState = namedtuple('ScanState', ['id', 'scanner_version', 'is_complete', 'fingerprint'])
+
+
+@dataclass(slots=True)
 class BookData:
     db_path = DB_PATH
     id: int = 0
@@ -44,6 +325,14 @@ class BookData:
     is_complete: int = 0
     scanner_version: str = "1.2.0"
     extension: str = ".epub"
+    # Nur während des Scans: API-Kategorien für die Genre-Klassifizierung (wird nicht gespeichert)
+    categories: list = field(default_factory=list)
+    # Nur während des Scans: Serie stammt aus Calibre-/EPUB3-Metadaten ('calibre', 'epub3'), wird nicht gespeichert
+    series_source: str = ""
+    # Fingerabdruck der Datei beim letzten Scan (create_db Migration 4)
+    file_size: int = 0
+    file_mtime_ns: int = 0
+    file_inode: int = 0
 
     @staticmethod
     def normalize_path(p: str) -> str:
@@ -55,56 +344,149 @@ class BookData:
     @classmethod
     def load_by_path(cls, file_path):
         clean_path = cls.normalize_path(file_path)
-        conn = sqlite3.connect(cls.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        cursor = get_db(cls.db_path).connection().cursor()
+        cursor.row_factory = sqlite3.Row
 
         cursor.execute("SELECT * FROM books WHERE path = ?", (clean_path,))
         row = cursor.fetchone()
 
         if not row:
-            conn.close()
             return None
+        # Gleicher Weg wie bei search/search_sql: Buch-Zeile + Autoren in einem Rutsch
+        return cls._hydrate([row])[0]
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Erzeugt ein BookData-Objekt aus einem Dictionary."""
+        # Wir filtern nur die Felder heraus, die die Klasse auch wirklich hat
+        from dataclasses import fields
+        valid_fields = {f.name for f in fields(cls)}
+        filtered_data = {k: v for k, v in data.items() if k in valid_fields}
+        return cls(**filtered_data)
 
-        # 1. Row in Dict wandeln
-        data = dict(row)
-        # 2. Autoren separat holen
-        cursor.execute("""
-            SELECT a.firstname, a.lastname FROM authors a
-            JOIN book_authors ba ON a.id = ba.author_id
-            WHERE ba.book_id = ?""", (data['id'],))
-        authors_list = [(r[0], r[1]) for r in cursor.fetchall()]
-        conn.close()
-        # 2. AUTOMATISCHES FILTERN
+    @classmethod
+    def _from_row(cls, data: dict, authors=None):
+        """Baut ein BookData-Objekt aus einer DB-Zeile (als Dict) und der Autorenliste."""
+        # AUTOMATISCHES FILTERN
         # Wir nehmen nur Daten aus der DB, die auch als Variable in deiner Klasse stehen
         # cls.__annotations__ enthält alle Felder wie 'title', 'genre', etc.
         allowed_keys = cls.__annotations__.keys()
         clean_data = {k: v for k, v in data.items() if k in allowed_keys}
-        # 3. Datentyp-Korrektur: Keywords (String aus DB -> Liste für Objekt)
+        if 'path' in clean_data and clean_data['path'] is None:
+            clean_data['path'] = ""
+        # Datentyp-Korrektur: Keywords (String aus DB -> Set für Objekt)
         if 'keywords' in clean_data and isinstance(clean_data['keywords'], str):
             kw_string = clean_data['keywords'].strip()
-            if kw_string:
-                # Wir machen direkt ein SET daraus
-                clean_data['keywords'] = {k.strip() for k in kw_string.split(',')}
-            else:
-                clean_data['keywords'] = set()
-        # 4. Autoren manuell dazu, da sie in der DB ja aus einer anderen Tabelle kommen
-        clean_data['authors'] = authors_list
+            clean_data['keywords'] = {k.strip() for k in kw_string.split(',')} if kw_string else set()
+        # Autoren manuell dazu, da sie in der DB ja aus einer anderen Tabelle kommen
+        if authors is not None:
+            clean_data['authors'] = authors
         return cls(**clean_data)
 
     @classmethod
-    def from_dict(cls, data: dict):
-        """Erzeugt ein BookData-Objekt aus einem Dictionary."""
-        # Wir filtern nur die Felder heraus, die die Klasse auch wirklich hat
-        from dataclasses import fields
-        valid_fields = {f.name for f in fields(cls)}
-        filtered_data = {k: v for k, v in data.items() if k in valid_fields}
-        return cls(**filtered_data)
+    def _load_authors_for(cls, book_ids) -> dict:
+        """
+        Lädt die Autoren für viele Bücher mit EINER Abfrage und gruppiert sie in Python.
+        Bis 900 IDs per IN-Liste (SQLite-Parameterlimit), darüber über eine TEMP-Tabelle mit JOIN.
+        Gibt {book_id: [(vorname, nachname), ...]} zurück (Reihenfolge wie beim Speichern).
+        """
+        ids = list(dict.fromkeys(i for i in book_ids if i))
+        authors_by_book = {}
+        if not ids:
+            return authors_by_book
+
+        db = get_db(cls.db_path)
+        select = """
+            SELECT ba.book_id, a.firstname, a.lastname
+            FROM book_authors ba JOIN authors a ON a.id = ba.author_id
+        """
+        if len(ids) <= 900:
+            placeholders = ",".join(["?"] * len(ids))
+            rows = db.connection().execute(
+                f"{select} WHERE ba.book_id IN ({placeholders}) ORDER BY ba.rowid", ids).fetchall()
+        else:
+            with db.transaction() as conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS hydrate_ids (id INTEGER PRIMARY KEY)")
+                conn.execute("DELETE FROM temp.hydrate_ids")
+                conn.executemany("INSERT INTO temp.hydrate_ids (id) VALUES (?)", ((i,) for i in ids))
+                rows = conn.execute(
+                    f"{select} JOIN temp.hydrate_ids t ON t.id = ba.book_id ORDER BY ba.rowid").fetchall()
+                conn.execute("DELETE FROM temp.hydrate_ids")
+
+        for book_id, firstname, lastname in rows:
+            authors_by_book.setdefault(book_id, []).append((firstname, lastname))
+        return authors_by_book
+
+    @classmethod
+    def _hydrate(cls, rows, with_authors=True):
+        """Wandelt Buch-Zeilen in BookData-Objekte um, Autoren kommen gebündelt dazu (2 statt N+1 Abfragen)."""
+        rows = [dict(row) for row in rows]
+        if not with_authors or not rows or 'id' not in rows[0]:
+            return [cls._from_row(data) for data in rows]
+        authors_by_book = cls._load_authors_for(data['id'] for data in rows)
+        return [cls._from_row(data, authors_by_book.get(data['id'], [])) for data in rows]
+
+    # Gewichte für bm25 in der Spaltenreihenfolge von books_fts (title, series_name, authors, keywords, description)
+    FTS_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0)
+
+    @classmethod
+    def _schema_check(cls, key, sql) -> bool:
+        """Prüft einmal pro Verbindung, ob ein optionaler Schema-Teil (aus create_db Migrationen) existiert."""
+        db = get_db(cls.db_path)
+        cache = db.connection_cache()
+        if key not in cache:
+            cache[key] = db.connection().execute(sql).fetchone() is not None
+        return cache[key]
+
+    @classmethod
+    def has_fulltext(cls) -> bool:
+        """FTS5-Index books_fts vorhanden? (create_db Migration 2)"""
+        return cls._schema_check(
+            'has_fts', "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")
+
+    @classmethod
+    def has_fingerprint_columns(cls) -> bool:
+        """Spalten für den Datei-Fingerabdruck vorhanden? (create_db Migration 4)"""
+        return cls._schema_check(
+            'has_fingerprint', "SELECT 1 FROM pragma_table_info('books') WHERE name = 'file_mtime_ns'")
+
+    @classmethod
+    def has_folder_column(cls) -> bool:
+        """Generierte Spalte books.folder vorhanden? (create_db Migration 3)"""
+        return cls._schema_check(
+            'has_folder', "SELECT 1 FROM pragma_table_xinfo('books') WHERE name = 'folder'")
+
+    @staticmethod
+    def _fts_terms(term: str) -> str:
+        """Macht aus einer Benutzereingabe eine FTS5-Prefix-Abfrage: 'rue para' -> '"rue"* "para"*'."""
+        words = re.findall(r'\w+', term or "")
+        return " ".join(f'"{w}"*' for w in words)
 
     @classmethod
     def search(cls, title_term="", author_term=""):
-        """Sucht Bücher und gibt eine Liste von BookData-Objekten zurück."""
-        conn = sqlite3.connect(DB_PATH)
+        """
+        Sucht Bücher und gibt eine Liste von BookData-Objekten zurück.
+        Mit Volltextindex: Titel-Begriff in Titel/Serie/Keywords/Beschreibung, Autor-Begriff in den Autoren,
+        Prefix-Suche und nach bm25 sortiert (Titel-Treffer zuerst). Sonst wie früher per LIKE.
+        """
+        title_match = cls._fts_terms(title_term)
+        author_match = cls._fts_terms(author_term)
+        if (title_match or author_match) and cls.has_fulltext():
+            parts = []
+            if title_match:
+                parts.append(f"{{title series_name keywords description}} : ({title_match})")
+            if author_match:
+                parts.append(f"authors : ({author_match})")
+            weights = ", ".join(str(w) for w in cls.FTS_WEIGHTS)
+            sql_query = f"""
+                    SELECT b.*
+                    FROM books_fts f
+                    JOIN books b ON b.id = f.rowid
+                    WHERE books_fts MATCH ?
+                    ORDER BY bm25(books_fts, {weights})
+                """
+            return cls.search_sql(sql_query, (" AND ".join(parts),))
+
         # SQL-Query (angepasst auf deine Struktur)
         sql_query = """
                 SELECT DISTINCT b.*
@@ -114,75 +496,128 @@ class BookData:
                 WHERE (?1 = '' OR b.title LIKE '%' || ?1 || '%')
                   AND (?2 = '' OR a.lastname LIKE '%' || ?2 || '%' OR a.firstname LIKE '%' || ?2 || '%')
             """
-        results = []
-        try:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(sql_query, (title_term, author_term))
-            rows = cursor.fetchall()
-
-            for row in rows:
-                # Wir nutzen deine vorhandene Logik: Dict aus Row erstellen
-                data = dict(row)
-                # Autoren für dieses Buch laden
-                cursor.execute("""
-                        SELECT a.firstname, a.lastname FROM authors a
-                        JOIN book_authors ba ON a.id = ba.author_id
-                        WHERE ba.book_id = ?""", (data['id'],))
-                data['authors'] = [(r[0], r[1]) for r in cursor.fetchall()]
-
-                # Wir nutzen from_dict oder den Constructor, um das Objekt zu bauen
-                # Zuerst filtern wir wieder die erlaubten Keys
-                allowed_keys = cls.__annotations__.keys()
-                clean_data = {k: v for k, v in data.items() if k in allowed_keys}
-
-                # Keywords Fix (String -> Liste), falls in DB als String
-                if 'keywords' in clean_data and isinstance(clean_data['keywords'], str):
-                    kw = clean_data['keywords'].strip()
-                    clean_data['keywords'] = [k.strip() for k in kw.split(',')] if kw else []
-                results.append(cls(**clean_data))
-
-        except sqlite3.Error as e:
-            print(f"Fehler bei Suche: {e}")
-        finally:
-            if conn:
-                conn.close()
-        return results
+        return cls.search_sql(sql_query, (title_term, author_term))
 
     @classmethod
-    def search_sql(cls, sql_query: str, params: tuple = ()):
+    def search_sql(cls, sql_query: str, params: tuple = (), with_authors=True):
         """
         Führt ein beliebiges SQL-Statement aus und gibt eine Liste
         von BookData-Objekten zurück.
+        Enthält das Ergebnis die Spalte 'id', werden die Autoren gebündelt nachgeladen
+        (with_authors=False spart das, wenn z.B. nur der Pfad gebraucht wird).
         """
-        conn = sqlite3.connect(cls.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        results = []
+        cursor = get_db(cls.db_path).connection().cursor()
+        cursor.row_factory = sqlite3.Row
         try:
             cursor.execute(sql_query, params)
-            rows = cursor.fetchall()
+            return cls._hydrate(cursor.fetchall(), with_authors=with_authors)
+        except sqlite3.Error as e:
+            print(f"Fehler bei search_sql: {e}")
+            return []
 
-            # Wir holen die erlaubten Felder der Klasse
-            allowed_keys = cls.__annotations__.keys()
+    @classmethod
+    def iter_sql(cls, sql_query: str, params: tuple = (), chunk_size: int = 1000, raw=False, with_authors=True,
+                 as_rows=False):
+        """
+        Generator-Variante von search_sql: holt die Zeilen per fetchmany in Blöcken
+        und baut die Objekte erst beim Durchlaufen (Speicher bleibt flach, auch bei 100k Büchern).
+        raw=True liefert die reinen Zeilen-Tupel (z.B. nur Pfad oder ID) ohne BookData-Objekte.
+        as_rows=True liefert BookRow-Ansichten (namedtuple, Zugriff per row.path) statt BookData.
+        """
+        cursor = get_db(cls.db_path).connection().cursor()
+        if not (raw or as_rows):
+            cursor.row_factory = sqlite3.Row
+        try:
+            cursor.execute(sql_query, params)
+            make_row = _row_view(cursor) if as_rows else None
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if raw:
+                    yield from rows
+                elif as_rows:
+                    yield from map(make_row, rows)
+                else:
+                    yield from cls._hydrate(rows, with_authors=with_authors)
+        except sqlite3.Error as e:
+            print(f"Fehler bei iter_sql: {e}")
+        finally:
+            cursor.close()
 
-            for row in rows:
-                data = dict(row)
-                # Nur die Felder nehmen, die im SQL-Ergebnis UND in der Klasse sind
-                clean_data = {k: v for k, v in data.items() if k in allowed_keys}
+    @classmethod
+    def iter_all(cls, columns: str = "*", chunk_size: int = 1000, raw=False, with_authors=True, as_rows=False,
+                 after_id: int = 0):
+        """
+        Läuft über alle Bücher, blockweise nach ID sortiert (WHERE id > letzte_id LIMIT n).
+        Jeder Block ist eine eigene kurze Abfrage – Schreiben/Löschen während des Durchlaufs
+        (wie im Deep Repair) stört die Iteration daher nicht.
+        as_rows=True liefert BookRow-Ansichten statt BookData (für Durchläufe, die nur lesen).
+        after_id: erst hinter dieser ID beginnen (Fortsetzen nach einem Abbruch).
+        """
+        db = get_db(cls.db_path)
+        sql = f"SELECT id AS page_id, {columns} FROM books WHERE id > ? ORDER BY id LIMIT ?"
+        last_id = after_id
+        while True:
+            cursor = db.connection().cursor()
+            if not (raw or as_rows):
+                cursor.row_factory = sqlite3.Row
+            rows = cursor.execute(sql, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            if raw:
+                # Die Hilfsspalte page_id wieder abschneiden
+                yield from (row[1:] for row in rows)
+            elif as_rows:
+                make_row = _row_view(cursor, skip=1)
+                yield from (make_row(row[1:]) for row in rows)
+            else:
+                yield from cls._hydrate(rows, with_authors=with_authors)
 
-                # Spezialfall Keywords (String -> Set)
-                if 'keywords' in clean_data and isinstance(clean_data['keywords'], str):
-                    kw = clean_data['keywords'].strip()
-                    clean_data['keywords'] = {k.strip() for k in kw.split(',')} if kw else set()
+    @classmethod
+    def get_scan_state(cls, base_path) -> dict:
+        """
+        Scan-Stand aller Bücher unter base_path in EINER Abfrage: {pfad: ScanState}.
+        Der Scanner entscheidet damit per Dict-Zugriff statt load_by_path pro Datei.
+        fingerprint ist (size, mtime_ns, inode) oder None ohne create_db Migration 4.
+        """
+        base = base_path.replace('\\', '/').rstrip('/')
+        fp_columns = "file_size, file_mtime_ns, file_inode" if cls.has_fingerprint_columns() else "NULL, NULL, NULL"
+        # Bereichssuche über den UNIQUE-Index auf path statt LIKE
+        sql = f"""
+            SELECT path, id, scanner_version, is_complete, {fp_columns} FROM books
+            WHERE path >= ?1 || '/' AND path < ?1 || '0'
+        """
+        state = {}
+        for path, book_id, version, is_complete, size, mtime_ns, inode in cls.iter_sql(sql, (base,), raw=True):
+            fingerprint = (size, mtime_ns, inode) if size else None
+            state[path] = ScanState(book_id, version, is_complete, fingerprint)
+        return state
 
-                # Wir erstellen das Objekt (unvollständige Felder werden durch Defaults ersetzt)
-                results.append(cls(**clean_data))
-        except sqlite3.Error as e:
-            print(f"Fehler bei search_sql: {e}")
-        finally:
-            conn.close()
-        return results
+    @classmethod
+    def count_in_folder(cls, base_path) -> int:
+        """Anzahl Bücher unter base_path (z.B. als geschätzte Gesamtzahl für den Fortschrittsbalken)."""
+        base = base_path.replace('\\', '/').rstrip('/')
+        return cls.count_books("path >= ?1 || '/' AND path < ?1 || '0'", (base,))
+
+    @classmethod
+    def load_by_ids(cls, ids) -> dict:
+        """Lädt viele Bücher gebündelt (bis 900 IDs pro Abfrage) inkl. Autoren -> {id: BookData}."""
+        ids = [i for i in dict.fromkeys(ids) if i]
+        books = {}
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            sql = f"SELECT * FROM books WHERE id IN ({','.join(['?'] * len(chunk))})"
+            for book in cls.search_sql(sql, tuple(chunk)):
+                books[book.id] = book
+        return books
+
+    @classmethod
+    def count_books(cls, where: str = "", params: tuple = ()) -> int:
+        """Anzahl der Bücher (z.B. als total für tqdm bei iter_all)."""
+        sql = f"SELECT COUNT(*) FROM books {f'WHERE {where}' if where else ''}"
+        return get_db(cls.db_path).connection().execute(sql, params).fetchone()[0]
 
     @classmethod
     def update_file_path(cls, old_path, new_path):
@@ -190,26 +625,22 @@ class BookData:
         old_path = cls.normalize_path(old_path)
         new_path = cls.normalize_path(new_path)
 
-        conn = sqlite3.connect(DB_PATH)
         try:
-            cursor = conn.cursor()
-
-            # 2. UPDATE ausführen
-            cursor.execute("UPDATE books SET path = ? WHERE path = ?", (new_path, old_path))
+            with get_db(cls.db_path).transaction() as conn:
+                # 2. UPDATE ausführen
+                cursor = conn.execute("UPDATE books SET path = ? WHERE path = ?", (new_path, old_path))
 
             if cursor.rowcount == 0:
                 # ... dein (sehr guter!) Fehler-Check mit dem LIKE %filename ...
                 # (hier weggelassen für die Übersicht)
                 return False
             else:
-                conn.commit()
                 print(f"DEBUG: Update erfolgreich.")
+                return True
 
         except sqlite3.Error as e:
             print(f"Datenbankfehler: {e}")
             return False
-        finally:
-            conn.close()
 
     # __init__ wird bei Datenklassen ja im Hintergrund automatisch erledigt.
     # Aber wir müssen uns danach um die Normalisierung des Pfadnamen kümmern.
@@ -281,7 +712,11 @@ class BookData:
             # Falls es ein normales Objekt oder Dict ist
             other_dict = other_metadata.__dict__ if hasattr(other_metadata, '__dict__') else other_metadata
 
+        own_fields = {f.name for f in fields(self)}
         for field_name, other_value in other_dict.items():
+            # Nur echte Felder übernehmen (BookData hat __slots__, fremde Attribute gibt es nicht)
+            if field_name not in own_fields:
+                continue
             # 1. Schutz-Check
             if field_name in protected_fields:
                 current_val = getattr(self, field_name, None)
@@ -317,77 +752,144 @@ class BookData:
             if other_metadata.genre_epub not in self.keywords:
                 self.keywords.add(other_metadata.genre_epub)
 
+    @classmethod
+    def reload_schema(cls):
+        """Erzwingt ein neues Einlesen des books-Schemas (z.B. nach update_database_structure)."""
+        BookSchema.invalidate(get_db(cls.db_path))
+
     def save(self):
         """Das Objekt speichert sich selbst in die Datenbank – mit Typ-Korrektur."""
         self.path = self.normalize_path(self.path)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # 1. Struktur-Check & Alarm (Dein Code - super wichtig!)
-        cursor.execute("PRAGMA table_info(books)")
-        db_cols = [row[1] for row in cursor.fetchall()]
+        db = get_db(self.db_path)
+        is_insert = not (self.id and self.id > 0)
 
-        current_data = self.to_dict()
-        # Typ-Korrektur für die Datenbank: Sets oder Listen zu Strings konvertieren
-        for field in ['keywords', 'regions']:
-            if field in current_data:
-                val = current_data[field]
-                # Wir prüfen auf Set ODER Liste
-                if isinstance(val, (set, list)):
-                    # Wir sortieren für eine saubere Optik in der DB
-                    current_data[field] = ", ".join(sorted(list(val)))
-                elif val is None:
-                    current_data[field] = ""
-
-        ignored = {'authors', 'image_path', 'extension'}  # keywords jetzt nicht mehr ignorieren, da sie in die DB sollen
-        mismatch = [k for k in current_data.keys() if k not in db_cols and k not in ignored]
-
-        if mismatch:
-            print(f"⚠️  ALARM: Spalten fehlen in DB: {mismatch}")
+        try:
+            # Spalten & SQL kommen aus dem gecachten Schema (kein PRAGMA pro Buch mehr)
+            schema = BookSchema.get(db, type(self))
+            values = schema.values(self)
+            with db.transaction() as conn:
+                cursor = conn.cursor()
+                if not is_insert:
+                    # --- UPDATE-LOGIK (Anker: ID) ---
+                    cursor.execute(schema.update_sql, values + (self.id,))
+                    if cursor.rowcount == 0:
+                        raise sqlite3.DatabaseError(f"Buch mit ID {self.id} existiert nicht in der DB")
+                else:
+                    # --- INSERT-LOGIK (Neues Buch) ---
+                    # Falls ID 0 ist, lassen wir SQLite sie vergeben
+                    cursor.execute(schema.insert_sql, values)
+                    self.id = cursor.lastrowid
+
+                # 2. Autoren-Verknüpfung (n:m)
+                cursor.execute("DELETE FROM book_authors WHERE book_id = ?", (self.id,))
+                for fname, lname in self.authors:
+                    cursor.execute("SELECT id FROM authors WHERE firstname=? AND lastname=?", (fname, lname))
+                    res = cursor.fetchone()
+                    a_id = res[0] if res else None
+
+                    if not a_id:
+                        cursor.execute("INSERT INTO authors (firstname, lastname) VALUES (?,?)", (fname, lname))
+                        a_id = cursor.lastrowid
+
+                    cursor.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?,?)", (self.id, a_id))
+            return True
+        except Exception as e:
+            print(f"Fehler beim Speichern: {e}")
+            if is_insert:
+                self.id = 0  # der Rollback hat die neue Zeile verworfen
+            # Falls sich die Tabelle geändert hat, beim nächsten Mal neu einlesen
+            BookSchema.invalidate(db)
+            return False
 
-        # Nur Felder nehmen, die wirklich in der DB existieren
-        save_dict = {k: v for k, v in current_data.items() if k in db_cols}
+    @classmethod
+    def save_many(cls, books, batch_size=500, failed=None):
+        """
+        Speichert viele BookData-Objekte auf einmal (Massen-Import beim Scan).
+        Pro Batch eine Transaktion, executemany für books und book_authors,
+        Autoren-IDs kommen aus einer einmal geladenen (Vorname, Nachname) -> id Map.
+        Gibt die Anzahl der gespeicherten Bücher zurück; failed (Liste) sammelt die nicht gespeicherten.
+        """
+        books = [b for b in books if b is not None]
+        if not books:
+            return 0
+
+        db = get_db(cls.db_path)
+        schema = BookSchema.get(db, cls, check_version=True)
+        author_map = cls._load_author_map(db.connection())
+
+        saved = 0
+        for start in range(0, len(books), batch_size):
+            batch = books[start:start + batch_size]
+            known_authors = dict(author_map)
+            new_books = [b for b in batch if not (b.id and b.id > 0)]
+            try:
+                with db.transaction(immediate=True) as conn:
+                    cls._write_batch(conn, batch, schema, known_authors)
+                author_map = known_authors
+                saved += len(batch)
+            except Exception as e:
+                # Der Rollback hat auch die vorab vergebenen IDs verworfen -> wieder als neu speichern
+                for book in new_books:
+                    book.id = 0
+                # Ein defektes Buch soll nicht den ganzen Batch kosten -> einzeln nachspeichern
+                print(f"Fehler beim Batch-Speichern ({e}), speichere {len(batch)} Bücher einzeln...")
+                for book in batch:
+                    if book.save():
+                        saved += 1
+                    elif failed is not None:
+                        failed.append(book)
+                # save() hat eigene Autoren angelegt -> Map neu laden, sonst entstehen Dubletten
+                author_map = cls._load_author_map(db.connection())
+        return saved
 
-        try:
-            if self.id and self.id > 0:
-                # --- UPDATE-LOGIK (Anker: ID) ---
-                # Wir entfernen die ID aus den SET-Werten, sie steht ja im WHERE
-                temp_id = save_dict.pop('id')
-                set_clause = ", ".join([f"{k} = ?" for k in save_dict.keys()])
-                sql = f"UPDATE books SET {set_clause} WHERE id = ?"
-                cursor.execute(sql, list(save_dict.values()) + [temp_id])
-                save_dict['id'] = temp_id  # ID für später wieder rein
-            else:
-                # --- INSERT-LOGIK (Neues Buch) ---
-                # Falls ID 0 ist, lassen wir SQLite sie vergeben (entfernen aus Dict)
-                save_dict.pop('id', None)
-                columns = ", ".join(save_dict.keys())
-                placeholders = ", ".join(["?"] * len(save_dict))
-                sql = f"INSERT INTO books ({columns}) VALUES ({placeholders})"
-                cursor.execute(sql, list(save_dict.values()))
-                self.id = cursor.lastrowid
-
-            # 2. Autoren-Verknüpfung (n:m)
-            cursor.execute("DELETE FROM book_authors WHERE book_id = ?", (self.id,))
-            for fname, lname in self.authors:
-                cursor.execute("SELECT id FROM authors WHERE firstname=? AND lastname=?", (fname, lname))
-                res = cursor.fetchone()
-                a_id = res[0] if res else None
+    @staticmethod
+    def _load_author_map(conn):
+        """(Vorname, Nachname) -> Autoren-ID für alle Autoren in der DB."""
+        return {(r[1], r[2]): r[0] for r in conn.execute("SELECT id, firstname, lastname FROM authors")}
 
+    @classmethod
+    def _write_batch(cls, conn, batch, schema, author_map):
+        """Schreibt einen Batch innerhalb einer offenen Transaktion."""
+        cursor = conn.cursor()
+        inserts, updates = [], []
+        for book in batch:
+            book.path = cls.normalize_path(book.path)
+            (updates if book.id and book.id > 0 else inserts).append(book)
+
+        # 1. Neue Bücher: IDs selbst vergeben, damit executemany reicht (Schreibsperre ist aktiv)
+        if inserts:
+            max_id = cursor.execute("SELECT MAX(id) FROM books").fetchone()[0] or 0
+            seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'books'").fetchone()
+            next_id = max(max_id, seq[0] if seq else 0) + 1
+            for book in inserts:
+                book.id = next_id
+                next_id += 1
+
+        if inserts:
+            cursor.executemany(schema.insert_with_id_sql, [schema.values(b) + (b.id,) for b in inserts])
+        if updates:
+            cursor.executemany(schema.update_sql, [schema.values(b) + (b.id,) for b in updates])
+            if cursor.rowcount != len(updates):
+                raise sqlite3.DatabaseError("Update für Bücher, die nicht (mehr) in der DB stehen")
+
+        # 2. Autoren-Verknüpfung (n:m)
+        cursor.executemany("DELETE FROM book_authors WHERE book_id = ?", [(b.id,) for b in updates])
+        links = []
+        for book in batch:
+            for fname, lname in book.authors:
+                a_id = author_map.get((fname, lname))
                 if not a_id:
                     cursor.execute("INSERT INTO authors (firstname, lastname) VALUES (?,?)", (fname, lname))
                     a_id = cursor.lastrowid
+                    author_map[(fname, lname)] = a_id
+                links.append((book.id, a_id))
+        cursor.executemany("INSERT INTO book_authors (book_id, author_id) VALUES (?,?)", links)
 
-                cursor.execute("INSERT INTO book_authors (book_id, author_id) VALUES (?,?)", (self.id, a_id))
-
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Fehler beim Speichern: {e}")
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+    def update_fingerprint(self):
+        """Merkt sich Größe, Änderungszeit und Inode der Datei, damit der nächste Scan sie überspringen kann."""
+        fingerprint = file_fingerprint(self.path) if self.path else None
+        if fingerprint:
+            self.file_size, self.file_mtime_ns, self.file_inode = fingerprint
 
     def delete(self):
         """Das Objekt entfernt sich selbst aus der Datenbank."""
@@ -395,24 +897,29 @@ class BookData:
             print("Fehler: Buch hat keine ID und kann nicht gelöscht werden.")
             return False
 
-        import sqlite3
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         try:
-            # 1. Erst die Verknüpfungen in der n:m Tabelle lösen
-            cursor.execute("DELETE FROM book_authors WHERE book_id = ?", (self.id,))
-            # 2. Dann den Eintrag in der books-Tabelle löschen
-            cursor.execute("DELETE FROM books WHERE id = ?", (self.id,))
-            conn.commit()
+            with get_db(self.db_path).transaction() as conn:
+                # 1. Erst die Verknüpfungen (n:m Tabelle, API-Job) lösen
+                self.delete_dependents(conn, [self.id])
+                # 2. Dann den Eintrag in der books-Tabelle löschen
+                conn.execute("DELETE FROM books WHERE id = ?", (self.id,))
             # Wir setzen die ID auf 0 zurück, da das Objekt in der DB nicht mehr existiert
             self.id = 0
             return True
         except Exception as e:
-            conn.rollback()
             print(f"Fehler beim Löschen des Objekts: {e}")
             return False
-        finally:
-            conn.close()
+
+    @staticmethod
+    def delete_dependents(conn, book_ids):
+        """
+        Entfernt alles, was an den Büchern hängt: book_authors und (falls es die Tabelle gibt) enrichment_jobs.
+        Vor jedem DELETE FROM books aufrufen – PRAGMA foreign_keys ist aus, Kaskaden greifen nicht.
+        """
+        ids = [(i,) for i in book_ids]
+        conn.executemany("DELETE FROM book_authors WHERE book_id = ?", ids)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'enrichment_jobs'").fetchone():
+            conn.executemany("DELETE FROM enrichment_jobs WHERE book_id = ?", ids)
 
     def to_dict(self):
         """Hilfsmethode für SQL - nutzt jetzt die festen Felder der Dataclass."""
@@ -424,17 +931,13 @@ class BookData:
         old_path = cls.normalize_path(old_path)
         new_path = cls.normalize_path(new_path)
 
-        conn = sqlite3.connect(cls.db_path)
         try:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE books SET path = ? WHERE path = ?", (new_path, old_path))
-            conn.commit()
+            with get_db(cls.db_path).transaction() as conn:
+                cursor = conn.execute("UPDATE books SET path = ? WHERE path = ?", (new_path, old_path))
             return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"DB-Fehler bei Pfad-Fix: {e}")
             return False
-        finally:
-            conn.close()
 
 
     @classmethod
@@ -448,11 +951,12 @@ class BookData:
         print(f"--- STARTE DATENBANK-OPTIMIERUNG (VACUUM) ---")
         start_time = time.time()
 
-        conn = sqlite3.connect(cls.db_path)
+        conn = get_db(cls.db_path).connection()
         try:
             # VACUUM kann nicht innerhalb einer Transaktion ausgeführt werden,
-            # daher stellen wir sicher, dass autocommit aktiv ist oder schließen die Verbindung kurz.
-            conn.isolation_level = None
+            # daher schließen wir eine evtl. offene Transaktion vorher ab.
+            if conn.in_transaction:
+                conn.commit()
             cursor = conn.cursor()
 
             # 1. Größe vor dem Vacuum
@@ -478,32 +982,40 @@ class BookData:
 
         except sqlite3.Error as e:
             print(f"❌ Fehler beim Vacuum: {e}")
-        finally:
-            conn.close()
 
     @classmethod
     def get_book_counts_per_folder(cls, base_filter=None):
         """
         Zählt Bücher pro Ordner innerhalb eines base_filter Pfades.
-        Nutzt die Klassen-Logik, bleibt aber speichereffizient.
+        Mit der Spalte folder ein einziges GROUP BY in der DB, sonst Pfade streamen und in Python zählen.
         """
+        if cls.has_folder_column():
+            if base_filter:
+                base = base_filter.replace('\\', '/').rstrip('/')
+                # Ordner selbst + alle Unterordner; die Bereichssuche ('/' < '0') nutzt den Index
+                sql = """
+                    SELECT folder, COUNT(*) FROM books
+                    WHERE folder = ?1 OR (folder >= ?1 || '/' AND folder < ?1 || '0')
+                    GROUP BY folder
+                """
+                rows = cls.iter_sql(sql, (base,), raw=True)
+            else:
+                rows = cls.iter_sql("SELECT folder, COUNT(*) FROM books WHERE folder IS NOT NULL GROUP BY folder",
+                                    raw=True)
+            return {folder: count for folder, count in rows}
+
         folder_counts = {}
 
         # SQL-Teil: Wir holen nur den Pfad.
         # Wenn ein Filter gesetzt ist, schränken wir die Suche direkt in der DB ein.
+        # iter_sql(raw=True) streamt reine Tupel -> keine 100k BookData-Objekte im Speicher.
         if base_filter:
             sql_filter = base_filter.replace('\\', '/') + '%'
-            sql = "SELECT path FROM books WHERE path LIKE ?"
-            # WICHTIG: Wir nutzen hier eine Methode, die idealerweise einen Generator liefert
-            # Falls search_sql fetchall() nutzt, ist das hier der Flaschenhals bei 100k Einträgen.
-            results = cls.search_sql(sql, (sql_filter,))
+            rows = cls.iter_sql("SELECT path FROM books WHERE path LIKE ?", (sql_filter,), raw=True)
         else:
-            results = cls.search_sql("SELECT path FROM books")
-
-        for book in results:
-            # Falls search_sql Objekte zurückgibt, greifen wir auf .path zu, sonst auf Index [0]
-            full_path = getattr(book, 'path', book[0] if isinstance(book, (list, tuple)) else None)
+            rows = cls.iter_sql("SELECT path FROM books", raw=True)
 
+        for (full_path,) in rows:
             if full_path:
                 # Schnelles String-Splitting statt os.path.dirname
                 norm_path = full_path.replace('\\', '/')
@@ -516,15 +1028,62 @@ class BookData:
 
     @classmethod
     def get_all_paths_in_folder(cls, folder_path):
-        """Gibt eine Liste aller Pfade zurück, die in der DB unter diesem Ordner liegen."""
-        # Wir nutzen ein LIKE Statement, um alle Unterpfade zu finden
+        """Gibt eine Liste aller Pfade zurück, die in der DB direkt in diesem Ordner liegen."""
         # Wir normalisieren die Slashes, damit der Vergleich klappt
-        search_path = folder_path.replace('\\', '/')
-        if not search_path.endswith('/'):
-            search_path += '/'
+        search_path = folder_path.replace('\\', '/').rstrip('/')
+        if cls.has_folder_column():
+            # Gleichheitssuche über den Index auf folder
+            sql = "SELECT path FROM books WHERE folder = ?"
+            return [row[0] for row in cls.iter_sql(sql, (search_path,), raw=True)]
 
+        # Ohne folder-Spalte: LIKE auf den Ordner, Unterordner in Python aussortieren
         sql = "SELECT path FROM books WHERE path LIKE ?"
-        results = cls.search_sql(sql, (search_path + '%',))
-
-        # search_sql liefert oft Objekte zurück, wir brauchen nur die Strings
-        return [book.path for book in results]
\ No newline at end of file
+        prefix = search_path + '/'
+        return [row[0] for row in cls.iter_sql(sql, (prefix + '%',), raw=True)
+                if '/' not in row[0].replace('\\', '/')[len(prefix):]]
+
+
+# ----------------------------------------------------------------------
+# VERGLEICH: BookData vs. BookRow
+# ----------------------------------------------------------------------
+def benchmark_row_types(db_path=None, n=100_000, columns="id, path, isbn"):
+    """
+    Vergleicht Speicher und Durchsatz für einen Durchlauf über n Bücher:
+    BookData-Objekte (iter_all ohne Autoren) gegen BookRow-Ansichten (as_rows=True).
+    Ohne db_path werden die Zeilen synthetisch erzeugt, damit der Vergleich auch ohne DB läuft.
+    """
+    names = tuple(c.strip() for c in columns.split(","))
+    previous_db_path = BookData.db_path
+    if db_path:
+        BookData.db_path = db_path  # nur für diesen Vergleich, wird unten zurückgesetzt
+        sources = {
+            "BookData": lambda: BookData.iter_all(columns=columns, with_authors=False),
+            "BookRow": lambda: BookData.iter_all(columns=columns, as_rows=True),
+        }
+    else:
+        rows = [tuple(i if c == 'id' else f"/buecher/{i % 500}/{c}_{i}.epub" for c in names) for i in range(n)]
+        make_row = book_row_type(names)._make
+        sources = {
+            "BookData": lambda: (BookData._from_row(dict(zip(names, r))) for r in rows),
+            "BookRow": lambda: map(make_row, rows),
+        }
+
+    print(f"{'Typ':<10} | {'Zeilen':>8} | {'Sekunden':>8} | {'Zeilen/s':>10} | {'MB (alle gehalten)':>18}")
+    try:
+        for name, source in sources.items():
+            start = time.perf_counter()
+            count = sum(1 for _ in source())
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            kept = list(source())
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del kept
+            print(f"{name:<10} | {count:>8} | {elapsed:>8.3f} | {count / elapsed:>10.0f} | {peak / 1e6:>18.1f}")
+    finally:
+        BookData.db_path = previous_db_path
+
+
+if __name__ == "__main__":
+    benchmark_row_types()
@@ -2,31 +2,68 @@
 DATEI: book_scanner.py
 PROJEKT: MyBook-Management (v1.3.2)
 """
+import argparse
+import cProfile
 import os
+import pstats
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import requests
 from tqdm import tqdm
 
 
 try:
-    from Gemini.read_file import extract_info_from_filename, derive_metadata_from_path
-    from Gemini.read_epub import enrich_from_epub, get_epub_metadata
+    from Gemini.read_file import extract_info_from_filename, derive_metadata_from_path, language_from_path, resolve_language
+    from Gemini.read_epub import enrich_from_epub, get_epub_metadata, detect_epub_language
     from Gemini.check import check_for_mismatch
     from Gemini.read_pdf import get_book_cover
-    from Gemini.file_utils import sanitize_path, build_perfect_filename, DB_PATH, EBOOK_BASE
+    from Gemini.cover_cache import get_cover_cache
+    from Gemini.file_utils import sanitize_path, build_perfect_filename, file_fingerprint, same_fingerprint
+    from Gemini.file_utils import DB_PATH, EBOOK_BASE
 
     # API Tools
     from Gemini.google_books import enrich_from_google_books
     from Gemini.open_library import enrich_from_open_library
+    from Gemini.enrichment import enrich_books, has_valid_isbn, has_local_metadata, needs_api
+    from Gemini.http_client import QuotaExceeded
+    from Gemini.api_cache import get_cache
+    from Gemini.checkpoint import ScanCheckpoint
+    from Gemini.discovery import iter_files, progress, EBOOK_EXTENSIONS, MIRROR_DIRS
+    from Gemini.scan_stats import get_stats, stage, collect
 
     # Mappings & Models
     from Gemini.genreMapping import extract_genre_and_keywords
-    from Apps.book_data import BookData
+    from Apps.book_data import BookData, get_db
 
 except ImportError as e:
     print(f"Fehler beim Modul-Import. Bitte Dateinamen prüfen: {e}")
 
 # --- KONSTRUKTION ---
 CURRENT_SCANNER_VERSION = "1.3.2"
+# Lokal gescannt, aber die APIs waren nicht erreichbar: != CURRENT -> der nächste Scan holt sie nach
+API_PENDING_VERSION = CURRENT_SCANNER_VERSION + "-api"
 mismatch_list = []
+_mismatch_lock = threading.Lock()
+
+
+def record_mismatch(entry):
+    """Fügt einen Eintrag für den Metadaten-Report hinzu (thread-sicher)."""
+    with _mismatch_lock:
+        mismatch_list.append(entry)
+
+
+def get_mismatches():
+    """Kopie der bisher gesammelten Einträge (z.B. für den Checkpoint)."""
+    with _mismatch_lock:
+        return list(mismatch_list)
+
+
+def restore_mismatches(entries):
+    """Einträge aus einem Checkpoint wieder aufnehmen (--resume)."""
+    with _mismatch_lock:
+        mismatch_list.extend(entries)
 
 def format_authors_for_display(normalized_authors):
     if not normalized_authors: return ""
@@ -37,15 +74,17 @@ def format_authors_for_display(normalized_authors):
 
 def write_mismatch_report(base_path):
     """Schreibt alle gesammelten Mismatches und Fehler in eine Textdatei."""
-    if not mismatch_list:
+    with _mismatch_lock:
+        entries = list(mismatch_list)
+    if not entries:
         print("Keine Mismatches gefunden. Kein Report erstellt.")
         return
 
     report_path = sanitize_path(os.path.join(base_path, 'Metadaten_Report.txt'))
     try:
         with open(report_path, 'w', encoding="utf-8") as f:
-            f.write(f"--- METADATEN REPORT ({len(mismatch_list)} Einträge) ---\n\n")
-            for item in mismatch_list:
+            f.write(f"--- METADATEN REPORT ({len(entries)} Einträge) ---\n\n")
+            for item in entries:
                 # NEU: Buch-ID und Titel ganz oben, falls vorhanden
                 if 'Buch-ID' in item:
                     f.write(f"ID: {item['Buch-ID']}\n")
@@ -73,28 +112,150 @@ def write_mismatch_report(base_path):
     except Exception as e:
         print(f"❌ Fehler beim Schreiben des Reports: {e}")
 
+# ----------------------------------------------------------------------
+# LOKALE ANALYSE (läuft im Parallel-Modus in den Worker-Prozessen)
+# ----------------------------------------------------------------------
+def extract_local_metadata(file_path, sample_language=True):
+    """
+    Die rein lokalen Schritte eines Scans: Dateiname, Pfad und EPUB-Inhalt auswerten.
+    Kein DB-Zugriff und keine Umbenennung -> kann in einem Worker-Prozess laufen.
+    Die Zeiten der Schritte reisen unter '_timings' mit (prepare_book verbucht sie im Hauptprozess).
+    sample_language=False: die gespeicherte Sprache bleibt, Textprobe und Spracherkennung entfallen
+    (ebenso, wenn ein Sprach-Ordner die Sprache festlegt).
+    """
+    with collect() as timings:
+        with stage('filename'):
+            file_info = extract_info_from_filename(file_path)
+        epub_raw = None
+        if file_info.get('extension', '.epub').lower() == '.epub':
+            detect = sample_language and language_from_path(os.path.dirname(file_path) + '/') is None
+            with stage('epub'):
+                epub_raw = get_epub_metadata(file_path, detect_text_language=detect)
+        with stage('path'):
+            path_info = derive_metadata_from_path(file_path)
+    return {
+        'file_info': file_info,
+        'path_info': path_info,
+        'epub_raw': epub_raw,
+        '_timings': timings,
+    }
+
+
+def _needs_analysis(state):
+    """Vollständige Bücher der aktuellen Version brauchen keine Datei-/EPUB-Analyse (nur den neuen Fingerabdruck)."""
+    return not (state and state.is_complete and state.scanner_version == CURRENT_SCANNER_VERSION)
+
+
+def _needs_language(state):
+    """Neue Bücher und Upgrades bestimmen die Sprache neu (prepare_book); sonst bleibt die gespeicherte."""
+    return state is None or state.scanner_version != CURRENT_SCANNER_VERSION
+
+
+def _iter_local_metadata(files, workers):
+    """
+    Verteilt extract_local_metadata auf einen Prozess-Pool und liefert (pfad, state, ergebnis) in Dateireihenfolge.
+    files ist ein Iterable von (pfad, ScanState oder None) – auch ein Generator, der noch sucht.
+    Es sind höchstens workers * 4 Dateien gleichzeitig unterwegs, damit bei 100k Dateien
+    nicht alle Ergebnisse auf einmal im Speicher liegen.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for file_path, state in files:
+            future = pool.submit(extract_local_metadata, file_path, _needs_language(state)) \
+                if _needs_analysis(state) else None
+            in_flight.append((file_path, state, future))
+            if len(in_flight) >= workers * 4:
+                path, state, future = in_flight.popleft()
+                yield path, state, future.result() if future else None
+        while in_flight:
+            path, state, future = in_flight.popleft()
+            yield path, state, future.result() if future else None
+
+
+def _blocks(items, size):
+    """Teilt einen Strom in Listen zu höchstens size Einträgen."""
+    items = iter(items)
+    while True:
+        block = list(islice(items, size))
+        if not block:
+            return
+        yield block
+
+
 # ----------------------------------------------------------------------
 # SINGLE SCAN IN SCHRITTEN
 # ----------------------------------------------------------------------
-def scan_single_book(file_path):
+_LOAD_FROM_DB = object()  # Marker: scan_single_book lädt das Buch selbst per load_by_path
+
+
+def scan_single_book(file_path, local=None, book_data=_LOAD_FROM_DB):
+    """
+    Scannt ein Buch komplett. local ist das Ergebnis von extract_local_metadata,
+    falls es schon (z.B. im Worker-Prozess) berechnet wurde.
+    book_data: bereits geladenes Buch aus der DB (None = nicht in der DB), sonst wird es hier geladen.
+    """
+    book_data, done = prepare_book(file_path, local, book_data)
+    if done:
+        return book_data
+
+    # APIs (einzeln und blockierend; scan_ebooks fragt sie gebündelt über Gemini.enrichment ab)
+    if needs_api(book_data):
+        get_stats().count('api_books')
+        isbn_before = book_data.isbn
+        try:
+            with stage('google_books', book_data.path):
+                book_data = enrich_from_google_books(book_data)
+            if not getattr(book_data, 'isbn', None):
+                with stage('open_library', book_data.path):
+                    book_data = enrich_from_open_library(book_data)
+        except requests.exceptions.RequestException as e:
+            book_data.isbn = isbn_before
+            defer_api(book_data, e)
+
+    return finish_book(book_data)
+
+
+def defer_api(book_data, error):
+    """
+    Eine API war nicht erreichbar (429/5xx nach allen Versuchen, Netzwerk, Tageskontingent):
+    das Buch wird mit den lokalen Daten gespeichert, aber nicht als fertig gescannt markiert.
+    """
+    tqdm.write(f"  WARN: API nicht erreichbar für {os.path.basename(book_data.path)} ({error}) "
+               f"– wird beim nächsten Scan nachgeholt.")
+    get_stats().count('api_deferred')
+    book_data.scanner_version = API_PENDING_VERSION
+
+
+def prepare_book(file_path, local=None, book_data=_LOAD_FROM_DB):
+    """
+    Schritte A-C: DB-Stand, Datei/Pfad, EPUB. Gibt (book_data, fertig) zurück;
+    fertig=True heißt, das Ergebnis braucht weder APIs noch finish_book (oder die Datei fehlt: None).
+    """
     if not os.path.exists(file_path):
-        return None
+        return None, True
 
     # --- SCHRITT A: DB CHECK ---
-    book_data = BookData.load_by_path(file_path)
+    if book_data is _LOAD_FROM_DB:
+        with stage('db_load', file_path):
+            book_data = BookData.load_by_path(file_path)
     db_version = book_data.scanner_version if book_data else "NEU"
 
     if not book_data:
         book_data = BookData(path=file_path)
     elif book_data.is_complete and db_version == CURRENT_SCANNER_VERSION:
-        return book_data
+        book_data.update_fingerprint()
+        return book_data, True
 
     is_upgrade = (str(db_version) != str(CURRENT_SCANNER_VERSION))
     book_data.scanner_version = CURRENT_SCANNER_VERSION
 
     # --- SCHRITT B: DATEI & PFAD ANALYSE ---
-    file_info = extract_info_from_filename(file_path)
-    path_info = derive_metadata_from_path(file_path)
+    if local is None:
+        local = extract_local_metadata(
+            file_path, is_upgrade or book_data.is_field_empty('language', book_data.language))
+    get_stats().merge(local.get('_timings'), file_path)
+    file_info = local['file_info']
+    path_info = local['path_info']
 
     # WICHTIG: Die Endung aus der echten Datei sichern
     book_data.extension = file_info.get('extension', '.epub')
@@ -107,17 +268,32 @@ def scan_single_book(file_path):
 
     book_data.path = sanitize_path(file_path)
 
+    # Sprache ohne Sprach-Ordner: Textanalyse des EPUB vor dc:language (vor dem EPUB-Merge setzen,
+    # sonst würde dc:language das leere Feld füllen). Beim Upgrade neu bestimmen: ältere Versionen
+    # haben ohne Sprach-Ordner pauschal 'de' gespeichert.
+    no_language_folder = language_from_path(os.path.dirname(file_path) + '/') is None
+    if book_data.is_field_empty('language', book_data.language) or (is_upgrade and no_language_folder):
+        epub_raw = local['epub_raw']
+        if no_language_folder and epub_raw and '_text_language' in epub_raw and epub_raw['_text_language'] is None:
+            # Textprobe wurde ausgelassen (Sprache war gespeichert), wird jetzt aber doch gebraucht
+            epub_raw['_text_language'] = detect_epub_language(file_path, epub_raw.get('description') or "")
+        book_data.language = resolve_language(file_path, epub_raw)
+
     # --- SCHRITT C: METADATEN-ANREICHERUNG (EPUB & APIs) ---
     if book_data.extension.lower() == '.epub':
-        epub_raw = get_epub_metadata(file_path)
-
-        # RESCUE-CHECK
-        if epub_raw and '_RESCUED_AS_PDF' in epub_raw:
-            new_path = epub_raw['_RESCUED_AS_PDF']
+        epub_raw = local['epub_raw']
+
+        # RESCUE-CHECK: get_epub_metadata hat eine PDF mit .epub-Endung erkannt -> hier umbenennen
+        if epub_raw and epub_raw.get('_IS_PDF'):
+            new_path = file_path.rsplit('.', 1)[0] + '.pdf'
+            if os.path.exists(new_path):
+                tqdm.write(f"  [ERROR] Datei ist eine PDF, aber {os.path.basename(new_path)} gibt es schon.")
+                return None, True
+            os.rename(file_path, new_path)
             if book_data.id > 0:
                 BookData.fix_path_ext(file_path, new_path)
             tqdm.write(f"  [RESCUE] Datei war PDF. Neustart als PDF: {os.path.basename(new_path)}")
-            return scan_single_book(new_path)
+            return scan_single_book(new_path), True
 
         if epub_raw:
             mismatch_entry = check_for_mismatch(
@@ -128,96 +304,287 @@ def scan_single_book(file_path):
                 epub_authors=epub_raw.get('authors', [])
             )
             if mismatch_entry:
-                mismatch_list.append(mismatch_entry)
+                record_mismatch(mismatch_entry)
             book_data.merge_with(BookData.from_dict(epub_raw))
-
-    # APIs
-    current_isbn = getattr(book_data, 'isbn', None)
-    has_valid_isbn = current_isbn and len(str(current_isbn).strip()) > 5
-    if not has_valid_isbn:
-        book_data = enrich_from_google_books(book_data)
-        if not getattr(book_data, 'isbn', None):
-            book_data = enrich_from_open_library(book_data)
-    else:
-        # Optionaler Log für den Debug-Modus
-        # tqdm.write(f"  [CACHE] ISBN {current_isbn} vorhanden – API übersprungen.")
-        pass
-
+            # Gepflegte Serie (Calibre/EPUB3) ersetzt die Raterei aus dem Dateinamen; series_source gilt
+            # nur, wenn die gespeicherte Serie wirklich daher stammt (sonst kein API-Verzicht)
+            if epub_raw.get('series_source'):
+                book_data.series_name = epub_raw['series_name']
+                book_data.series_number = epub_raw.get('series_number') or ""
+                book_data.series_source = epub_raw['series_source']
+            else:
+                book_data.series_source = ""
+
+    if not has_valid_isbn(book_data) and has_local_metadata(book_data):
+        get_stats().count('api_skipped_local')
+    return book_data, False
+
+
+def finish_book(book_data):
+    """Schritte D-E nach der API-Anreicherung: Klassifizierung, Dateiname, Fingerabdruck."""
+    scan_path = book_data.path  # Zeiten auf den Pfad vor dem Umbenennen buchen (wie in prepare_book)
     # --- SCHRITT D: KLASSIFIZIERUNG ---
-    desc = getattr(book_data, 'description', "")
-    src_genres = getattr(book_data, 'genre_epub', [])
-    if isinstance(src_genres, str): src_genres = [src_genres]
-    cats = getattr(book_data, 'categories', [])
-
-    final_genre, extra_keys = extract_genre_and_keywords(src_genres, cats, desc)
-    if final_genre and book_data.is_field_empty('genre', book_data.genre):
-        book_data.genre = final_genre
-
-    if extra_keys and book_data.keywords is not None:
-        if isinstance(book_data.keywords, set):
-            book_data.keywords.update(extra_keys)
-        else:
-            for k in extra_keys:
-                if k not in book_data.keywords: book_data.keywords.append(k)
+    with stage('classify', scan_path):
+        desc = getattr(book_data, 'description', "")
+        src_genres = getattr(book_data, 'genre_epub', [])
+        if isinstance(src_genres, str): src_genres = [src_genres]
+        cats = getattr(book_data, 'categories', [])
+
+        final_genre, extra_keys = extract_genre_and_keywords(src_genres, cats, desc)
+        if final_genre and book_data.is_field_empty('genre', book_data.genre):
+            book_data.genre = final_genre
+
+        if extra_keys and book_data.keywords is not None:
+            if isinstance(book_data.keywords, set):
+                book_data.keywords.update(extra_keys)
+            else:
+                for k in extra_keys:
+                    if k not in book_data.keywords: book_data.keywords.append(k)
 
     # --- SCHRITT E: FINALE NORMALISIERUNG (DATEINAME) ---
-    new_filename = build_perfect_filename(book_data)
-    directory = os.path.dirname(book_data.path)
-    new_path = sanitize_path(os.path.join(directory, new_filename))
-
-    if book_data.path != new_path:
-        if os.path.exists(new_path):
-            # FIX: Hier nutzen wir jetzt new_filename statt der alten file_extension Variable
-            name, ext = os.path.splitext(new_filename)
-            new_path = sanitize_path(os.path.join(directory, f"{name}-KOPIE{ext}"))
-            mismatch_list.append({
-                'filename': os.path.basename(book_data.path),
-                'full_path': book_data.path,
-                'error_type': 'DUPLICATE_FILE',
-                'note': f"Kopie erstellt: {new_filename}"
-            })
+    with stage('rename', scan_path):
+        new_filename = build_perfect_filename(book_data)
+        directory = os.path.dirname(book_data.path)
+        new_path = sanitize_path(os.path.join(directory, new_filename))
+
+        if book_data.path != new_path:
+            if os.path.exists(new_path):
+                # FIX: Hier nutzen wir jetzt new_filename statt der alten file_extension Variable
+                name, ext = os.path.splitext(new_filename)
+                new_path = sanitize_path(os.path.join(directory, f"{name}-KOPIE{ext}"))
+                record_mismatch({
+                    'filename': os.path.basename(book_data.path),
+                    'full_path': book_data.path,
+                    'error_type': 'DUPLICATE_FILE',
+                    'note': f"Kopie erstellt: {new_filename}"
+                })
+            try:
+                os.rename(book_data.path, new_path)
+                get_cover_cache().rename_source(book_data.path, new_path)
+                book_data.path = new_path
+                get_stats().count('renamed')
+                tqdm.write(f"  [RENAME] -> {new_filename}")
+            except OSError as e:
+                tqdm.write(f"  [ERROR] Rename fehlgeschlagen: {e}")
+
+    # Fingerabdruck erst nach dem Umbenennen nehmen (gilt für den endgültigen Pfad)
+    with stage('fingerprint', scan_path):
+        book_data.update_fingerprint()
+    return book_data
+
+def _finish_batch(prepared, pending, api_concurrency, api_state, queued=None):
+    """
+    APIs für alle vorbereiteten Bücher gleichzeitig abfragen, dann Schritte D-E.
+    Bücher, bei denen eine API nicht erreichbar war, kommen in queued (API-Job), falls es die
+    Warteschlange gibt, sonst werden sie für den nächsten Scan markiert (defer_api).
+    api_state['quota']: nach QuotaExceeded wird für den Rest des Scans nicht mehr gefragt.
+    """
+    wanted = [b for b in prepared if needs_api(b)]
+    if api_state.get('quota'):
+        failures = [(b, api_state['quota']) for b in wanted]
+    else:
+        with stage('api_batch'):
+            failures = enrich_books(wanted, google_limit=api_concurrency, ol_limit=api_concurrency)
+        quota = next((e for _, e in failures if isinstance(e, QuotaExceeded)), None)
+        if quota:
+            api_state['quota'] = quota
+            tqdm.write("⏸️  Tageskontingent erreicht – keine weiteren API-Abfragen in diesem Scan.")
+    if queued is None:
+        for book_data, error in failures:
+            defer_api(book_data, error)
+    retry = {id(b) for b, _ in failures} if queued is not None else set()
+    for book_data in prepared:
         try:
-            os.rename(book_data.path, new_path)
-            book_data.path = new_path
-            tqdm.write(f"  [RENAME] -> {new_filename}")
-        except OSError as e:
-            tqdm.write(f"  [ERROR] Rename fehlgeschlagen: {e}")
+            pending.append(finish_book(book_data))
+            if id(book_data) in retry:
+                get_stats().count('api_deferred')
+                queued.append(book_data)
+        except Exception as e:
+            tqdm.write(f"❌ Fehler bei: {book_data.path}\n   Grund: {e}")
 
-    return book_data
 
-def scan_ebooks(base):
-    print("Sammle Dateien...")
-    files_to_scan = []
-    for root, _, files in os.walk(base):
-        for file in files:
-            if file.lower().endswith(('.epub', '.pdf', '.mobi')):
-                files_to_scan.append(os.path.join(root, file))
+def _queue_batch(prepared, pending, queued):
+    """Queue-Modus: Schritte D-E sofort mit den lokalen Daten; Bücher, die die APIs brauchen (needs_api), bekommen einen API-Job."""
+    for book_data in prepared:
+        try:
+            pending.append(finish_book(book_data))
+            if needs_api(book_data):
+                queued.append(book_data)
+        except Exception as e:
+            tqdm.write(f"❌ Fehler bei: {book_data.path}\n   Grund: {e}")
+
+
+def scan_ebooks(base, batch_size=500, workers=1, api_concurrency=4, inline_api=False, resume=False, prune=()):
+    """
+    Scannt alle E-Books unter base.
+    workers > 1: Dateiname/Pfad/EPUB werden in einem Prozess-Pool ausgewertet; DB-Zugriffe,
+    API-Anreicherung, Umbenennen und Speichern bleiben im Hauptprozess (ein einziger Schreiber).
+    Gibt es die Tabelle enrichment_jobs (create_db Migration 5), speichert der Scan nur die lokalen
+    Metadaten und reiht Bücher ohne ISBN für Apps/enrichment_worker.py ein. Sonst (oder mit
+    inline_api=True) laufen die API-Abfragen pro Batch nebenläufig (api_concurrency Anfragen je Anbieter).
+    Nach jedem gespeicherten Batch wird ein Checkpoint geschrieben; resume=True setzt hinter der
+    letzten gespeicherten Datei fort (Dateien in sortierter Reihenfolge).
+    Die Dateisuche (Gemini.discovery) liefert laufend; prune lässt Ordner wie MIRROR_DIRS aus.
+    """
+    # Hier importiert: enrichment_worker benutzt selbst finish_book aus diesem Modul
+    from Apps.enrichment_worker import EnrichmentQueue
+    has_queue = EnrichmentQueue.exists()
+    use_queue = not inline_api and has_queue
+    api_state = {}  # {'quota': QuotaExceeded}, sobald das Tageskontingent erreicht ist
+    stats = get_stats()
+    stats.reset()
+    checkpoint = ScanCheckpoint('scan_ebooks', base)
+    resume_state = checkpoint.load() if resume else None
+    counters = {'scanned': 0, 'errors': 0}
+
+    # Ein Schnappschuss des DB-Stands für den ganzen Scan: ab hier nur noch Dict-Zugriffe statt load_by_path
+    scan_state = BookData.get_scan_state(sanitize_path(base))
+    last_path = None
+    if resume_state:
+        # Alles bis einschließlich der letzten gespeicherten Datei ist erledigt
+        last_path = resume_state['position']
+        counters.update(resume_state['counters'])
+        restore_mismatches(resume_state['mismatches'])
+        print(f"Fortsetzen nach {last_path} (Stand {resume_state['saved_at']}, "
+              f"bereits {counters['scanned']} gescannt).")
+    elif resume:
+        print("Kein passender Checkpoint gefunden – starte von vorn.")
+    unchanged = 0
+
+    def candidates():
+        """Dateien, wie die Suche sie findet (sortiert); Unverändertes fällt gleich heraus."""
+        nonlocal unchanged
+        found = iter_files(base, EBOOK_EXTENSIONS, prune)
+        # Geschätzte Gesamtzahl: so viele Bücher kennt die DB unter base
+        for entry in progress(found, len(scan_state), desc="Scan Fortschritt", unit="Datei"):
+            file_path = entry.path
+            if last_path is not None and file_path <= last_path:
+                continue
+            state = scan_state.pop(sanitize_path(file_path), None)
+            # Unveränderte Dateien (gleicher Fingerabdruck + Scanner-Version) gar nicht erst öffnen
+            if state and state.scanner_version == CURRENT_SCANNER_VERSION \
+                    and same_fingerprint(state.fingerprint, file_fingerprint(entry)):
+                unchanged += 1
+                continue
+            yield file_path, state
 
-    files_to_scan.sort()
     current_parent = ""
     processed = 0
+    # Gescannte Bücher sammeln und gebündelt speichern (eine kurze Transaktion pro Batch).
+    # Alle Schreibzugriffe laufen über die eine Verbindung dieses Threads; dank WAL lesen
+    # Browser und Analyzer währenddessen ungestört den zuletzt committeten Stand.
+    db = get_db(BookData.db_path)
+    pending = []
+
+    # Suche, Analyse und Speichern laufen als Pipeline: verarbeitet wird, sobald Dateien gefunden sind
+    if workers > 1:
+        scan_items = _iter_local_metadata(candidates(), workers)
+    else:
+        scan_items = ((file_path, state, None) for file_path, state in candidates())
 
-    for file_path in tqdm(files_to_scan, desc="Scan Fortschritt", unit="Buch"):
-        try:
-            parent = sanitize_path(os.path.dirname(file_path))
-            if parent != current_parent:
-                current_parent = parent
-                processed = 0
-
-            book_data = scan_single_book(file_path)
-            if book_data:
-                book_data.save()
-                processed += 1
-        except Exception as e:
-            tqdm.write(f"❌ Fehler bei: {file_path}\n   Grund: {e}")
+    prepared = []  # nach Schritt A-C, warten auf die gebündelte API-Anreicherung
+    queued = []    # Queue-Modus: gespeichert wird zuerst, dann eingereiht (erst dann steht die id fest)
 
+    def finish_prepared():
+        if use_queue:
+            _queue_batch(prepared, pending, queued)
+        else:
+            # Nicht erreichbare APIs: über die Warteschlange nachholen, wenn es sie gibt
+            _finish_batch(prepared, pending, api_concurrency, api_state, queued if has_queue else None)
+
+    def save_pending():
+        with stage('db_save'):
+            failed = []
+            BookData.save_many(pending, batch_size=batch_size, failed=failed)
+            if queued:
+                # Jobs nur für Bücher, die wirklich in der DB stehen (sonst zeigt book_id ins Leere)
+                not_saved = {id(b) for b in failed}
+                EnrichmentQueue.enqueue(b.id for b in queued if b.id and id(b) not in not_saved)
+                queued.clear()
+        pending.clear()
+
+    def flush(last_path):
+        """Batch abschließen und speichern; erst danach gilt last_path als erledigt."""
+        finish_prepared()
+        prepared.clear()
+        save_pending()
+        checkpoint.save(last_path, counters, get_mismatches())
+
+    for block in _blocks(scan_items, batch_size):
+        # Volle BookData-Objekte nur für die Dateien, die Arbeit machen – blockweise geladen
+        with stage('db_load'):
+            loaded = BookData.load_by_ids(state.id for _, state, _ in block if state)
+        for file_path, state, local in block:
+            try:
+                parent = sanitize_path(os.path.dirname(file_path))
+                if parent != current_parent:
+                    current_parent = parent
+                    processed = 0
+
+                book_data, done = prepare_book(file_path, local, loaded.get(state.id) if state else None)
+                if book_data is None and not os.path.isdir(base):
+                    # Laufwerk/Freigabe weg: nicht alles Weitere als fehlend behandeln, sondern anhalten
+                    tqdm.write(f"❌ {base} ist nicht mehr erreichbar – Abbruch. Fortsetzen mit --resume.")
+                    return
+                if book_data:
+                    (pending if done else prepared).append(book_data)
+                    processed += 1
+                counters['scanned'] += 1
+            except Exception as e:
+                counters['errors'] += 1
+                tqdm.write(f"❌ Fehler bei: {file_path}\n   Grund: {e}")
+            if len(prepared) >= batch_size or len(pending) >= batch_size:
+                flush(file_path)
+
+    finish_prepared()
+    save_pending()
+    checkpoint.clear()
+    print(f"Scan beendet: {counters['scanned']} Dateien gescannt, {unchanged} unverändert, "
+          f"{counters['errors']} Fehler.")
+    if use_queue:
+        print(f"API-Warteschlange: {EnrichmentQueue.counts()} – abarbeiten mit: python -m Apps.enrichment_worker")
+    # WAL nach dem Scan zurück in die DB-Datei schreiben und die -wal Datei leeren
+    db.checkpoint('TRUNCATE')
+    get_cache().report()
     write_mismatch_report(base)
+    stats.count('scanned', counters['scanned'])
+    stats.count('unchanged', unchanged)
+    stats.count('errors', counters['errors'])
+    stats.report()
+    stats.write_json(sanitize_path(os.path.join(base, 'Scan_Statistik.json')),
+                     api_cache={host: dict(s) for host, s in get_cache().stats.items()})
 
 
 
 
 if __name__ == "__main__":
-    target_path = sanitize_path("D:/Bücher/French")
+    parser = argparse.ArgumentParser(description="E-Books scannen und in die Datenbank übernehmen.")
+    parser.add_argument("path", nargs="?", default="D:/Bücher/French", help="Start-Ordner des Scans")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Prozesse für Dateiname/Pfad/EPUB-Analyse (1 = seriell wie bisher)")
+    parser.add_argument("--api-concurrency", type=int, default=4,
+                        help="Gleichzeitige Anfragen pro API-Anbieter (Google Books, Open Library)")
+    parser.add_argument("--inline-api", action="store_true",
+                        help="APIs direkt im Scan abfragen statt über die Warteschlange enrichment_jobs")
+    parser.add_argument("--skip-mirrors", action="store_true",
+                        help=f"Spiegel-Ordner auslassen ({', '.join(MIRROR_DIRS)})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Abgebrochenen Scan hinter der letzten gespeicherten Datei fortsetzen")
+    parser.add_argument("--profile", action="store_true",
+                        help="Ganzen Lauf mit cProfile messen (nur Hauptprozess) -> scan_profile.prof")
+    args = parser.parse_args()
+
+    target_path = sanitize_path(args.path)
     # Zum Reparieren: repair_total_library(target_path)
-    scan_ebooks(target_path)
+    scan_args = dict(workers=max(1, args.workers), api_concurrency=max(1, args.api_concurrency),
+                     inline_api=args.inline_api, resume=args.resume,
+                     prune=MIRROR_DIRS if args.skip_mirrors else ())
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(scan_ebooks, target_path, **scan_args)
+        profiler.dump_stats("scan_profile.prof")
+        print("--- cProfile (Top 30 nach kumulierter Zeit, komplett in scan_profile.prof) ---")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+    else:
+        scan_ebooks(target_path, **scan_args)
     # repair_total_library(target_path)
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+DATEI: enrichment_worker.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Zweite Phase des Scans: arbeitet die Tabelle enrichment_jobs ab (create_db Migration 5).
+              scan_ebooks speichert nur lokale Metadaten (Dateiname, Pfad, EPUB) und trägt Bücher ohne ISBN
+              hier ein. Der Worker holt sich Blöcke fälliger Jobs, fragt Google Books / Open Library
+              nebenläufig ab (Gemini.enrichment) und schreibt zurück. Abbrechen (Strg+C) und neu starten
+              ist jederzeit möglich; fehlgeschlagene Jobs bekommen einen späteren Termin.
+
+              python -m Apps.enrichment_worker [--batch 50] [--concurrency 4] [--limit N] [--status]
+"""
+import argparse
+import asyncio
+import time
+
+from Apps.book_data import BookData, get_db
+from Apps.book_scanner import finish_book
+from Gemini.enrichment import EnrichmentEngine
+from Gemini.http_client import QuotaExceeded
+
+
+class EnrichmentQueue:
+    """Zugriff auf die Tabelle enrichment_jobs (ein Job pro Buch)."""
+    MAX_ATTEMPTS = 5
+    RETRY_BASE = 300          # Sekunden bis zum 2. Versuch, verdoppelt sich danach
+    RETRY_MAX = 24 * 3600
+
+    @classmethod
+    def exists(cls) -> bool:
+        return BookData._schema_check(
+            'has_jobs', "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'enrichment_jobs'")
+
+    @classmethod
+    def enqueue(cls, book_ids):
+        """Trägt Bücher ein bzw. setzt erledigte/fehlgeschlagene Jobs zurück (z.B. nach Scanner-Upgrade)."""
+        ids = [(i, time.time()) for i in dict.fromkeys(book_ids) if i]
+        if not ids:
+            return 0
+        with get_db(BookData.db_path).transaction() as conn:
+            conn.executemany("""
+                INSERT INTO enrichment_jobs (book_id, status, attempts, next_retry, updated)
+                VALUES (?1, 'pending', 0, 0, ?2)
+                ON CONFLICT(book_id) DO UPDATE SET
+                    status = 'pending', attempts = 0, next_retry = 0, last_error = NULL, updated = ?2
+                WHERE status != 'running'
+            """, ids)
+        return len(ids)
+
+    @classmethod
+    def release_stale(cls):
+        """Jobs, die ein abgebrochener Worker noch als 'running' markiert hat, wieder freigeben."""
+        with get_db(BookData.db_path).transaction() as conn:
+            return conn.execute(
+                "UPDATE enrichment_jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+    @classmethod
+    def claim(cls, limit):
+        """Holt bis zu limit fällige Jobs und markiert sie als 'running' (BEGIN IMMEDIATE: kein Doppelzugriff)."""
+        now = time.time()
+        with get_db(BookData.db_path).transaction(immediate=True) as conn:
+            ids = [row[0] for row in conn.execute("""
+                SELECT book_id FROM enrichment_jobs
+                WHERE status = 'pending' AND next_retry <= ?
+                ORDER BY next_retry, book_id LIMIT ?
+            """, (now, limit))]
+            conn.executemany("UPDATE enrichment_jobs SET status = 'running', updated = ? WHERE book_id = ?",
+                             [(now, i) for i in ids])
+        return ids
+
+    @classmethod
+    def finish(cls, done_ids=(), failures=None, released_ids=()):
+        """
+        Ergebnis eines Blocks verbuchen: done_ids erledigt, failures {book_id: Fehlertext} mit Backoff
+        neu planen (nach MAX_ATTEMPTS 'failed'), released_ids unverändert zurück auf 'pending'.
+        """
+        now = time.time()
+        with get_db(BookData.db_path).transaction() as conn:
+            conn.executemany("UPDATE enrichment_jobs SET status = 'done', last_error = NULL, updated = ? "
+                             "WHERE book_id = ?", [(now, i) for i in done_ids])
+            conn.executemany("UPDATE enrichment_jobs SET status = 'pending', updated = ? WHERE book_id = ?",
+                             [(now, i) for i in released_ids])
+            for book_id, error in (failures or {}).items():
+                attempts = conn.execute("SELECT attempts FROM enrichment_jobs WHERE book_id = ?",
+                                        (book_id,)).fetchone()[0] + 1
+                status = 'failed' if attempts >= cls.MAX_ATTEMPTS else 'pending'
+                delay = min(cls.RETRY_MAX, cls.RETRY_BASE * 2 ** (attempts - 1))
+                conn.execute("""
+                    UPDATE enrichment_jobs
+                    SET status = ?, attempts = ?, next_retry = ?, last_error = ?, updated = ?
+                    WHERE book_id = ?
+                """, (status, attempts, now + delay, str(error)[:500], now, book_id))
+
+    @classmethod
+    def drop(cls, book_ids):
+        """Jobs für Bücher entfernen, die es nicht mehr gibt."""
+        with get_db(BookData.db_path).transaction() as conn:
+            conn.executemany("DELETE FROM enrichment_jobs WHERE book_id = ?", [(i,) for i in book_ids])
+
+    @classmethod
+    def counts(cls) -> dict:
+        rows = get_db(BookData.db_path).connection().execute(
+            "SELECT status, COUNT(*) FROM enrichment_jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def run_worker(batch_size=50, concurrency=4, limit=None):
+    """
+    Arbeitet fällige Jobs in Blöcken ab, bis keiner mehr fällig ist (oder limit Bücher erledigt sind).
+    Pro Block: Bücher laden, APIs nebenläufig abfragen, Schritt D-E des Scanners (Genre, Dateiname),
+    gebündelt speichern, Jobs verbuchen.
+    """
+    if not EnrichmentQueue.exists():
+        print("Tabelle enrichment_jobs fehlt – bitte zuerst create_db.migrate_database() ausführen.")
+        return 0
+
+    released = EnrichmentQueue.release_stale()
+    if released:
+        print(f"{released} unterbrochene Jobs wieder freigegeben.")
+
+    engine = EnrichmentEngine(google_limit=concurrency, ol_limit=concurrency, raise_errors=True)
+    processed = 0
+    while limit is None or processed < limit:
+        take = batch_size if limit is None else min(batch_size, limit - processed)
+        ids = EnrichmentQueue.claim(take)
+        if not ids:
+            break
+
+        try:
+            books = BookData.load_by_ids(ids)
+            missing = [i for i in ids if i not in books]
+            if missing:
+                EnrichmentQueue.drop(missing)
+
+            batch = list(books.values())
+            results = asyncio.run(engine.enrich_many(batch))
+
+            done, failures, to_save, quota_hit = [], {}, [], False
+            for book, result in zip(batch, results):
+                if isinstance(result, QuotaExceeded):
+                    quota_hit = True
+                if isinstance(result, Exception):
+                    failures[book.id] = result
+                    continue
+                try:
+                    to_save.append(finish_book(book))
+                    done.append(book.id)
+                except Exception as e:
+                    failures[book.id] = e
+
+            not_saved = []
+            BookData.save_many(to_save, failed=not_saved)
+            for book in not_saved:
+                # Nicht gespeichert -> Job bleibt offen und wird mit Backoff erneut versucht
+                done.remove(book.id)
+                failures[book.id] = "Speichern fehlgeschlagen"
+            if quota_hit:
+                # Kontingent weg: nicht als Fehlversuch zählen, einfach wieder einreihen
+                EnrichmentQueue.finish(done, released_ids=list(failures))
+                print("⏸️  Tageskontingent erreicht – Worker hält an (später einfach neu starten).")
+                processed += len(done)
+                break
+            EnrichmentQueue.finish(done, failures)
+        except BaseException:
+            # Strg+C oder unerwarteter Fehler: den geholten Block unverändert zurückgeben
+            EnrichmentQueue.finish(released_ids=ids)
+            raise
+
+        processed += len(ids)
+        print(f"✔️  {processed} Jobs bearbeitet ({len(done)} ok, {len(failures)} mit Fehler) – {EnrichmentQueue.counts()}")
+
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arbeitet die API-Warteschlange (enrichment_jobs) ab.")
+    parser.add_argument("--batch", type=int, default=50, help="Jobs pro Block (ein Speichervorgang pro Block)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Gleichzeitige Anfragen pro API-Anbieter")
+    parser.add_argument("--limit", type=int, default=None, help="Höchstens so viele Jobs, dann beenden")
+    parser.add_argument("--status", action="store_true", help="Nur den Stand der Warteschlange anzeigen")
+    args = parser.parse_args()
+
+    if args.status:
+        print(EnrichmentQueue.counts() if EnrichmentQueue.exists() else "Tabelle enrichment_jobs fehlt.")
+    else:
+        try:
+            run_worker(batch_size=args.batch, concurrency=args.concurrency, limit=args.limit)
+        except KeyboardInterrupt:
+            print("\nAbgebrochen – offene Jobs bleiben in der Warteschlange.")
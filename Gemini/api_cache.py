@@ -0,0 +1,215 @@
+"""
+DATEI: api_cache.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Persistenter Cache für die JSON-Antworten von Google Books und Open Library (SQLite, api_cache.db).
+              Schlüssel ist die normalisierte Anfrage (URL + sortierte Parameter), mit Ablaufzeit (TTL).
+              "Kein Treffer" wird ebenfalls gemerkt (kürzere TTL), damit ein Rescan nicht dieselben
+              erfolglosen Suchen wiederholt. Zu große Caches werden nach letzter Nutzung ausgedünnt.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit, parse_qsl
+
+from Gemini import http_client
+from Gemini.file_utils import API_CACHE_PATH
+
+DAY = 24 * 3600
+_MISS = object()
+
+
+class ResponseCache:
+    """Key-Value-Cache auf SQLite: normalisierte Anfrage -> JSON-Antwort."""
+    TTL = 30 * DAY               # gefundene Daten ändern sich selten
+    NEGATIVE_TTL = 3 * DAY       # "nichts gefunden" früher noch einmal probieren
+    MAX_ENTRIES = 100_000        # darüber werden die am längsten ungenutzten Einträge gelöscht
+    EVICT_CHECK_EVERY = 500      # Schreibvorgänge zwischen zwei Größen-Checks
+
+    def __init__(self, path=API_CACHE_PATH, ttl=None, negative_ttl=None, max_entries=None):
+        self.path = path
+        self.ttl = ttl or self.TTL
+        self.negative_ttl = negative_ttl or self.NEGATIVE_TTL
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.enabled = True
+        self._conn = None
+        # Eine Verbindung für alle Threads (die Async-Engine ruft aus ihrem Thread-Pool), daher mit Lock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = defaultdict(lambda: defaultdict(int))  # host -> {hits, negative_hits, misses, ...}
+
+    # ------------------------------------------------------------------
+    # VERBINDUNG
+    # ------------------------------------------------------------------
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    host TEXT,
+                    body TEXT,
+                    negative INTEGER DEFAULT 0,
+                    created REAL,
+                    expires REAL,
+                    last_used REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ------------------------------------------------------------------
+    # SCHLÜSSEL
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(url, params=None):
+        """
+        Normalisiert eine Anfrage: Host klein, Parameter aus URL und params sortiert,
+        Werte ohne doppelte Leerzeichen und ohne Groß/Klein-Unterschied.
+        'q=Rue  de Paradis' und 'q=rue de paradis' landen so im selben Eintrag.
+        """
+        parts = urlsplit(url)
+        items = parse_qsl(parts.query, keep_blank_values=True)
+        if params:
+            items += [(k, str(v)) for k, v in params.items() if v is not None]
+        normalized = sorted((k, " ".join(v.split()).casefold()) for k, v in items)
+        query = "&".join(f"{k}={v}" for k, v in normalized)
+        return f"{parts.netloc.lower()}{parts.path}?{query}"
+
+    # ------------------------------------------------------------------
+    # LESEN / SCHREIBEN
+    # ------------------------------------------------------------------
+    def get(self, key, host=""):
+        """Gespeicherte Antwort oder _MISS (abgelaufene Einträge zählen als Miss)."""
+        if not self.enabled:
+            return _MISS
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT body, negative, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None or row[2] < now:
+                    self.stats[host]['expired' if row else 'misses'] += 1
+                    return _MISS
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                self._disable(e)
+                return _MISS
+            self.stats[host]['negative_hits' if row[1] else 'hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, key, data, host="", negative=False):
+        if not self.enabled:
+            return
+        now = time.time()
+        expires = now + (self.negative_ttl if negative else self.ttl)
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("""
+                    INSERT OR REPLACE INTO responses (key, host, body, negative, created, expires, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (key, host, json.dumps(data), int(negative), now, expires, now))
+                conn.commit()
+                self._writes += 1
+                if self._writes % self.EVICT_CHECK_EVERY == 0:
+                    self._evict(conn)
+            except sqlite3.Error as e:
+                self._disable(e)
+                return
+            self.stats[host]['stored_negative' if negative else 'stored'] += 1
+
+    def _disable(self, error):
+        """Ohne Cache weiterarbeiten (z.B. Ordner fehlt oder Datei gesperrt) statt die API-Abfrage scheitern zu lassen."""
+        print(f"⚠️ API-Cache deaktiviert ({self.path}): {error}")
+        self.enabled = False
+
+    def _evict(self, conn):
+        """Abgelaufene Einträge löschen, danach die am längsten ungenutzten bis auf max_entries."""
+        removed = conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            removed += conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used LIMIT ?
+                )
+            """, (count - self.max_entries,)).rowcount
+        conn.commit()
+        self.stats['']['evicted'] += removed
+        return removed
+
+    def evict(self):
+        with self._lock:
+            return self._evict(self._connection())
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    # ------------------------------------------------------------------
+    # STATISTIK
+    # ------------------------------------------------------------------
+    def report(self):
+        """Trefferquote dieses Laufs pro API und Größe des Caches auf der Platte."""
+        entries, negatives = "-", "-"
+        if self.enabled:
+            with self._lock:
+                try:
+                    entries, negatives = self._connection().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(negative), 0) FROM responses").fetchone()
+                except sqlite3.Error as e:
+                    self._disable(e)
+
+        print(f"--- API-CACHE ({self.path}) ---")
+        print(f"{'API':<25} | {'Treffer':>7} | {'davon leer':>10} | {'Miss':>6} | {'abgelaufen':>10} | {'Quote':>6}")
+        for host, s in sorted(self.stats.items()):
+            if not host:
+                continue
+            hits = s['hits'] + s['negative_hits']
+            total = hits + s['misses'] + s['expired']
+            rate = f"{hits / total:.0%}" if total else "-"
+            print(f"{host:<25} | {hits:>7} | {s['negative_hits']:>10} | {s['misses']:>6} | {s['expired']:>10} | {rate:>6}")
+        print(f"Einträge: {entries} (davon 'kein Treffer': {negatives}), verdrängt: {self.stats['']['evicted']}")
+
+
+_cache = ResponseCache()
+
+
+def get_cache() -> ResponseCache:
+    return _cache
+
+
+def fetch_json(url, params=None, timeout=5, is_empty=None):
+    """
+    GET mit Cache: liefert die JSON-Antwort aus api_cache.db oder fragt die API und merkt sie sich.
+    is_empty(data) markiert "kein Treffer" (wird mit NEGATIVE_TTL gespeichert).
+    Angefragt wird über http_client (Session-Pool, Rate-Limit, Retry, Tageskontingent).
+    HTTP-/Netzwerkfehler werden nicht gecacht und wie bei requests als Exception weitergereicht.
+    """
+    key = ResponseCache.make_key(url, params)
+    host = urlsplit(url).netloc.lower()
+    data = _cache.get(key, host)
+    if data is not _MISS:
+        return data
+
+    data = http_client.get(url, params=params, timeout=timeout).json()
+    _cache.put(key, data, host, negative=bool(is_empty and is_empty(data)))
+    return data
+
+
+if __name__ == "__main__":
+    get_cache().evict()
+    get_cache().report()
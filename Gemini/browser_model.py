@@ -14,9 +14,8 @@ from typing import List
 
 # --- Importe deiner spezialisierten Module ---
 try:
-    from Apps.book_data import BookData
+    from Apps.book_data import BookData, get_db
     from Apps.book_scanner import scan_single_book
-    from Apps.book_data import BookData
     from Gemini.file_utils import build_perfect_filename, sanitize_path
 
 except ImportError as e:
@@ -26,7 +25,8 @@ except ImportError as e:
 class BrowserModel:
     def __init__(self, db_path: str = None):
         # db_path wird meist global in BookData gehandhabt,nur für Testzwecke hier
-        pass
+        # Wir teilen uns die Verbindung mit BookData (gleicher ConnectionManager).
+        self.db = get_db(BookData.db_path)
 
     # ----------------------------------------------------------------------
     # DATEN-AGGREGATION
@@ -99,8 +99,9 @@ class BrowserModel:
     # SUCHE & NAVIGATION
     # ----------------------------------------------------------------------
     def search_books_in_db(self, author: str, title: str) -> List[str]:
-        results = BookData.search(author, title)
-        return [sanitize_path(b['file_path']) for b in results if b.get('file_path')]
+        # Reihenfolge kommt bereits nach Relevanz sortiert aus dem Volltextindex
+        results = BookData.search(title_term=title, author_term=author)
+        return [sanitize_path(b.path) for b in results if b.path]
 
     def parse_mismatch_report(self, report_path: str) -> List[str]:
         """Extrahiert Dateipfade aus einem Mismatch-Report (txt)."""
@@ -156,3 +157,22 @@ class BrowserModel:
                 from send2trash import send2trash
                 send2trash(data.path)
         return db_success
+
+    def delete_book_by_id(self, book_id) -> bool:
+        """Löscht einen DB-Eintrag, für den kein BookData-Objekt geladen werden konnte."""
+        try:
+            with self.db.transaction() as conn:
+                BookData.delete_dependents(conn, [int(book_id)])
+                cursor = conn.execute("DELETE FROM books WHERE id = ?", (int(book_id),))
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Fehler beim Löschen von ID {book_id}: {e}")
+            return False
+
+    def delete_book_by_path(self, path: str) -> bool:
+        """Löscht einen DB-Eintrag über seinen Pfad (Datei fehlt auf der Platte)."""
+        row = self.db.connection().execute(
+            "SELECT id FROM books WHERE path = ?", (BookData.normalize_path(path),)).fetchone()
+        if not row:
+            return False
+        return self.delete_book_by_id(row[0])
@@ -6,12 +6,12 @@ BESCHREIBUNG: Kümmert sich um die Darstellung in der Book_Browser App mit tkint
               browser_view.py	=	Die Maske: Zeichnet alles und fängt Benutzereingaben ab.
               browser_model.py	=	Das Gehirn: Muss die Methoden aggregate_book_data und save_book enthalten.
 """
-import io
 import os
 import tkinter as tk
-import fitz  # PyMuPDF
 from PIL import Image, ImageTk
 
+from Gemini.read_pdf import get_book_cover
+
 
 class BrowserView:
     def __init__(self, win):
@@ -125,7 +125,7 @@ class BrowserView:
     # 1. Display Coverbild
     # ----------------------------------------------------------------------
     def display_cover(self, image_path, current_file_path):
-        """Lädt Bilddatei oder extrahiert Cover aus PDF/EPUB via fitz."""
+        """Lädt Bilddatei oder das Cover der Buchdatei (PDF/EPUB/MOBI) über den Cover-Cache."""
         self.cover_label.config(image='', text='Lädt...')
         self.tk_img = None
         max_size = (310, 420)
@@ -141,19 +141,13 @@ class BrowserView:
                 img.thumbnail(max_size, Image.Resampling.LANCZOS)
                 self.tk_img = ImageTk.PhotoImage(img)
 
-            # Fall B: Extraktion aus Buchdatei (PDF oder EPUB)
+            # Fall B: Cover der Buchdatei (PDF, EPUB, MOBI) aus dem Cover-Cache – gerendert wird
+            # nur beim ersten Anzeigen einer Dateiversion, danach liegt das Thumbnail fertig da
             elif current_file_path and os.path.exists(current_file_path):
-                ext = current_file_path.lower()
-                if ext.endswith('.pdf') or ext.endswith('.epub') or ext.endswith('.mobi'):
-                    doc = fitz.open(current_file_path)
-                    # Erste Seite laden (bei EPUBs oft das Cover)
-                    page = doc.load_page(0)
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data))
+                img = get_book_cover(current_file_path)
+                if img:
                     img.thumbnail(max_size, Image.Resampling.LANCZOS)
                     self.tk_img = ImageTk.PhotoImage(img)
-                    doc.close()
 
             if self.tk_img:
                 # WICHTIG: width=0, height=0 damit das Bild die Größe bestimmt
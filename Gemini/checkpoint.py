@@ -0,0 +1,61 @@
+"""
+DATEI: checkpoint.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Zwischenstand langer Läufe (scan_ebooks, BookCleaner.deep_repair_library) als kleine JSON-Datei.
+              Gespeichert werden die letzte fertig gespeicherte Position (Pfad bzw. ID in Sortierreihenfolge),
+              die Zähler und die bisher gesammelten Mismatch-Einträge. Nach Absturz, Strg+C oder
+              abgehängtem Laufwerk setzt --resume genau dahinter fort; ein vollständiger Lauf löscht die Datei.
+"""
+import json
+import os
+import time
+
+from Gemini.file_utils import CHECKPOINT_DIR, sanitize_path
+
+
+class ScanCheckpoint:
+    """Ein Checkpoint pro Lauf-Art (task); gilt nur für denselben Start-Ordner."""
+
+    def __init__(self, task, base_path, directory=CHECKPOINT_DIR):
+        self.task = task
+        self.base_path = sanitize_path(base_path)
+        self.path = os.path.join(directory, f"checkpoint_{task}.json")
+
+    def load(self):
+        """Gespeicherter Stand als dict (position, counters, mismatches) oder None."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Checkpoint {self.path} nicht lesbar ({e}) – starte von vorn.")
+            return None
+        if state.get('base_path') != self.base_path:
+            print(f"⚠️ Checkpoint gehört zu {state.get('base_path')} – starte von vorn.")
+            return None
+        return state
+
+    def save(self, position, counters=None, mismatches=None):
+        """Schreibt atomar (tmp + replace): ein Abbruch mitten im Schreiben hinterlässt den alten Stand."""
+        state = {
+            'task': self.task,
+            'base_path': self.base_path,
+            'position': position,
+            'counters': dict(counters or {}),
+            'mismatches': list(mismatches or []),
+            'saved_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Checkpoint konnte nicht gespeichert werden: {e}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,272 @@
+"""
+DATEI: cover_cache.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Dauerhafter Cover-Cache neben der DB (COVER_CACHE_DIR) statt Temp-Dateien und
+              PDF-Rendering bei jeder Anzeige.
+              - Thumbnails als JPEG in zwei festen Größen, Dateiname = SHA-1 des Original-Covers
+                (gleiche Cover liegen nur einmal auf der Platte)
+              - Index covers.db: Buchdatei (Pfad + Größe + mtime) -> Hash; pro Dateiversion wird
+                das Cover nur einmal gelesen bzw. gerendert, auch "kein Cover" wird gemerkt
+              - Größenbudget mit LRU-Verdrängung, gc() räumt Cover ohne Buch auf
+
+              python -m Gemini.cover_cache   (Aufräumen + Statistik)
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from Gemini.file_utils import COVER_CACHE_DIR, file_fingerprint, sanitize_path
+
+
+class CoverCache:
+    """Content-adressierter Thumbnail-Speicher mit SQLite-Index."""
+    SIZES = {'thumb': (160, 220), 'view': (310, 420)}  # 'view' = Cover-Feld im Browser
+    JPEG_QUALITY = 85
+    MAX_BYTES = 500 * 1024 * 1024
+    EVICT_CHECK_EVERY = 200     # neue Cover zwischen zwei Budget-Checks
+    RENDER_ZOOM = 2.0           # PDF-Seite 1 in doppelter Auflösung rendern (wie bisher im Browser)
+
+    def __init__(self, directory=COVER_CACHE_DIR, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.enabled = True
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stored = 0
+
+    # ------------------------------------------------------------------
+    # INDEX
+    # ------------------------------------------------------------------
+    def _connection(self):
+        # Eigene Verbindung pro Prozess (der Scanner extrahiert auch in Worker-Prozessen)
+        if self._conn is None or self._pid != os.getpid():
+            # Nur den Cover-Ordner anlegen: fehlt db_root (Laufwerk nicht da), bleibt der Cache aus
+            if not os.path.isdir(self.directory):
+                os.mkdir(self.directory)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "covers.db"),
+                                         check_same_thread=False, timeout=10)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    hash TEXT              -- NULL = Datei hat kein Cover
+                );
+                CREATE INDEX IF NOT EXISTS idx_sources_hash ON sources(hash);
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    bytes INTEGER,
+                    last_used REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs(last_used);
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def _disable(self, error):
+        """Ohne Cache weiterarbeiten (Ordner fehlt, Platte voll ...) statt den Scan scheitern zu lassen."""
+        print(f"⚠️ Cover-Cache deaktiviert ({self.directory}): {error}")
+        self.enabled = False
+
+    def thumb_path(self, content_hash, size='view'):
+        return os.path.join(self.directory, content_hash[:2], f"{content_hash}_{size}.jpg")
+
+    def _has_thumbs(self, content_hash):
+        return all(os.path.exists(self.thumb_path(content_hash, size)) for size in self.SIZES)
+
+    # ------------------------------------------------------------------
+    # COVER HOLEN
+    # ------------------------------------------------------------------
+    def cover_for(self, book_path, loader, size='view'):
+        """
+        Thumbnail-Pfad für eine Buchdatei oder None.
+        loader() liefert die Bilddaten (bytes) und wird nur aufgerufen, wenn diese Dateiversion
+        noch nicht im Index steht.
+        """
+        if not self.enabled:
+            return None
+        key = sanitize_path(book_path)
+        fingerprint = file_fingerprint(book_path)
+        if fingerprint is None:
+            return None
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT size, mtime_ns, hash FROM sources WHERE path = ?", (key,)).fetchone()
+            if row and tuple(row[:2]) == fingerprint[:2]:
+                if row[2] is None:
+                    return None
+                if self._has_thumbs(row[2]):
+                    self._touch(row[2])
+                    return self.thumb_path(row[2], size)
+
+            data = loader()
+            content_hash = self.store(data) if data else None
+            with self._lock:
+                conn = self._connection()
+                conn.execute("INSERT OR REPLACE INTO sources (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                             (key, fingerprint[0], fingerprint[1], content_hash))
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            self._disable(e)
+            return None
+        return self.thumb_path(content_hash, size) if content_hash else None
+
+    def store(self, image_bytes):
+        """Legt die Thumbnails für ein Bild an (falls noch nicht vorhanden) und gibt den Inhalts-Hash zurück."""
+        content_hash = hashlib.sha1(image_bytes).hexdigest()
+        if self._has_thumbs(content_hash):
+            self._touch(content_hash)
+            return content_hash
+        try:
+            img = Image.open(io.BytesIO(image_bytes))
+            img.draft('RGB', max(self.SIZES.values()))  # JPEG gleich verkleinert dekodieren
+            img = img.convert('RGB')
+        except Exception:
+            return None  # kein lesbares Bild -> wie "kein Cover"
+
+        os.makedirs(os.path.dirname(self.thumb_path(content_hash)), exist_ok=True)
+        total = 0
+        # Größte zuerst, die kleineren davon ableiten
+        for size, box in sorted(self.SIZES.items(), key=lambda item: -item[1][0]):
+            img.thumbnail(box, Image.Resampling.LANCZOS)
+            target = self.thumb_path(content_hash, size)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            img.save(tmp, "JPEG", quality=self.JPEG_QUALITY, optimize=True)
+            os.replace(tmp, target)
+            total += os.path.getsize(target)
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO blobs (hash, bytes, last_used) VALUES (?, ?, ?)",
+                         (content_hash, total, time.time()))
+            conn.commit()
+            self._stored += 1
+            if self._stored % self.EVICT_CHECK_EVERY == 0:
+                self._evict(conn)
+        return content_hash
+
+    def _touch(self, content_hash):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE blobs SET last_used = ? WHERE hash = ?", (time.time(), content_hash))
+            conn.commit()
+
+    def rename_source(self, old_path, new_path):
+        """Nach dem Umbenennen der Buchdatei (gleiche Datei, gleicher mtime) den Index mitziehen."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("UPDATE OR REPLACE sources SET path = ? WHERE path = ?",
+                             (sanitize_path(new_path), sanitize_path(old_path)))
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            self._disable(e)
+
+    # ------------------------------------------------------------------
+    # AUFRÄUMEN
+    # ------------------------------------------------------------------
+    def _delete_blobs(self, conn, hashes):
+        for content_hash in hashes:
+            for size in self.SIZES:
+                try:
+                    os.remove(self.thumb_path(content_hash, size))
+                except OSError:
+                    pass
+        conn.executemany("DELETE FROM blobs WHERE hash = ?", [(h,) for h in hashes])
+        # Buchdateien, deren Cover weg ist, werden beim nächsten Zugriff neu extrahiert
+        conn.executemany("DELETE FROM sources WHERE hash = ?", [(h,) for h in hashes])
+
+    def _evict(self, conn):
+        """Am längsten nicht angezeigte Cover löschen, bis das Größenbudget wieder passt."""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0]
+        victims = []
+        if total > self.max_bytes:
+            for content_hash, size in conn.execute("SELECT hash, bytes FROM blobs ORDER BY last_used"):
+                victims.append(content_hash)
+                total -= size
+                if total <= self.max_bytes * 0.9:  # etwas Luft, damit nicht bei jedem Cover geräumt wird
+                    break
+            self._delete_blobs(conn, victims)
+        conn.commit()
+        return len(victims)
+
+    def evict(self):
+        with self._lock:
+            return self._evict(self._connection())
+
+    def gc(self, live_paths=None):
+        """
+        Entfernt Index-Einträge für Buchdateien, die es nicht mehr gibt (bzw. die nicht in live_paths
+        stehen, z.B. alle Pfade aus der DB), danach alle Cover ohne Buch und verwaiste Dateien im Ordner.
+        """
+        live = {sanitize_path(p) for p in live_paths} if live_paths is not None else None
+        with self._lock:
+            conn = self._connection()
+            paths = [row[0] for row in conn.execute("SELECT path FROM sources")]
+            dead = [p for p in paths if (p not in live if live is not None else not os.path.exists(p))]
+            conn.executemany("DELETE FROM sources WHERE path = ?", [(p,) for p in dead])
+            orphans = [row[0] for row in conn.execute(
+                "SELECT hash FROM blobs WHERE hash NOT IN (SELECT hash FROM sources WHERE hash IS NOT NULL)")]
+            self._delete_blobs(conn, orphans)
+            conn.commit()
+            known = {row[0] for row in conn.execute("SELECT hash FROM blobs")}
+
+        # Reste abgebrochener Schreibvorgänge oder gelöschter Index-Einträge
+        stray = 0
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.split('_', 1)[0] not in known or entry.name.endswith('.tmp'):
+                    os.remove(entry.path)
+                    stray += 1
+        return {'sources': len(dead), 'covers': len(orphans), 'files': stray}
+
+    def report(self):
+        with self._lock:
+            conn = self._connection()
+            sources, without = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hash IS NULL), 0) FROM sources").fetchone()
+            covers, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM blobs").fetchone()
+        print(f"--- COVER-CACHE ({self.directory}) ---")
+        print(f"Buchdateien: {sources} (ohne Cover: {without}), verschiedene Cover: {covers}, "
+              f"Größe: {total / 1024 / 1024:.1f} MB von {self.max_bytes / 1024 / 1024:.0f} MB")
+
+
+# ----------------------------------------------------------------------
+# LOADER
+# ----------------------------------------------------------------------
+def render_first_page(file_path, zoom=CoverCache.RENDER_ZOOM):
+    """Seite 1 einer PDF/EPUB/MOBI-Datei als PNG-Bytes (fitz)."""
+    doc = fitz.open(file_path)
+    try:
+        page = doc.load_page(0)
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+    finally:
+        doc.close()
+
+
+_cover_cache = CoverCache()
+
+
+def get_cover_cache() -> CoverCache:
+    return _cover_cache
+
+
+if __name__ == "__main__":
+    print(get_cover_cache().gc())
+    get_cover_cache().evict()
+    get_cover_cache().report()
@@ -160,6 +160,210 @@ def update_database_structure():
     conn.commit()
     conn.close()
 
+# ----------------------------------------------------------------------
+# VERSIONIERTE MIGRATIONEN (PRAGMA user_version)
+# ----------------------------------------------------------------------
+# Typische Abfragen aus book_data.py, deren Query-Plan wir vor/nach der Migration vergleichen
+PLAN_QUERIES = [
+    ("load_by_path", "SELECT * FROM books WHERE path = ?", ("x",)),
+    ("Autor suchen", "SELECT id FROM authors WHERE firstname = ? AND lastname = ?", ("x", "y")),
+    ("Autoren eines Buchs", "SELECT author_id FROM book_authors WHERE book_id = ?", (1,)),
+    ("Bücher eines Autors", "SELECT book_id FROM book_authors WHERE author_id = ?", (1,)),
+    ("ISBN", "SELECT id FROM books WHERE isbn = ?", ("x",)),
+    ("Serie + Sprache", "SELECT id FROM books WHERE series_name = ? AND language = ?", ("x", "de")),
+]
+
+
+def get_query_plans(conn):
+    """Liefert {Name: Query-Plan-Text} für die typischen Abfragen."""
+    plans = {}
+    for name, sql, params in PLAN_QUERIES:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        plans[name] = " | ".join(row[-1] for row in rows)
+    return plans
+
+
+def _migration_1_indexes(cursor):
+    """Dubletten bereinigen, danach Indizes und eindeutige Pfade anlegen."""
+    # 1. Leere Pfade (als fehlend markierte Bücher) auf NULL setzen, sonst kollidieren sie im UNIQUE-Index
+    cursor.execute("UPDATE books SET path = NULL WHERE path = ''")
+    print(f"  {cursor.rowcount} leere Pfade auf NULL gesetzt.")
+
+    # 2. Doppelte Pfade: Wir behalten den vollständigsten Eintrag (is_complete), sonst die kleinste ID
+    cursor.execute("""
+        CREATE TEMP TABLE dup_books AS
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY path ORDER BY COALESCE(is_complete, 0) DESC, id
+            ) AS rn
+            FROM books WHERE path IS NOT NULL
+        ) WHERE rn > 1
+    """)
+    cursor.execute("DELETE FROM book_authors WHERE book_id IN (SELECT id FROM temp.dup_books)")
+    cursor.execute("DELETE FROM books WHERE id IN (SELECT id FROM temp.dup_books)")
+    print(f"  {cursor.rowcount} doppelte Buch-Einträge (gleicher Pfad) entfernt.")
+    cursor.execute("DROP TABLE temp.dup_books")
+
+    # 3. Exakt doppelte Verknüpfungen (gleiches Buch, gleicher Autor) entfernen
+    cursor.execute("""
+        DELETE FROM book_authors WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM book_authors GROUP BY book_id, author_id
+        )
+    """)
+    print(f"  {cursor.rowcount} doppelte Autor-Verknüpfungen entfernt.")
+
+    # 4. Indizes
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_books_path ON books(path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_authors_name ON authors(firstname, lastname)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_book_authors_book ON book_authors(book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_book_authors_author ON book_authors(author_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_series_lang ON books(series_name, language)")
+
+
+# Autoren eines Buchs als ein Text ("Vorname Nachname Vorname2 Nachname2") für den Volltext-Index
+FTS_AUTHORS_SQL = """
+    (SELECT group_concat(TRIM(COALESCE(a.firstname, '') || ' ' || COALESCE(a.lastname, '')), ' ')
+     FROM book_authors ba JOIN authors a ON a.id = ba.author_id
+     WHERE ba.book_id = {book_id})
+"""
+
+
+def _migration_2_fulltext(cursor):
+    """FTS5-Volltextindex über Titel, Serie, Autoren, Keywords und Beschreibung (per Trigger synchron)."""
+    # unicode61 + remove_diacritics: "Émile" findet auch "emile"; prefix-Indizes für schnelle "abc*"-Suche
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, series_name, authors, keywords, description,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    authors_new = FTS_AUTHORS_SQL.format(book_id="NEW.id")
+    # books -> books_fts
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, series_name, authors, keywords, description)
+            VALUES (NEW.id, NEW.title, NEW.series_name, {authors_new}, NEW.keywords, NEW.description);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, series_name, keywords, description ON books BEGIN
+            DELETE FROM books_fts WHERE rowid = OLD.id;
+            INSERT INTO books_fts (rowid, title, series_name, authors, keywords, description)
+            VALUES (NEW.id, NEW.title, NEW.series_name, {authors_new}, NEW.keywords, NEW.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            DELETE FROM books_fts WHERE rowid = OLD.id;
+        END
+    """)
+    # book_authors -> Autoren-Spalte des Buchs neu aufbauen
+    for name, event, ref in [("books_fts_ba_ai", "INSERT", "NEW"), ("books_fts_ba_ad", "DELETE", "OLD")]:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON book_authors BEGIN
+                UPDATE books_fts SET authors = {FTS_AUTHORS_SQL.format(book_id=f"{ref}.book_id")}
+                WHERE rowid = {ref}.book_id;
+            END
+        """)
+    # Bestand einmalig übernehmen
+    cursor.execute("DELETE FROM books_fts")
+    cursor.execute(f"""
+        INSERT INTO books_fts (rowid, title, series_name, authors, keywords, description)
+        SELECT b.id, b.title, b.series_name, {FTS_AUTHORS_SQL.format(book_id="b.id")}, b.keywords, b.description
+        FROM books b
+    """)
+    print(f"  {cursor.rowcount} Bücher in den Volltextindex übernommen.")
+
+
+def _migration_3_folder(cursor):
+    """Generierte Spalte folder (Ordner des Pfads) + Index, für GROUP BY / Gleichheitssuche pro Ordner."""
+    # SQL-Variante von path.rsplit('/', 1)[0]: rtrim entfernt alle Nicht-Slash-Zeichen bis zum letzten '/'
+    norm = "replace(path, '\\', '/')"
+    cursor.execute(f"""
+        ALTER TABLE books ADD COLUMN folder TEXT
+        GENERATED ALWAYS AS (rtrim(rtrim({norm}, replace({norm}, '/', '')), '/')) VIRTUAL
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_folder ON books(folder)")
+
+
+def _migration_4_fingerprint(cursor):
+    """Spalten für den Datei-Fingerabdruck (Größe, mtime_ns, Inode) – der Scanner überspringt unveränderte Dateien."""
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(books)")}
+    for col_name in ("file_size", "file_mtime_ns", "file_inode"):
+        if col_name not in existing:
+            cursor.execute(f"ALTER TABLE books ADD COLUMN {col_name} INTEGER")
+
+
+def _migration_5_enrichment_jobs(cursor):
+    """Warteschlange für die API-Anreicherung: der Scan trägt ein, Apps/enrichment_worker.py arbeitet ab."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_jobs (
+            book_id INTEGER PRIMARY KEY,              -- books.id; gelöscht über BookData.delete_dependents
+            status TEXT NOT NULL DEFAULT 'pending',   -- pending / running / done / failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_retry REAL NOT NULL DEFAULT 0,       -- Unix-Zeit, vorher nicht anfassen
+            last_error TEXT,
+            updated REAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrichment_jobs_due ON enrichment_jobs(status, next_retry)")
+
+
+# (Version, Beschreibung, Funktion) – neue Migrationen einfach hinten anhängen
+MIGRATIONS = [
+    (1, "Indizes auf path, authors, book_authors, isbn, series_name/language", _migration_1_indexes),
+    (2, "FTS5-Volltextsuche (books_fts) mit Triggern", _migration_2_fulltext),
+    (3, "Generierte Spalte books.folder mit Index", _migration_3_folder),
+    (4, "Datei-Fingerabdruck (file_size, file_mtime_ns, file_inode)", _migration_4_fingerprint),
+    (5, "Tabelle enrichment_jobs (API-Warteschlange)", _migration_5_enrichment_jobs),
+]
+
+
+def migrate_database(conn=None):
+    """
+    Führt alle Migrationen aus, deren Version größer als PRAGMA user_version ist.
+    Jede Migration läuft in einer eigenen Transaktion und setzt danach user_version hoch.
+    Am Ende wird der Query-Plan der typischen Abfragen vorher/nachher ausgegeben.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        pending = [m for m in MIGRATIONS if m[0] > current]
+        if not pending:
+            print(f"DB ist aktuell (Schema-Version {current}).")
+            return current
+
+        plans_before = get_query_plans(conn)
+        for version, description, migration in pending:
+            print(f"Migration {version}: {description} ...")
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                current = version
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"❌ Migration {version} fehlgeschlagen: {e}")
+                break
+        conn.execute("ANALYZE")  # Statistiken für den Query-Planer auffrischen
+        plans_after = get_query_plans(conn)
+
+        print("\n--- QUERY-PLAN VORHER -> NACHHER ---")
+        for name, _, _ in PLAN_QUERIES:
+            print(f"{name}:\n  vorher:  {plans_before[name]}\n  nachher: {plans_after[name]}")
+        return current
+    finally:
+        if own_conn:
+            conn.close()
+
+
 def update_book_paths():
     # Verbindung zur Datenbank
     conn = sqlite3.connect(DB_PATH)
@@ -334,6 +538,7 @@ if __name__ == "__main__":
 
     # Aufruf für weitere Funktionen
     update_database_structure()
+    migrate_database()
     # update_book_paths()
 
     # Direkte Datenbankabfrage
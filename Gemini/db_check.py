@@ -1,14 +1,19 @@
+import argparse
 import os
 from tqdm import tqdm
 from collections import defaultdict
 from Apps.book_data import BookData
-from Apps.book_scanner import scan_single_book, mismatch_list, write_mismatch_report
+from Apps.book_scanner import scan_single_book, record_mismatch, write_mismatch_report
+from Apps.book_scanner import get_mismatches, restore_mismatches
+from Gemini.checkpoint import ScanCheckpoint
+from Gemini.discovery import iter_dirs
 from Gemini.read_epub import get_epub_metadata
 from Gemini.read_file import detect_real_extension, is_mobi_readable
-from file_utils import sanitize_path
+from Gemini.file_utils import sanitize_path
 
 
 class BookCleaner:
+    BATCH_SIZE = 500  # Bücher pro Transaktion bei BookData.save_many
 
     @staticmethod
     def intelligent_rescan(base_path):
@@ -17,12 +22,14 @@ class BookCleaner:
         db_counts = BookData.get_book_counts_per_folder(base_path)
         print(f"In der DB sind {len(db_counts)} Ordner")
         stats = {"added": 0, "cleaned": 0}
+        to_save = []
 
-        for root, dirs, files in os.walk(base_path):
-            book_files = [f for f in files if f.lower().endswith(('.epub', '.pdf', '.mobi'))]
+        for root, entries in iter_dirs(base_path):
+            book_files = [e.name for e in entries]
             if not book_files: continue
 
-            norm_root = os.path.abspath(os.path.normpath(root))
+            # Gleiche Schreibweise wie in der DB (NFC, '/'), sonst findet der Ordner-Vergleich nichts
+            norm_root = sanitize_path(os.path.abspath(root))
             ll = db_counts.get(norm_root, 0)
             if len(book_files) == ll:
                 print(f"-  {norm_root} ist ok")
@@ -30,78 +37,130 @@ class BookCleaner:
             print(f"-  {norm_root} synchronising.. {len(book_files)} vs. {ll}")
             # Synchronisation bei Differenz
             paths_in_db = BookData.get_all_paths_in_folder(norm_root)
-            set_disk = set([os.path.abspath(os.path.join(norm_root, f)) for f in book_files])
-            set_db = set([os.path.abspath(p) for p in paths_in_db])
+            set_disk = set([sanitize_path(os.path.join(norm_root, f)) for f in book_files])
+            set_db = set([sanitize_path(p) for p in paths_in_db])
 
             # Neue hinzufügen
             for path in (set_disk - set_db):
-                if scan_single_book(path): stats["added"] += 1
+                book = scan_single_book(path)
+                if book:
+                    to_save.append(book)
+                    stats["added"] += 1
 
             # Fehlende bereinigen
             for path in (set_db - set_disk):
-                if BookCleaner.cleanup_missing_book(path): stats["cleaned"] += 1
+                book = BookCleaner.mark_missing_book(path)
+                if book:
+                    to_save.append(book)
+                    stats["cleaned"] += 1
 
+            if len(to_save) >= BookCleaner.BATCH_SIZE:
+                BookData.save_many(to_save, batch_size=BookCleaner.BATCH_SIZE)
+                to_save = []
+
+        BookData.save_many(to_save, batch_size=BookCleaner.BATCH_SIZE)
         write_mismatch_report(base_path)
         return stats
 
     @staticmethod
-    def deep_repair_library(base_path):
+    def deep_repair_library(base_path, resume=False):
         """
         Deine bisherige repair_total_library, jetzt als Methode der Klasse.
         Prüft JEDES Buch auf Existenz und EPUB-Korruptheit.
+        Alle BATCH_SIZE Bücher wird gespeichert und ein Checkpoint (letzte ID, Zähler, Mismatches)
+        geschrieben; resume=True setzt dahinter fort. Die ID statt des Pfads als Position, weil
+        der Lauf selbst Pfade ändert (Endungs-Korrektur) – die ID-Reihenfolge bleibt stabil.
         """
         print(f"--- START DEEP REPAIR SCAN ---")
-        all_books = BookData.search_sql("SELECT id, path FROM books")
-        fixes = 0
-        cleaned = 0
-
-        for book in tqdm(all_books, desc="Deep Repair", unit="Buch"):
+        checkpoint = ScanCheckpoint('deep_repair', base_path)
+        state = checkpoint.load() if resume else None
+        counters = {'fixes': 0, 'cleaned': 0}
+        last_id = 0
+        if state:
+            last_id = state['position']
+            counters.update(state['counters'])
+            restore_mismatches(state['mismatches'])
+            print(f"Fortsetzen nach ID {last_id} (Stand {state['saved_at']}).")
+        # Nur id/path gebraucht -> leichte BookRow-Ansichten statt voller BookData-Objekte
+        all_books = BookData.iter_all(columns="id, path", as_rows=True, after_id=last_id)
+        to_save = []
+        since_checkpoint = 0
+
+        for row in tqdm(all_books, total=BookData.count_books("id > ?", (last_id,)), desc="Deep Repair", unit="Buch"):
+            # Position vom Vorgänger: erst wenn to_save gespeichert ist, gilt sie als erledigt
+            if since_checkpoint >= BookCleaner.BATCH_SIZE:
+                BookData.save_many(to_save, batch_size=BookCleaner.BATCH_SIZE)
+                to_save = []
+                checkpoint.save(last_id, counters, get_mismatches())
+                since_checkpoint = 0
+            last_id = row.id
+            since_checkpoint += 1
+            path = row.path
             # 1. Existenz-Check
-            if not book.path or not os.path.exists(book.path):
-                if BookCleaner.cleanup_missing_book(book.path, book):
-                    cleaned += 1
+            if not path:
+                continue  # Bereits als fehlend markiert
+            if not os.path.exists(path):
+                if not os.path.isdir(base_path):
+                    # Laufwerk/Freigabe weg: sonst würde jedes weitere Buch als fehlend markiert
+                    BookData.save_many(to_save, batch_size=BookCleaner.BATCH_SIZE)
+                    print(f"❌ {base_path} ist nicht mehr erreichbar – Abbruch. Fortsetzen mit --resume.")
+                    return counters
+                # Hier nur id/path geladen -> das volle Objekt holt mark_missing_book über den Pfad
+                missing = BookCleaner.mark_missing_book(path)
+                if missing:
+                    to_save.append(missing)
+                    counters['cleaned'] += 1
                 continue
             # 2. Realen Typ bestimmen (Magic Bytes)
-            real_ext = detect_real_extension(book.path)
-            current_ext = os.path.splitext(book.path)[1].lower()
+            real_ext = detect_real_extension(path)
+            current_ext = os.path.splitext(path)[1].lower()
             # 3. Wenn Endung falsch ist -> Reparieren statt Löschen!
             if real_ext and real_ext != current_ext:
-                new_path = book.path.replace(current_ext, real_ext)
-                fixes += 1
-                if BookData.fix_path_ext(book.path, new_path):
+                new_path = path.replace(current_ext, real_ext)
+                counters['fixes'] += 1
+                if BookData.fix_path_ext(path, new_path):
                     print(f"🔧 Endung korrigiert: {os.path.basename(new_path)} (war {current_ext})")
-                    book.path = new_path  # Update für den nächsten Schritt
+                    path = new_path  # Update für den nächsten Schritt
                     current_ext = real_ext
             # 4. Inhalts-Check (Korruptionsprüfung)
             if current_ext == '.epub':
-                result = get_epub_metadata(book.path)
+                result = get_epub_metadata(path)
                 if result is None:
-                    cleaned += 1
-                    BookCleaner.delete_corrupt_book(book)
+                    counters['cleaned'] += 1
+                    BookCleaner.delete_corrupt_book(BookData(id=row.id, path=path))
                 elif current_ext in ['.mobi', '.azw3']:
-                    if not is_mobi_readable(book.path):
-                        cleaned += 1
-                        BookCleaner.delete_corrupt_book(book)
+                    if not is_mobi_readable(path):
+                        counters['cleaned'] += 1
+                        BookCleaner.delete_corrupt_book(BookData(id=row.id, path=path))
 
+        BookData.save_many(to_save, batch_size=BookCleaner.BATCH_SIZE)
+        checkpoint.clear()
         write_mismatch_report(base_path)
         BookData.vacuum()
-        print(f"✅ Deep Repair beendet. Fixes: {fixes}, Bereinigt: {cleaned}")
-        return {"fixes": fixes, "cleaned": cleaned}
+        print(f"✅ Deep Repair beendet. Fixes: {counters['fixes']}, Bereinigt: {counters['cleaned']}")
+        return counters
 
     # --- PRIVATE HILFSMETHODEN (Interne Logik) ---
 
     @staticmethod
     def cleanup_missing_book(path, book_obj=None):
         """Setzt Pfad auf leer und schreibt Notiz."""
+        full_book = BookCleaner.mark_missing_book(path, book_obj)
+        if full_book:
+            return full_book.save()
+        return False
+
+    @staticmethod
+    def mark_missing_book(path, book_obj=None):
+        """Wie cleanup_missing_book, speichert aber nicht (für BookData.save_many)."""
         full_book = book_obj if (book_obj and hasattr(book_obj, 'notes')) else BookData.load_by_path(path)
         if full_book:
             old_path = path if path else "Kein Pfad"
             msg = f"Datei fehlt bei Scan: {old_path}"
             full_book.notes = f"{full_book.notes}\n{msg}".strip() if full_book.notes else msg
             full_book.path = ""
-            mismatch_list.append({'Buch-ID': full_book.id, 'full_path': old_path, 'note': "DATEI FEHLT"})
-            return full_book.save()
-        return False
+            record_mismatch({'Buch-ID': full_book.id, 'full_path': old_path, 'note': "DATEI FEHLT"})
+        return full_book
 
     @staticmethod
     def delete_corrupt_book(book):
@@ -125,20 +184,20 @@ class BookCleaner:
         Gibt eine Liste von Verzeichnissen mit Buch-Anzahl und Status zurück.
         """
         print("Lade Daten für Verzeichnis-Report...")
-        all_books = BookData.search()
-        dir_map = defaultdict(list)
+        dir_map = defaultdict(int)
 
-        for book in all_books:
-            if book.path:
-                directory = os.path.dirname(book.path)
-                dir_map[directory].append(book)
+        # Nur die Pfade streamen und zählen, statt alle Bücher als Objekte zu laden
+        for (path,) in BookData.iter_all(columns="path", raw=True):
+            if path:
+                directory = os.path.dirname(path)
+                dir_map[directory] += 1
 
         report = []
-        for directory, books in dir_map.items():
+        for directory, count in dir_map.items():
             exists = os.path.exists(directory)
             report.append({
                 "directory": directory,
-                "count": len(books),
+                "count": count,
                 "exists": exists
             })
 
@@ -162,7 +221,7 @@ class BookCleaner:
         Stufe 2: Massen-Update.
         Nutzt deine BookData.update_file_path Logik für maximale Sicherheit.
         """
-        all_books = BookData.search()
+        all_books = BookData.iter_all(columns="id, path", as_rows=True)
         affected = [b for b in all_books if b.path and b.path.startswith(old_prefix)]
 
         if not affected:
@@ -193,7 +252,7 @@ class BookCleaner:
         Gibt Gruppen von Büchern mit gleicher ISBN aus.
         """
         print("Suche nach ISBN-Dubletten...")
-        all_books = BookData.search()
+        all_books = BookData.iter_all(columns="id, isbn, path", as_rows=True)
         isbn_map = defaultdict(list)
 
         for book in all_books:
@@ -206,7 +265,7 @@ class BookCleaner:
                 # Wir prüfen, ob es wirklich unterschiedliche Pfade sind
                 # (Mehrere Autoren bei gleichem Pfad sind ja ok)
                 paths = {b.path for b in books if b.path}
-                if len(paths) > 1 or any(not os.path.exists(b.path) for b in books):
+                if len(paths) > 1 or any(not b.path or not os.path.exists(b.path) for b in books):
                     report.append((isbn, books))
 
         if not report:
@@ -228,7 +287,7 @@ class BookCleaner:
         Berücksichtigt, dass mehrere Autoren die gleiche ISBN haben dürfen.
         """
         print("Analysiere ISBN-Dubletten...")
-        all_books = BookData.search()
+        all_books = BookData.iter_all(columns="id, isbn, title, path")
         isbn_map = defaultdict(list)
 
         # Gruppiere alle Bücher nach ISBN
@@ -253,7 +312,7 @@ class BookCleaner:
                     entry_group.append({
                         "id": b.id,
                         "title": b.title,
-                        "author": b.author,
+                        "author": " & ".join(f"{f} {l}".strip() for f, l in b.authors),
                         "path": b.path,
                         "exists": path_exists
                     })
@@ -299,5 +358,16 @@ if __name__ == "__main__":
 
     # 3. Danach die Dubletten-Prüfung
     # analyser.find_isbn_duplicates()
-    target_path = sanitize_path("D:/Bücher/Deutsch/_byGenre")
-    analyser.intelligent_rescan(target_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Datenbank mit dem Dateisystem abgleichen.")
+    parser.add_argument("path", nargs="?", default="D:/Bücher/Deutsch/_byGenre", help="Start-Ordner")
+    parser.add_argument("--deep-repair", action="store_true",
+                        help="Jedes Buch auf Existenz, Endung und Korruptheit prüfen statt Ordner-Abgleich")
+    parser.add_argument("--resume", action="store_true",
+                        help="Abgebrochenen Deep Repair hinter dem letzten Checkpoint fortsetzen")
+    args = parser.parse_args()
+
+    target_path = sanitize_path(args.path)
+    if args.deep_repair:
+        analyser.deep_repair_library(target_path, resume=args.resume)
+    else:
+        analyser.intelligent_rescan(target_path)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+DATEI: discovery.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Gemeinsame Dateisuche für Scanner und Reparatur-Werkzeuge auf Basis von os.scandir.
+              Statt mit os.walk erst die komplette Liste zu bauen (auf dem SMB-Laufwerk minutenlang
+              ohne Ausgabe), werden die Dateien geliefert, sobald ihr Ordner gelesen ist.
+              - Die DirEntry-Objekte bringen Typ (und unter Windows auch stat) aus dem Listing mit
+              - Filter nach Endung, Spiegel-Ordner (_byGenre, ...) können ausgelassen werden
+              - iter_files liefert in derselben Reihenfolge wie sorted() über die vollen Pfade
+                (wichtig für den Checkpoint von scan_ebooks)
+              - progress(): Fortschrittsbalken mit geschätzter Gesamtzahl (z.B. Anzahl in der DB)
+"""
+import os
+
+from tqdm import tqdm
+
+EBOOK_EXTENSIONS = ('.epub', '.pdf', '.mobi')
+# Sortier-Spiegel der Bibliothek (gleiche Bücher, zweiter Pfad)
+MIRROR_DIRS = ('_byGenre', '_byRegion', '_sortiertGenre', '_sortierteRegion')
+
+
+def _list_dir(path, extensions, prune):
+    """
+    Liest einen Ordner: ([(sortierschlüssel, entry, ist_ordner)], ...) nach Namen sortiert.
+    Ordner bekommen os.sep an den Schlüssel – so entspricht die Tiefensuche genau der
+    Sortierung der vollen Pfade ('Band 1' / 'Band 1-2' / 'Band 1/...').
+    """
+    try:
+        with os.scandir(path) as it:
+            raw = list(it)
+    except OSError as e:
+        tqdm.write(f"  WARN: Ordner nicht lesbar: {path} ({e})")
+        return []
+    entries = []
+    for entry in raw:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            continue
+        if is_dir:
+            # Wie os.walk: verlinkte Ordner nicht betreten
+            if entry.name in prune or entry.is_symlink():
+                continue
+            entries.append((entry.name + os.sep, entry, True))
+        elif extensions is None or entry.name.lower().endswith(extensions):
+            entries.append((entry.name, entry, False))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def iter_files(base, extensions=EBOOK_EXTENSIONS, prune=()):
+    """
+    Liefert os.DirEntry für alle passenden Dateien unter base, sortiert nach vollem Pfad.
+    extensions=None: alle Dateien. prune: Ordnernamen, die samt Inhalt übersprungen werden
+    (nur unterhalb von base – wer direkt in _byGenre startet, bekommt ihn trotzdem).
+    Im Speicher liegt nur das Listing der Ordner auf dem aktuellen Weg.
+    """
+    for _, entry, is_dir in _list_dir(base, extensions, prune):
+        if is_dir:
+            yield from iter_files(entry.path, extensions, prune)
+        else:
+            yield entry
+
+
+def iter_dirs(base, extensions=EBOOK_EXTENSIONS, prune=()):
+    """Ordnerweise Variante: (ordner, [DirEntry der passenden Dateien]) – auch für Ordner ohne Treffer."""
+    listing = _list_dir(base, extensions, prune)
+    yield base, [entry for _, entry, is_dir in listing if not is_dir]
+    for _, entry, is_dir in listing:
+        if is_dir:
+            yield from iter_dirs(entry.path, extensions, prune)
+
+
+def progress(iterable, estimate=None, **tqdm_kwargs):
+    """
+    tqdm über einen Strom unbekannter Länge: estimate ist nur die Startschätzung.
+    Läuft der Strom darüber hinaus, wächst total mit; am Ende steht total auf der echten Anzahl.
+    """
+    bar = tqdm(total=estimate or None, **tqdm_kwargs)
+    try:
+        for item in iterable:
+            bar.update(1)
+            if bar.total and bar.n > bar.total:
+                bar.total = bar.n
+                bar.refresh()
+            yield item
+        bar.total = bar.n
+        bar.refresh()
+    finally:
+        bar.close()
@@ -0,0 +1,203 @@
+"""
+DATEI: enrichment.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Asynchrone API-Anreicherung (Google Books + Open Library) für viele Bücher gleichzeitig.
+              Jedes Buch läuft als eigene Kette (ISBN-Suche -> Details -> ggf. Open Library),
+              pro Anbieter sind höchstens N Anfragen gleichzeitig unterwegs.
+              Übernommen wird mit denselben merge-Funktionen wie bei enrich_from_google_books /
+              enrich_from_open_library. Die URLs sind einstellbar (z.B. lokaler Stub-Server zum Testen).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from tqdm import tqdm
+
+from Gemini import google_books as gb
+from Gemini import open_library as ol
+from Gemini.api_cache import fetch_json
+from Gemini.http_client import QuotaExceeded
+from Gemini.scan_stats import get_stats, stage
+
+
+def has_valid_isbn(book_data) -> bool:
+    """Gleiche Regel wie im Scanner: mit brauchbarer ISBN werden keine APIs gefragt."""
+    isbn = getattr(book_data, 'isbn', None)
+    return bool(isbn) and len(str(isbn).strip()) > 5
+
+
+def has_local_metadata(book_data) -> bool:
+    """Serie aus gepflegten EPUB-Metadaten (Calibre/EPUB3) plus Beschreibung und Jahr: die APIs brächten kaum mehr."""
+    return bool(getattr(book_data, 'series_source', None)
+                and getattr(book_data, 'description', None) and getattr(book_data, 'year', None))
+
+
+def needs_api(book_data) -> bool:
+    """Google Books/Open Library nur ohne brauchbare ISBN und ohne vollständige lokale Metadaten."""
+    return not (has_valid_isbn(book_data) or has_local_metadata(book_data))
+
+
+class EnrichmentEngine:
+    """Reichert BookData-Objekte nebenläufig über Google Books und Open Library an."""
+
+    def __init__(self, google_limit=4, ol_limit=2,
+                 google_url=None, ol_api_url=None, ol_search_url=None, raise_errors=False):
+        self.google_limit = google_limit
+        self.ol_limit = ol_limit
+        # raise_errors=True: Netzwerk-/HTTP-Fehler nicht als "nichts gefunden" schlucken,
+        # sondern pro Buch melden (die Job-Queue plant dann einen neuen Versuch)
+        self.raise_errors = raise_errors
+        # Zur Laufzeit auslesen, damit auch umgebogene Modul-Konstanten greifen
+        self.google_url = google_url or gb.SEARCH_URL
+        self.ol_api_url = ol_api_url or ol.OL_API_URL
+        self.ol_search_url = ol_search_url or ol.OL_SEARCH_URL
+        self._google_sem = None
+        self._ol_sem = None
+        self._executor = None
+        # Einmal QuotaExceeded -> für den Rest des Laufs keine weiteren Abfragen
+        self.quota_error = None
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def _fetch(self, semaphore, url, params=None, timeout=5, is_empty=None):
+        """Blockierender GET (mit API-Cache) in einem Thread des Engine-Executors."""
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fetch_json, url, params, timeout, is_empty)
+
+    async def _query_google(self, query, max_results=1, lang=None):
+        """Async-Gegenstück zu google_books._query_google_books."""
+        params = {'q': query, 'maxResults': max_results}
+        if lang:
+            params['langRestrict'] = lang
+        try:
+            data = await self._fetch(self._google_sem, self.google_url, params, is_empty=gb._is_empty_search)
+            return gb._parse_search_response(data)
+        except requests.exceptions.RequestException as e:
+            tqdm.write(f"  WARN: Google Books API-Fehler ({query}): {e}")
+            if self.raise_errors:
+                raise
+        except Exception as e:
+            tqdm.write(f"  WARN: Allgemeiner Google Books Fehler: {e}")
+        return None
+
+    # ------------------------------------------------------------------
+    # GOOGLE BOOKS
+    # ------------------------------------------------------------------
+    async def search_isbn_only(self, title, author_lastname, lang=None):
+        if not title or not author_lastname:
+            return None
+        for query in gb._isbn_search_queries(title, author_lastname):
+            isbn = gb._isbn_from_item(await self._query_google(query, max_results=5, lang=lang))
+            if isbn:
+                return isbn
+        return None
+
+    async def get_book_data_by_isbn(self, isbn):
+        isbn_clean = gb._clean_isbn(isbn)
+        if not isbn_clean:
+            return {}
+        return gb._volume_to_metadata(await self._query_google(f"isbn:{isbn_clean}", max_results=1))
+
+    async def enrich_google(self, book_data):
+        """Wie enrich_from_google_books: erst ISBN suchen (falls nötig), dann Details holen."""
+        search_args = gb.isbn_search_args(book_data)
+        if search_args:
+            found_isbn = await self.search_isbn_only(*search_args, lang=book_data.language)
+            if found_isbn:
+                book_data.isbn = found_isbn
+        if book_data.isbn:
+            gb.merge_google_data(book_data, await self.get_book_data_by_isbn(book_data.isbn))
+        return book_data
+
+    # ------------------------------------------------------------------
+    # OPEN LIBRARY
+    # ------------------------------------------------------------------
+    async def _get_details_via_api(self, isbn):
+        try:
+            data = await self._fetch(self._ol_sem, ol._details_url(isbn, self.ol_api_url),
+                                     is_empty=lambda d: ol._parse_details(d, isbn) is None)
+            return ol._parse_details(data, isbn)
+        except requests.exceptions.RequestException:
+            if self.raise_errors:
+                raise
+            return None
+        except Exception:
+            return None
+
+    async def fetch_open_library_data(self, title, authors, isbn=None):
+        if ol.has_ol_isbn(isbn):
+            return await self._get_details_via_api(isbn)
+        if title:
+            try:
+                data = await self._fetch(self._ol_sem, self.ol_search_url, ol._search_params(title, authors), 10,
+                                         is_empty=lambda d: not ol._isbn_from_search(d))
+                found_isbn = ol._isbn_from_search(data)
+                if found_isbn:
+                    return await self._get_details_via_api(found_isbn)
+            except Exception as e:
+                tqdm.write(f"  WARN: OL Suche fehlgeschlagen: {e}")
+                if self.raise_errors and isinstance(e, requests.exceptions.RequestException):
+                    raise
+        return None
+
+    async def enrich_open_library(self, book_data):
+        ol_raw = await self.fetch_open_library_data(book_data.title, book_data.authors, book_data.isbn)
+        return ol.merge_open_library_data(book_data, ol_raw)
+
+    # ------------------------------------------------------------------
+    # KETTE PRO BUCH
+    # ------------------------------------------------------------------
+    async def enrich(self, book_data):
+        """Gleiche Reihenfolge wie scan_single_book: Google, und nur ohne ISBN danach Open Library."""
+        if not needs_api(book_data):
+            return book_data
+        if self.quota_error:
+            raise self.quota_error
+        get_stats().count('api_books')
+        isbn_before = book_data.isbn
+        try:
+            # Zeit pro Buch inkl. Warten auf Semaphore/Rate-Limit (so lange wartet das Buch wirklich)
+            with stage('google_books', book_data.path):
+                await self.enrich_google(book_data)
+            if not getattr(book_data, 'isbn', None):
+                with stage('open_library', book_data.path):
+                    await self.enrich_open_library(book_data)
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, QuotaExceeded):
+                self.quota_error = e
+            # Eine halb gefundene ISBN würde needs_api abschalten -> der neue Versuch fände keine Details
+            book_data.isbn = isbn_before
+            raise
+        return book_data
+
+    async def enrich_many(self, books):
+        """
+        Startet alle Ketten gleichzeitig; die Semaphoren begrenzen die Anfragen pro Anbieter.
+        Gibt pro Buch das Buch selbst oder die aufgetretene Exception zurück.
+        """
+        # Semaphoren erst hier anlegen: sie gehören zur Event-Loop von asyncio.run
+        self._google_sem = asyncio.Semaphore(self.google_limit)
+        self._ol_sem = asyncio.Semaphore(self.ol_limit)
+        # Ein Thread pro erlaubter Anfrage, damit die Limits nicht am Default-Executor hängen
+        with ThreadPoolExecutor(max_workers=self.google_limit + self.ol_limit) as self._executor:
+            results = await asyncio.gather(*(self.enrich(b) for b in books), return_exceptions=True)
+        for book, result in zip(books, results):
+            if isinstance(result, Exception):
+                tqdm.write(f"  WARN: API-Anreicherung fehlgeschlagen für {book.path}: {result}")
+        return results
+
+
+def enrich_books(books, google_limit=4, ol_limit=2, **urls):
+    """
+    Synchroner Einstieg (z.B. für den Scanner): reichert die Liste an Ort und Stelle an.
+    Gibt [(buch, fehler)] für die Bücher zurück, bei denen eine API nicht erreichbar war
+    (429/5xx, Netzwerk, QuotaExceeded) – die dürfen nicht als "keine API-Daten" gespeichert werden.
+    """
+    if not books:
+        return []
+    books = list(books)
+    engine = EnrichmentEngine(google_limit=google_limit, ol_limit=ol_limit, raise_errors=True, **urls)
+    results = asyncio.run(engine.enrich_many(books))
+    return [(book, result) for book, result in zip(books, results) if isinstance(result, Exception)]
@@ -26,6 +26,10 @@ def get_paths():
 PATHS = get_paths()
 DB_PATH = os.path.join(PATHS['db_root'], "books.db")
 DB2_PATH = os.path.join(PATHS['db_root'], "audiobooks.db")
+API_CACHE_PATH = os.path.join(PATHS['db_root'], "api_cache.db")  # Antworten von Google Books / Open Library
+API_QUOTA_PATH = os.path.join(PATHS['db_root'], "api_quota.json")  # Tageskontingent pro API
+CHECKPOINT_DIR = PATHS['db_root']  # checkpoint_<lauf>.json für --resume langer Scans
+COVER_CACHE_DIR = os.path.join(PATHS['db_root'], "covers")  # Cover-Thumbnails (Name = Inhalts-Hash)
 
 EBOOK_BASE = PATHS['ebook_src']
 AUDIO_BASE = PATHS['audio_src']
@@ -67,6 +71,29 @@ def find_real_file(path):
 
     return path  # We
 
+
+def file_fingerprint(path):
+    """
+    Fingerabdruck einer Datei ohne sie zu öffnen: (Größe, mtime in ns, Inode) oder None.
+    path darf auch ein os.DirEntry aus der Dateisuche sein (dessen stat ist gecacht).
+    """
+    try:
+        st = path.stat() if isinstance(path, os.DirEntry) else os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def same_fingerprint(stored, current) -> bool:
+    """Vergleicht zwei Fingerabdrücke. Die Inode zählt nur, wenn beide eine haben (nicht jedes Laufwerk liefert sie)."""
+    if not stored or not current:
+        return False
+    size, mtime_ns, inode = stored
+    if not size or size != current[0] or mtime_ns != current[1]:
+        return False
+    return not (inode and current[2]) or inode == current[2]
+
+
 def build_perfect_filename(book_data) -> str:
     """
     Zentrale Erzeugung des Dateinamens.
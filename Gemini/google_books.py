@@ -10,6 +10,7 @@ from typing import Optional, Dict, Any, List
 from tqdm import tqdm
 
 from Gemini.file_utils import clean_description
+from Gemini.api_cache import fetch_json
 
 # Basis-URL für die Google Books API
 SEARCH_URL = "https://www.googleapis.com/books/v1/volumes"
@@ -38,43 +39,65 @@ def _extract_prioritized_isbn(industry_identifiers: List[Dict[str, str]]) -> Opt
 
 
 def _query_google_books(query: str, max_results: int = 1, lang: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    """Generische API-Abfrage-Funktion."""
+    """
+    Generische API-Abfrage-Funktion. None heißt "kein Treffer".
+    HTTP-/Netzwerkfehler (429/5xx nach allen Wiederholungen, QuotaExceeded) werden weitergereicht,
+    damit der Aufrufer "nicht gefunden" von "später nochmal versuchen" unterscheiden kann.
+    """
     params = {'q': query, 'maxResults': max_results}
     if lang:
         params['langRestrict'] = lang
 
     try:
-        response = requests.get(SEARCH_URL, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get('totalItems', 0) > 0 and data.get('items'):
-            return data['items'][0]
+        data = fetch_json(SEARCH_URL, params=params, timeout=5, is_empty=_is_empty_search)
+        return _parse_search_response(data)
     except requests.exceptions.RequestException as e:
         tqdm.write(f"  WARN: Google Books API-Fehler ({query}): {e}")
+        raise
     except Exception as e:
         tqdm.write(f"  WARN: Allgemeiner Google Books Fehler: {e}")
 
     return None
 
 
-def get_book_data_by_isbn(isbn: str) -> Dict[str, Any]:
-    """
-    Ruft alle verfügbaren Metadaten von Google Books anhand der ISBN ab
-    und gibt ein BookData-konformes Dictionary zurück.
-    """
-    if not isbn:
-        return {}
+def _parse_search_response(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Erster Treffer einer Volumes-Antwort oder None."""
+    if data.get('totalItems', 0) > 0 and data.get('items'):
+        return data['items'][0]
+    return None
+
+
+def _is_empty_search(data) -> bool:
+    """'Kein Treffer' für den API-Cache."""
+    return _parse_search_response(data) is None
+
 
-    # Bereinige ISBN
+def _clean_isbn(isbn: str) -> Optional[str]:
+    """ISBN ohne Leerzeichen/Bindestriche, None wenn sie keine 10 oder 13 Zeichen hat."""
+    if not isbn:
+        return None
     isbn_clean = re.sub(r'[\s\-]', '', isbn)
-    if len(isbn_clean) not in (10, 13):
-        return {}
+    return isbn_clean if len(isbn_clean) in (10, 13) else None
 
-    tqdm.write(f"  -> Google Books Suche für ISBN: {isbn_clean}")
 
-    item = _query_google_books(query=f"isbn:{isbn_clean}", max_results=1)
+def _isbn_search_queries(title: str, author_lastname: str) -> List[str]:
+    """Suchanfragen für search_isbn_only, von streng nach unscharf."""
+    return [
+        f"intitle:\"{title}\" inauthor:\"{author_lastname}\"",  # Striktere Suche
+        f"{title} {author_lastname}"  # Unscharfe Suche
+    ]
+
+
+def _isbn_from_item(item: Optional[Dict[str, Any]]) -> Optional[str]:
+    """ISBN aus einem Volumes-Treffer."""
+    if not item:
+        return None
+    volume_info = item.get('volumeInfo', {})
+    return _extract_prioritized_isbn(volume_info.get('industryIdentifiers', []))
+
 
+def _volume_to_metadata(item: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mappt einen Volumes-Treffer auf BookData-Keys (ohne None-Werte)."""
     if not item:
         return {}
 
@@ -101,6 +124,21 @@ def get_book_data_by_isbn(isbn: str) -> Dict[str, Any]:
     return {k: v for k, v in metadata.items() if v is not None}
 
 
+def get_book_data_by_isbn(isbn: str) -> Dict[str, Any]:
+    """
+    Ruft alle verfügbaren Metadaten von Google Books anhand der ISBN ab
+    und gibt ein BookData-konformes Dictionary zurück.
+    """
+    isbn_clean = _clean_isbn(isbn)
+    if not isbn_clean:
+        return {}
+
+    tqdm.write(f"  -> Google Books Suche für ISBN: {isbn_clean}")
+
+    item = _query_google_books(query=f"isbn:{isbn_clean}", max_results=1)
+    return _volume_to_metadata(item)
+
+
 def search_isbn_only(title: str, author_lastname: str, lang: Optional[str] = None) -> Optional[str]:
     """
     Separate Funktion, um nur die ISBN zu suchen, falls sie noch fehlt.
@@ -110,70 +148,72 @@ def search_isbn_only(title: str, author_lastname: str, lang: Optional[str] = Non
     if not title or not author_lastname:
         return None
 
-    # Suche nach ISBN, basierend auf Titel/Autor
-    queries = [
-        f"intitle:\"{title}\" inauthor:\"{author_lastname}\"",  # Striktere Suche
-        f"{title} {author_lastname}"  # Unscharfe Suche
-    ]
-
     tqdm.write(f"  -> Suche ISBN via Google Books: '{title}' von {author_lastname}")
 
-    for query in queries:
-        item = _query_google_books(query=query, max_results=5, lang=lang)
-        if item:
-            volume_info = item.get('volumeInfo', {})
-            industry_ids = volume_info.get('industryIdentifiers', [])
-
-            isbn = _extract_prioritized_isbn(industry_ids)
-            if isbn:
-                return isbn
+    # Suche nach ISBN, basierend auf Titel/Autor
+    for query in _isbn_search_queries(title, author_lastname):
+        isbn = _isbn_from_item(_query_google_books(query=query, max_results=5, lang=lang))
+        if isbn:
+            return isbn
 
     return None
 
+
+def isbn_search_args(book_data):
+    """(titel, nachname) für die ISBN-Suche oder None, wenn nicht gesucht werden soll."""
+    if book_data.isbn or not book_data.title:
+        return None
+    # Wir nehmen den Nachnamen des ersten Autors für die Suche
+    last_name = book_data.authors[0][1] if book_data.authors else ""
+    if last_name == "Unbekannt":
+        return None
+    return book_data.title, last_name
+
+
+def merge_google_data(book_data, api_data):
+    """Übernimmt die Google-Daten in das BookData-Objekt (gleiche Regeln für sync und async)."""
+    if not api_data or not isinstance(api_data, dict):
+        return book_data
+
+    # Jahr (Google ist hier meist sehr genau)
+    if not book_data.year:
+        book_data.year = api_data.get('year')
+
+    # Beschreibung (nur wenn keine manuelle Beschreibung vorliegt)
+    if not getattr(book_data, 'is_manual_description', 0):
+        new_desc = api_data.get('description')
+        if new_desc and isinstance(new_desc, str):
+            # Hier nutzen wir deine clean_description Funktion aus dem Scan-Modul
+            book_data.description = clean_description(new_desc)
+        elif not book_data.description:
+            book_data.description = ""  # Fallback auf leeren String
+
+    # Ratings
+    book_data.average_rating = api_data.get('average_rating') or book_data.average_rating
+    book_data.ratings_count = api_data.get('ratings_count') or book_data.ratings_count
+
+    # WICHTIG: Kategorien für das spätere Mapping zwischenspeichern
+    # Google liefert Listen wie ["Fiction / Mystery & Detective / General"]
+    if api_data.get('keywords'):
+        # BookData.categories wird nur im Single-Scan Schritt D gebraucht, nicht gespeichert
+        book_data.categories.extend(api_data.get('keywords'))
+    return book_data
+
 # --- Haupt-API-Funktion für die Aggregation ---
 def enrich_from_google_books(book_data):
     """
     Nutzt die Google Books API, um das BookData-Objekt zu vervollständigen.
     """
     # 1. ISBN-Suche, falls diese noch fehlt (Voraussetzung für get_book_data_by_isbn)
-    if not book_data.isbn and book_data.title:
-        # Wir nehmen den Nachnamen des ersten Autors für die Suche
-        last_name = book_data.authors[0][1] if book_data.authors else ""
-        if last_name != "Unbekannt":
-            found_isbn = search_isbn_only(book_data.title, last_name, lang=book_data.language)
-            if found_isbn:
-                book_data.isbn = found_isbn
+    search_args = isbn_search_args(book_data)
+    if search_args:
+        found_isbn = search_isbn_only(*search_args, lang=book_data.language)
+        if found_isbn:
+            book_data.isbn = found_isbn
 
     # 2. Detail-Abfrage mit (neuer oder alter) ISBN
     if book_data.isbn:
-        api_data = get_book_data_by_isbn(book_data.isbn)
-        if not api_data or not isinstance(api_data, dict):
-            return book_data
-
-        # Jahr (Google ist hier meist sehr genau)
-        if not book_data.year:
-            book_data.year = api_data.get('year')
-
-        # Beschreibung (nur wenn keine manuelle Beschreibung vorliegt)
-        if not getattr(book_data, 'is_manual_description', 0):
-            new_desc = api_data.get('description')
-            if new_desc and isinstance(new_desc, str):
-                # Hier nutzen wir deine clean_description Funktion aus dem Scan-Modul
-                book_data.description = clean_description(new_desc)
-            elif not book_data.description:
-                book_data.description = ""  # Fallback auf leeren String
-
-        # Ratings
-        book_data.average_rating = api_data.get('average_rating') or book_data.average_rating
-        book_data.ratings_count = api_data.get('ratings_count') or book_data.ratings_count
-
-        # WICHTIG: Kategorien für das spätere Mapping zwischenspeichern
-        # Google liefert Listen wie ["Fiction / Mystery & Detective / General"]
-        if api_data.get('keywords'):
-            # Wir speichern diese in einem temporären Attribut für den Single-Scan Schritt D
-            if not hasattr(book_data, 'categories'):
-                book_data.categories = []
-            book_data.categories.extend(api_data.get('keywords'))
+        merge_google_data(book_data, get_book_data_by_isbn(book_data.isbn))
     # Am Ende geben wir das Objekt (verändert oder unverändert) zurück
     return book_data
 
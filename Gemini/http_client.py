@@ -0,0 +1,191 @@
+"""
+DATEI: http_client.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Gemeinsamer HTTP-Zugang für die Metadaten-APIs (Google Books, Open Library).
+              - requests.Session pro Thread (Keep-Alive statt neuem TCP/TLS-Handshake pro Anfrage)
+              - Token-Bucket pro Anbieter (Anfragen/Sekunde mit kleinem Burst)
+              - 429/5xx: erneuter Versuch mit exponentiellem Backoff + Jitter (Retry-After wird beachtet)
+              - Tageskontingent pro Anbieter, in api_quota.json gespeichert (übersteht Neustarts)
+"""
+import atexit
+import datetime
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+from Gemini.file_utils import API_QUOTA_PATH
+
+
+class QuotaExceeded(requests.exceptions.RequestException):
+    """Das Tageskontingent eines Anbieters ist aufgebraucht (es wird gar nicht erst angefragt)."""
+
+
+@dataclass
+class Provider:
+    name: str
+    rate: float              # Anfragen pro Sekunde im Mittel
+    burst: int               # so viele dürfen kurz hintereinander raus
+    daily_quota: int = 0     # 0 = kein Limit
+
+
+# Host -> Anbieter. Unbekannte Hosts (z.B. ein lokaler Test-Server) laufen ohne Limits.
+PROVIDERS = {
+    'www.googleapis.com': Provider('google_books', rate=2.0, burst=4, daily_quota=1000),
+    'openlibrary.org': Provider('open_library', rate=1.0, burst=3),
+}
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0       # Sekunden, verdoppelt sich pro Versuch
+BACKOFF_MAX = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# ----------------------------------------------------------------------
+# TOKEN-BUCKET
+# ----------------------------------------------------------------------
+class TokenBucket:
+    """Füllt sich mit rate Token/Sekunde bis burst; acquire() wartet, bis ein Token da ist."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# ----------------------------------------------------------------------
+# TAGESKONTINGENT
+# ----------------------------------------------------------------------
+class DailyQuota:
+    """Zählt Anfragen pro Anbieter und Tag in einer kleinen JSON-Datei."""
+    SAVE_EVERY = 20  # Anfragen zwischen zwei Schreibvorgängen (Rest beim Programmende)
+
+    def __init__(self, path=API_QUOTA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.day = datetime.date.today().isoformat()
+        self.counts = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get('day') == self.day:
+                self.counts = stored.get('counts', {})
+        except (OSError, ValueError):
+            pass
+
+    def _roll_day(self):
+        today = datetime.date.today().isoformat()
+        if today != self.day:
+            self.day, self.counts = today, {}
+
+    def take(self, provider):
+        """Verbucht eine Anfrage; wirft QuotaExceeded, wenn das Kontingent für heute aufgebraucht ist."""
+        with self._lock:
+            self._roll_day()
+            used = self.counts.get(provider.name, 0)
+            if provider.daily_quota and used >= provider.daily_quota:
+                raise QuotaExceeded(f"Tageskontingent {provider.name} erreicht ({used}/{provider.daily_quota})")
+            self.counts[provider.name] = used + 1
+            self._unsaved += 1
+            if self._unsaved >= self.SAVE_EVERY:
+                self._save()
+
+    def used(self, provider_name):
+        with self._lock:
+            self._roll_day()
+            return self.counts.get(provider_name, 0)
+
+    def _save(self):
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({'day': self.day, 'counts': self.counts}, f)
+            os.replace(tmp, self.path)
+            self._unsaved = 0
+        except OSError as e:
+            tqdm.write(f"  WARN: API-Kontingent konnte nicht gespeichert werden: {e}")
+            self._unsaved = 0
+
+    def save(self):
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+
+# ----------------------------------------------------------------------
+# CLIENT
+# ----------------------------------------------------------------------
+_local = threading.local()
+_buckets = {p.name: TokenBucket(p.rate, p.burst) for p in PROVIDERS.values()}
+quota = DailyQuota()
+atexit.register(quota.save)
+
+
+def _session() -> requests.Session:
+    """Eine Session pro Thread: Verbindungen bleiben offen und werden wiederverwendet."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers['User-Agent'] = "MyBook-Management/1.3"
+        _local.session = session
+    return session
+
+
+def _backoff(attempt, response):
+    """Wartezeit vor dem nächsten Versuch: Retry-After des Servers oder 2^n Sekunden mit Jitter."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def get(url, params=None, timeout=5) -> requests.Response:
+    """
+    GET über die Session des Threads, mit Rate-Limit, Kontingent und Wiederholung bei 429/5xx.
+    Nach dem letzten Versuch wird der Fehler (raise_for_status / Netzwerk) an den Aufrufer gereicht.
+    """
+    provider = PROVIDERS.get(urlsplit(url).netloc.lower())
+    for attempt in range(MAX_RETRIES + 1):
+        if provider:
+            quota.take(provider)
+            _buckets[provider.name].acquire()
+        response = None
+        try:
+            response = _session().get(url, params=params, timeout=timeout)
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+        if attempt == MAX_RETRIES:
+            response.raise_for_status()
+        wait = _backoff(attempt, response)
+        status = response.status_code if response is not None else "Netzwerk"
+        tqdm.write(f"  WARN: {urlsplit(url).netloc} antwortet {status}, neuer Versuch in {wait:.1f}s")
+        time.sleep(wait)
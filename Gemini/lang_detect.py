@@ -0,0 +1,146 @@
+"""
+DATEI: lang_detect.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Offline-Spracherkennung für de, en, fr, it, es über Zeichen-N-Gramme (Cavnar & Trenkle).
+              Die Profile werden beim Import aus kurzen Mustertexten gebaut (kein Netz, keine Zusatzpakete).
+              Die Kosten sind begrenzt: es werden höchstens MAX_CHARS Zeichen Text ausgewertet.
+
+              detect_language(text) -> (sprache, konfidenz) bzw. (None, 0.0) bei zu wenig Text
+              konfidenz = Abstand zur zweitbesten Sprache (0..1); ab MIN_CONFIDENCE gilt das Ergebnis.
+"""
+import re
+from collections import Counter
+
+LANGUAGES = ('de', 'en', 'fr', 'it', 'es')
+PROFILE_SIZE = 300      # so viele häufigste N-Gramme pro Profil
+MAX_NGRAM = 3
+MAX_CHARS = 6000        # mehr Text macht das Ergebnis kaum besser, nur langsamer
+MIN_CHARS = 200         # darunter (z.B. Titelseite) wird nicht geraten
+MIN_CONFIDENCE = 0.08
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Mustertexte: Alltagsprosa mit den typischen Funktionswörtern und Endungen jeder Sprache
+_SAMPLES = {
+    'de': """
+        Als sie am nächsten Morgen aufwachte, war das Haus still und die Sonne schien durch das Fenster.
+        Sie ging in die Küche, machte sich einen Kaffee und dachte darüber nach, was ihr Vater gestern
+        gesagt hatte. Es war nicht das erste Mal, dass er über die Geschichte der Familie sprach, aber
+        diesmal klang er anders, fast so, als hätte er Angst vor etwas. Der Kommissar stand vor der Tür
+        und wartete. Er wollte wissen, wo sie in der Nacht gewesen war und warum niemand sie gesehen
+        hatte. Die Straßen der Stadt waren leer, nur ein Hund lief über den Platz vor der Kirche.
+        Wir müssen uns beeilen, sagte er leise, denn die Zeit wird knapp und die anderen warten schon
+        auf uns. Nach dem Krieg hatten die Menschen nicht viel, aber sie halfen einander und bauten
+        ihre Häuser wieder auf. Das Buch beschreibt, wie sich die Gesellschaft im Laufe der Jahrhunderte
+        verändert hat und welche Rolle die Wissenschaft dabei spielte. Ich weiß nicht, ob ich ihm
+        glauben soll, antwortete sie, während sie ihre Jacke anzog und zur Treppe ging. Zwischen den
+        Bergen lag ein kleines Dorf, in dem jeder jeden kannte und nichts lange geheim blieb.
+        Seine Mutter hatte ihm immer erzählt, dass man mit Geduld und Fleiß alles erreichen könne.
+    """,
+    'en': """
+        When she woke up the next morning, the house was quiet and the sun was shining through the
+        window. She went into the kitchen, made herself a cup of coffee and thought about what her father
+        had said the night before. It was not the first time he had talked about the history of the
+        family, but this time he sounded different, almost as if he were afraid of something. The
+        detective was standing at the door and waiting. He wanted to know where she had been that night
+        and why nobody had seen her. The streets of the town were empty, only a dog was running across
+        the square in front of the church. We have to hurry, he said quietly, because time is running
+        out and the others are already waiting for us. After the war people did not have much, but they
+        helped each other and rebuilt their homes. The book describes how society has changed over the
+        centuries and which role science played in that change. I do not know whether I should believe
+        him, she answered, while she put on her jacket and walked towards the stairs. Between the
+        mountains there was a small village where everyone knew everyone and nothing stayed secret for
+        long. His mother had always told him that with patience and hard work you could achieve anything.
+    """,
+    'fr': """
+        Quand elle se réveilla le lendemain matin, la maison était silencieuse et le soleil brillait à
+        travers la fenêtre. Elle alla dans la cuisine, se fit un café et pensa à ce que son père lui
+        avait dit la veille. Ce n'était pas la première fois qu'il parlait de l'histoire de la famille,
+        mais cette fois sa voix était différente, presque comme s'il avait peur de quelque chose.
+        Le commissaire se tenait devant la porte et attendait. Il voulait savoir où elle avait été
+        pendant la nuit et pourquoi personne ne l'avait vue. Les rues de la ville étaient vides, seul un
+        chien traversait la place devant l'église. Nous devons nous dépêcher, dit-il à voix basse, car le
+        temps presse et les autres nous attendent déjà. Après la guerre, les gens n'avaient pas grand-chose,
+        mais ils s'aidaient les uns les autres et reconstruisaient leurs maisons. Le livre décrit comment
+        la société a changé au cours des siècles et quel rôle la science a joué dans cette évolution.
+        Je ne sais pas si je dois le croire, répondit-elle, tout en mettant sa veste et en se dirigeant
+        vers l'escalier. Entre les montagnes se trouvait un petit village où tout le monde se connaissait
+        et où rien ne restait longtemps secret. Sa mère lui avait toujours dit qu'avec de la patience
+        et du travail on pouvait tout obtenir.
+    """,
+    'it': """
+        Quando si svegliò la mattina dopo, la casa era silenziosa e il sole splendeva attraverso la
+        finestra. Andò in cucina, si preparò un caffè e pensò a quello che suo padre le aveva detto la
+        sera prima. Non era la prima volta che parlava della storia della famiglia, ma questa volta la
+        sua voce era diversa, quasi come se avesse paura di qualcosa. Il commissario era davanti alla
+        porta e aspettava. Voleva sapere dove fosse stata durante la notte e perché nessuno l'avesse
+        vista. Le strade della città erano vuote, solo un cane attraversava la piazza davanti alla chiesa.
+        Dobbiamo sbrigarci, disse a bassa voce, perché il tempo stringe e gli altri ci stanno già
+        aspettando. Dopo la guerra la gente non aveva molto, ma si aiutavano a vicenda e ricostruivano
+        le loro case. Il libro descrive come la società sia cambiata nel corso dei secoli e quale ruolo
+        abbia avuto la scienza in questo cambiamento. Non so se devo credergli, rispose lei, mentre si
+        metteva la giacca e si dirigeva verso le scale. Tra le montagne c'era un piccolo paese dove tutti
+        si conoscevano e niente restava segreto a lungo. Sua madre gli aveva sempre detto che con la
+        pazienza e il lavoro si poteva ottenere tutto.
+    """,
+    'es': """
+        Cuando se despertó a la mañana siguiente, la casa estaba en silencio y el sol brillaba a través
+        de la ventana. Fue a la cocina, se preparó un café y pensó en lo que su padre le había dicho la
+        noche anterior. No era la primera vez que hablaba de la historia de la familia, pero esta vez su
+        voz sonaba diferente, casi como si tuviera miedo de algo. El comisario estaba delante de la
+        puerta y esperaba. Quería saber dónde había estado durante la noche y por qué nadie la había
+        visto. Las calles de la ciudad estaban vacías, solo un perro cruzaba la plaza delante de la
+        iglesia. Tenemos que darnos prisa, dijo en voz baja, porque el tiempo se acaba y los demás ya nos
+        están esperando. Después de la guerra la gente no tenía mucho, pero se ayudaban unos a otros y
+        reconstruían sus casas. El libro describe cómo la sociedad ha cambiado a lo largo de los siglos
+        y qué papel ha tenido la ciencia en ese cambio. No sé si debo creerle, respondió ella, mientras
+        se ponía la chaqueta y se dirigía hacia la escalera. Entre las montañas había un pequeño pueblo
+        donde todos se conocían y nada permanecía en secreto mucho tiempo. Su madre siempre le había
+        dicho que con paciencia y trabajo se podía conseguir todo.
+    """,
+}
+
+
+def _ngram_counts(text):
+    """Zeichen-N-Gramme (1..MAX_NGRAM) über die Wörter, mit Leerzeichen als Wortgrenze."""
+    counts = Counter()
+    # Jedes Wort nur einmal zerlegen (Funktionswörter kommen hundertfach vor)
+    for word, times in Counter(_WORD.findall(text.lower())).items():
+        padded = f" {word} "
+        for n in range(1, MAX_NGRAM + 1):
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += times
+    del counts[' ']
+    return counts
+
+
+def _ranked(counts):
+    """{ngramm: rang} der PROFILE_SIZE häufigsten N-Gramme."""
+    return {gram: rank for rank, (gram, _) in enumerate(counts.most_common(PROFILE_SIZE))}
+
+
+_PROFILES = {lang: _ranked(_ngram_counts(sample)) for lang, sample in _SAMPLES.items()}
+
+
+def detect_language(text, max_chars=MAX_CHARS):
+    """
+    Sprache eines Textes: (code, konfidenz) mit code aus LANGUAGES, oder (None, 0.0) bei zu wenig Text.
+    Gemessen wird die "Out-of-place"-Distanz der Ranglisten; konfidenz = (zweitbeste - beste) / zweitbeste.
+    """
+    if not text:
+        return None, 0.0
+    text = text[:max_chars]
+    if sum(len(word) for word in _WORD.findall(text)) < MIN_CHARS:
+        return None, 0.0
+
+    ranked = _ranked(_ngram_counts(text))
+    distances = []
+    for lang, profile in _PROFILES.items():
+        distance = 0
+        for gram, rank in ranked.items():
+            other = profile.get(gram)
+            distance += abs(rank - other) if other is not None else PROFILE_SIZE
+        distances.append((distance, lang))
+    distances.sort()
+    (best, lang), (second, _) = distances[0], distances[1]
+    return lang, (second - best) / second if second else 0.0
@@ -10,6 +10,7 @@ import requests
 from tqdm import tqdm
 
 from Gemini.file_utils import clean_description
+from Gemini.api_cache import fetch_json
 
 OL_API_URL = "https://openlibrary.org/api/books"
 OL_SEARCH_URL = "https://openlibrary.org/search.json"
@@ -18,58 +19,83 @@ OL_SEARCH_URL = "https://openlibrary.org/search.json"
 def fetch_open_library_data(title, authors, isbn=None):
     """
     Sucht bei Open Library. Erst via ISBN, dann via Suche.
+    None heißt "nichts gefunden"; HTTP-/Netzwerkfehler (requests.RequestException) werden weitergereicht.
     """
     # 1. Direkter Weg (Deine funktionierende URL)
-    if isbn and len(str(isbn)) in (10, 13):
+    if has_ol_isbn(isbn):
         return _get_details_via_api(isbn)
 
     # 2. Such-Weg (Falls keine ISBN da ist)
     if title:
-        author_name = authors[0][1] if authors else ""
         try:
             # Wir suchen nach Titel und Autor
-            params = {'q': f'title:{title} author:{author_name}', 'limit': 1}
-            resp = requests.get(OL_SEARCH_URL, params=params, timeout=10)
-            data = resp.json()
-
-            if data.get('docs'):
-                # Wir nehmen die erste ISBN, die wir im Treffer finden
-                found_isbns = data['docs'][0].get('isbn', [])
-                if found_isbns:
-                    return _get_details_via_api(found_isbns[0])
+            data = fetch_json(OL_SEARCH_URL, params=_search_params(title, authors), timeout=10,
+                              is_empty=lambda d: not _isbn_from_search(d))
+            found_isbn = _isbn_from_search(data)
+            if found_isbn:
+                return _get_details_via_api(found_isbn)
         except Exception as e:
             tqdm.write(f"  WARN: OL Suche fehlgeschlagen: {e}")
+            if isinstance(e, requests.exceptions.RequestException):
+                raise
 
     return None
 
 
+def has_ol_isbn(isbn) -> bool:
+    """Reicht die ISBN für den direkten Abruf?"""
+    return bool(isbn) and len(str(isbn)) in (10, 13)
+
+
+def _search_params(title, authors) -> dict:
+    """Parameter für die Titel/Autor-Suche (Nachname des ersten Autors)."""
+    author_name = authors[0][1] if authors else ""
+    return {'q': f'title:{title} author:{author_name}', 'limit': 1}
+
+
+def _isbn_from_search(data):
+    """Wir nehmen die erste ISBN, die wir im ersten Treffer finden."""
+    if data.get('docs'):
+        found_isbns = data['docs'][0].get('isbn', [])
+        if found_isbns:
+            return found_isbns[0]
+    return None
+
+
+def _details_url(isbn, api_url=None) -> str:
+    return f"{api_url or OL_API_URL}?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
+
+
+def _parse_details(data, isbn):
+    """Zieht Beschreibung und Ratings aus der Books-API-Antwort."""
+    ol_key = f'ISBN:{isbn}'
+    book_info = data.get(ol_key, {})
+    if not book_info:
+        return None
+
+    # Beschreibung extrahieren (kann String oder Dict sein)
+    raw_desc = book_info.get('description', "")
+    description = raw_desc.get('value', raw_desc) if isinstance(raw_desc, dict) else raw_desc
+
+    # Ratings extrahieren
+    details = book_info.get('details', book_info)
+    rating_data = details.get('ratings', {})
+
+    return {
+        'ol_isbn': isbn,
+        'description': description,
+        'ol_rating': rating_data.get('average'),
+        'ol_count': rating_data.get('count')
+    }
+
+
 def _get_details_via_api(isbn):
     """Deine bewährte Logik zum Abrufen der Daten."""
-    url = f"{OL_API_URL}?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
     try:
-        resp = requests.get(url, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-
-        ol_key = f'ISBN:{isbn}'
-        book_info = data.get(ol_key, {})
-        if not book_info:
-            return None
-
-        # Beschreibung extrahieren (kann String oder Dict sein)
-        raw_desc = book_info.get('description', "")
-        description = raw_desc.get('value', raw_desc) if isinstance(raw_desc, dict) else raw_desc
-
-        # Ratings extrahieren
-        details = book_info.get('details', book_info)
-        rating_data = details.get('ratings', {})
-
-        return {
-            'ol_isbn': isbn,
-            'description': description,
-            'ol_rating': rating_data.get('average'),
-            'ol_count': rating_data.get('count')
-        }
+        data = fetch_json(_details_url(isbn), timeout=5, is_empty=lambda d: _parse_details(d, isbn) is None)
+        return _parse_details(data, isbn)
+    except requests.exceptions.RequestException:
+        raise
     except Exception:
         return None
 
@@ -80,7 +106,11 @@ def enrich_from_open_library(book_data):
     """
     # 1. API Abfrage
     ol_raw = fetch_open_library_data(book_data.title, book_data.authors, book_data.isbn)
+    return merge_open_library_data(book_data, ol_raw)
+
 
+def merge_open_library_data(book_data, ol_raw):
+    """Übernimmt die Open-Library-Daten in das BookData-Objekt (gleiche Regeln für sync und async)."""
     if not ol_raw or not isinstance(ol_raw, dict):
         return  book_data # Nichts gefunden, wir brechen ab
 
@@ -8,16 +8,20 @@ BESCHREIBUNG: Kümmert sich um das Auslesen von epub-Dateien
 
 import os
 import re
-import tempfile
 import html # Oben zu den Imports
 import zipfile
 import xml.etree.ElementTree as ET
 from typing import Dict, Any
 from tqdm import tqdm
 
+from Gemini.lang_detect import MAX_CHARS, detect_language
+
 try:
     from Apps.book_data import BookData
     from Gemini.file_utils import clean_description, sanitize_path
+    from Gemini.discovery import iter_files, progress
+    from Gemini.scan_stats import stage
+    from Gemini.cover_cache import get_cover_cache
 
 except ImportError:
     # Falls das Modul beim Standalone-Test nicht gefunden wird
@@ -29,86 +33,265 @@ NS_OPF = {'opf': 'http://www.idpf.org/2007/opf'}
 NS_OCF = {'ocf': 'urn:oasis:names:tc:opendocument:xmlns:container'}
 
 
-# --- Hilfsfunktionen für das XML-Parsing ---
+# --- Schlanker OPF-Leser ---
+DC_NS = '{' + NS_DC['dc'] + '}'
+OPF_NS = '{' + NS_OPF['opf'] + '}'
+OPF_CHUNK = 16 * 1024  # OPF wird stückweise entpackt; nach dem Anfang der Spine wird abgebrochen
 
-def _get_opf_root(zf, epub_path):
-    """Liest die container.xml aus dem übergebenen ZipFile (zf) und gibt das Root-Element des OPF-Files zurück."""
-    try:
-        # 1. Finde OPF-Pfad über container.xml
-        container_data = zf.read('META-INF/container.xml')
-        root = ET.fromstring(container_data)
-
-        # OPF-Pfad ermitteln
-        opf_element = root.find('.//ocf:rootfile', NS_OCF)
-        if opf_element is None:
-            return None, None
-
-        opf_path = opf_element.get('full-path')
-
-        # 2. Lese OPF-Datei
-        opf_data = zf.read(opf_path)
-        opf_root = ET.fromstring(opf_data)
-        return opf_root, opf_path
-
-    except Exception:
-        # Fehler beim Lesen oder Parsen
-        return None, None
-
-
-def _get_dc_element(opf_root, tag_name):
-    """Extrahiert den Text eines einzelnen Dublin Core Elements."""
-    if opf_root is None: return None
-    element = opf_root.find(f".//dc:{tag_name}", NS_DC)
-    return element.text.strip() if element is not None and element.text else None
-
-def _get_all_dc_elements(opf_root, tag_name):
-    """Extrahiert alle Dublin Core Elemente (Liste)."""
-    if opf_root is None: return []
-    return [el.text.strip() for el in opf_root.findall(f".//dc:{tag_name}", NS_DC) if el.text]
-
-def _get_cover_image_relative_path(opf_root, opf_path):
-    """Sucht den relativen Pfad des Titelbildes innerhalb des EPUB-Containers."""
-    if opf_root is None: return None
-    # 1. Finde die Cover-ID im Metadaten-Bereich
-    cover_meta = opf_root.find(".//opf:metadata/opf:meta[@name='cover']", NS_OPF)
-    if cover_meta is not None:
-        cover_id = cover_meta.get('content')
-        # 2. Finde den Pfad (href) anhand der ID im Manifest
-        cover_item = opf_root.find(f".//opf:manifest/opf:item[@id='{cover_id}']", NS_OPF)
-        if cover_item is not None:
-            relative_image_path = cover_item.get('href')
-            # Wir müssen den Pfad relativ zum EPUB-Stammverzeichnis machen.
-            opf_dir = os.path.dirname(opf_path)
-            full_path = os.path.join(opf_dir, relative_image_path)
-            # Auf Linux/Windows-Pfad-Konsistenz achten (EPUBs nutzen oft /)
-            return full_path.replace('\\', '/')
+# --- Textprobe für die Spracherkennung ---
+TEXT_SAMPLE_BYTES = 64 * 1024   # höchstens so viel XHTML wird dafür entpackt
+MIN_DOCUMENT_CHARS = 500        # kürzere Dokumente sind Cover, Titelei oder Impressum
+TEXT_SAMPLE_DOCUMENTS = 10      # und höchstens so viele Dokumente werden geöffnet
+_HEAD_SCRIPT_STYLE = re.compile(r'<(head|script|style)\b.*?</\1>', re.S | re.I)
+_TAG = re.compile(r'<[^>]+>')
+
+
+def _find_opf_path(zf):
+    """Pfad der OPF-Datei laut META-INF/container.xml (erstes rootfile) oder None."""
+    root = ET.fromstring(zf.read('META-INF/container.xml'))
+    for element in root.iter('{' + NS_OCF['ocf'] + '}rootfile'):
+        return element.get('full-path')
     return None
 
 
-def _extract_and_save_cover(zf, internal_cover_path):
+def read_opf_metadata(zf):
     """
-    Extrahiert das Coverbild aus dem ZipFile und speichert es temporär.
-    Gibt den Pfad zur temporären Datei zurück oder None bei Fehler.
+    Liest container.xml und die OPF-Datei in EINEM Durchgang (XMLPullParser statt mehrerer
+    .find('.//...') über den ganzen Baum). Nach dem Anfang der Spine wird abgebrochen.
+    Rückgabe: {'opf_path', 'dc': {name: [texte]}, 'cover': Zip-Name des Coverbilds oder None,
+    'documents': Zip-Namen der ersten XHTML-Dokumente in Lesereihenfolge,
+    'meta': {name: content} (OPF2/Calibre), 'collections': [(id, name)] (EPUB3 belongs-to-collection),
+    'refines': {id: {property: wert}} (EPUB3), 'identifiers': [(schema, id, text)]}
+    oder None, wenn keine OPF gefunden wird. Das Cover selbst wird nicht gelesen.
     """
-    if not internal_cover_path:
+    opf_path = _find_opf_path(zf)
+    if not opf_path:
+        return None
+
+    dc = {}
+    meta = {}
+    collections = []
+    refines = {}
+    identifiers = []
+    cover_image_href = None   # EPUB3: <item properties="cover-image">
+    manifest = {}
+    xhtml_ids = []
+    spine = []
+    seen = set()
+    parser = ET.XMLPullParser(events=('end',))
+    with zf.open(opf_path) as opf:
+        while len(seen) < 3:
+            chunk = opf.read(OPF_CHUNK)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                tag = element.tag
+                if tag.startswith(DC_NS):
+                    name = tag[len(DC_NS):]
+                    dc.setdefault(name, []).append(element.text)
+                    if name == 'identifier':
+                        identifiers.append((element.get(OPF_NS + 'scheme') or element.get('scheme'),
+                                            element.get('id'), element.text))
+                elif tag == OPF_NS + 'meta':
+                    if element.get('name'):
+                        # OPF2: <meta name="calibre:series" content="..."/> (der erste gilt)
+                        meta.setdefault(element.get('name'), element.get('content'))
+                    elif element.get('refines'):
+                        # EPUB3: <meta refines="#id" property="group-position">2</meta>
+                        refines.setdefault(element.get('refines').lstrip('#'), {}).setdefault(
+                            element.get('property'), (element.text or '').strip())
+                    elif element.get('property') == 'belongs-to-collection':
+                        collections.append((element.get('id'), element.text))
+                elif tag == OPF_NS + 'item':
+                    manifest[element.get('id')] = element.get('href')
+                    if element.get('media-type') == 'application/xhtml+xml':
+                        xhtml_ids.append(element.get('id'))
+                    if 'cover-image' in (element.get('properties') or '').split():
+                        cover_image_href = cover_image_href or element.get('href')
+                elif tag == OPF_NS + 'itemref':
+                    spine.append(element.get('idref'))
+                    if len(spine) >= TEXT_SAMPLE_DOCUMENTS:
+                        seen.add(OPF_NS + 'spine')  # für die Textprobe reicht der Anfang
+                elif tag in (OPF_NS + 'metadata', OPF_NS + 'manifest', OPF_NS + 'spine'):
+                    seen.add(tag)
+                    element.clear()
+
+    # Hrefs sind relativ zur OPF-Datei; EPUBs nutzen immer '/'
+    opf_dir = os.path.dirname(opf_path)
+
+    def member(href):
+        return os.path.join(opf_dir, href).replace('\\', '/')
+
+    cover_id = meta.get('cover')
+    href = manifest.get(cover_id) if cover_id else None
+    href = href or cover_image_href
+    xhtml = set(xhtml_ids)
+    reading_order = [i for i in spine if i in xhtml] or xhtml_ids
+    return {'opf_path': opf_path, 'dc': dc, 'cover': member(href) if href else None,
+            'documents': [member(manifest[i]) for i in reading_order[:TEXT_SAMPLE_DOCUMENTS] if manifest.get(i)],
+            'meta': meta, 'collections': collections, 'refines': refines, 'identifiers': identifiers}
+
+
+def _dc_first(package, name):
+    """Text des ersten DC-Elements (wie bisher: leerer Text -> None)."""
+    texts = package['dc'].get(name)
+    return texts[0].strip() if texts and texts[0] else None
+
+
+def _dc_all(package, name):
+    """Alle nicht-leeren Texte eines DC-Elements."""
+    return [t.strip() for t in package['dc'].get(name, []) if t]
+
+
+# --- Serie, ISBN und Bewertung aus gepflegten Metadaten (Calibre / EPUB3) ---
+ISBN_IDENTIFIER_TYPES = {'02', '15'}  # EPUB3 identifier-type nach ONIX-Liste 5: 02 = ISBN-10, 15 = ISBN-13
+
+
+def _format_series_index(value):
+    """'3.0' -> '3', '1.5' bleibt; leer oder unlesbar -> None."""
+    try:
+        return f"{float(str(value).strip().replace(',', '.')):g}"
+    except (TypeError, ValueError):
         return None
 
+
+def _series_from_package(package):
+    """
+    (serie, nummer, quelle) aus calibre:series/calibre:series_index oder aus EPUB3
+    belongs-to-collection (collection-type 'series' oder ohne Typ) mit group-position.
+    Ohne solche Angaben: (None, None, None).
+    """
+    series = (package['meta'].get('calibre:series') or '').strip()
+    if series:
+        return series, _format_series_index(package['meta'].get('calibre:series_index')), 'calibre'
+    for collection_id, name in package['collections']:
+        refinements = package['refines'].get(collection_id, {}) if collection_id else {}
+        if name and name.strip() and refinements.get('collection-type', 'series') == 'series':
+            return name.strip(), _format_series_index(refinements.get('group-position')), 'epub3'
+    return None, None, None
+
+
+def _clean_isbn(text):
+    # Präfix ('urn:isbn:', 'ISBN:') weg, nur Ziffern und X behalten
+    return re.sub(r'[^\dX]', '', text.split(':')[-1].upper())
+
+
+def _isbn_from_package(package):
+    """
+    ISBN bevorzugt aus einem Identifier mit ausdrücklichem Schema (opf:scheme="ISBN", urn:isbn:,
+    EPUB3 identifier-type). Sonst wie bisher der erste Identifier – aber nur, wenn er nach einer
+    ISBN aussieht (10 oder 13 Zeichen), damit aus einer Calibre-UUID keine "ISBN" wird.
+    """
+    identifiers = [(scheme, ident_id, text.strip()) for scheme, ident_id, text in package['identifiers'] if text]
+    for scheme, ident_id, text in identifiers:
+        identifier_type = package['refines'].get(ident_id, {}).get('identifier-type') if ident_id else None
+        if ((scheme or '').lower() == 'isbn' or text.lower().startswith(('urn:isbn:', 'isbn:'))
+                or identifier_type in ISBN_IDENTIFIER_TYPES):
+            isbn = _clean_isbn(text)
+            if len(isbn) in (10, 13):
+                return isbn
+    if identifiers:
+        isbn = _clean_isbn(identifiers[0][2])
+        if len(isbn) in (10, 13):
+            return isbn
+    return ""
+
+
+def _stars_from_package(package):
+    """calibre:rating (0-10, zwei Punkte pro Stern) als Sterne-Text ('4', '3.5') oder ""."""
+    try:
+        rating = float(package['meta'].get('calibre:rating') or 0)
+    except ValueError:
+        return ""
+    return f"{rating / 2:g}" if rating > 0 else ""
+
+
+def read_text_sample(zf, documents, max_bytes=TEXT_SAMPLE_BYTES, max_chars=MAX_CHARS):
+    """
+    Klartext vom Anfang des Buchs (Spine-Reihenfolge) für die Spracherkennung.
+    Entpackt insgesamt höchstens max_bytes aus TEXT_SAMPLE_DOCUMENTS Dokumenten;
+    kurze Dokumente (Cover, Titelei, Impressum) werden übersprungen.
+    """
+    parts = []
+    length = 0
+    budget = max_bytes
+    for name in documents[:TEXT_SAMPLE_DOCUMENTS]:
+        if budget <= 0 or length >= max_chars:
+            break
+        try:
+            with zf.open(name) as doc:
+                raw = doc.read(budget)
+        except (KeyError, zipfile.BadZipFile, OSError):
+            continue
+        budget -= len(raw)
+        text = raw.decode('utf-8', errors='ignore')
+        text = _HEAD_SCRIPT_STYLE.sub(' ', text)
+        text = html.unescape(_TAG.sub(' ', text))
+        text = ' '.join(text.split())
+        if len(text) < MIN_DOCUMENT_CHARS:
+            continue
+        parts.append(text)
+        length += len(text)
+    return ' '.join(parts)[:max_chars]
+
+
+def _text_language(text_sample, description):
+    """(sprache, konfidenz) aus dem Buchtext; die Beschreibung nur, wenn das Buch selbst zu wenig Text hergibt."""
+    text_language = detect_language(text_sample)
+    if text_language[0] is None:
+        text_language = detect_language(description)
+    return text_language
+
+
+def detect_epub_language(epub_file_path, description=""):
+    """
+    Textsprache eines EPUB nachträglich bestimmen: für Bücher, bei denen get_epub_metadata die
+    Textprobe ausgelassen hat (detect_text_language=False), die Sprache aber doch gebraucht wird.
+    """
+    text_sample = ""
+    try:
+        with zipfile.ZipFile(sanitize_path(epub_file_path)) as zf:
+            package = read_opf_metadata(zf)
+            if package:
+                text_sample = read_text_sample(zf, package['documents'])
+    except (OSError, zipfile.BadZipFile, KeyError, ET.ParseError):
+        pass
+    return _text_language(text_sample, description)
+
+
+def _read_cover(zf, internal_cover_path):
+    """Bilddaten des Covers aus dem ZipFile oder None."""
+    if not internal_cover_path:
+        return None
     try:
-        image_data = zf.read(internal_cover_path)
-        _, ext = os.path.splitext(internal_cover_path)
-        if not ext:
-            ext = '.jpg'
+        return zf.read(internal_cover_path)
+    except KeyError:
+        return None
 
-        # Temporäre Datei erstellen und Daten speichern
-        with tempfile.NamedTemporaryFile(suffix=ext, delete=False, mode='wb') as temp_file:
-            temp_file.write(image_data)
-            return temp_file.name
 
+def _extract_and_save_cover(zf, internal_cover_path, epub_file_path):
+    """
+    Legt das Cover im Cover-Cache ab (Thumbnail, Name = Inhalts-Hash) und gibt dessen Pfad zurück.
+    Gelesen wird nur, wenn diese Version der Datei noch nicht im Cache steht. None bei Fehler.
+    """
+    try:
+        return get_cover_cache().cover_for(epub_file_path, lambda: _read_cover(zf, internal_cover_path))
     except Exception as e:
         # tqdm.write(f"FEHLER beim Extrahieren des Covers {internal_cover_path}: {e}")
         return None
 
 
+def read_cover_bytes(epub_file_path):
+    """Original-Coverbild eines EPUBs (laut OPF-Manifest) oder None – z.B. für den Browser."""
+    try:
+        with zipfile.ZipFile(epub_file_path, 'r') as zf:
+            package = read_opf_metadata(zf)
+            return _read_cover(zf, package['cover']) if package else None
+    except (OSError, KeyError, ET.ParseError, zipfile.BadZipFile):
+        return None
+
+
 def _normalize_author_name(raw_name):
     """
     Normalisiert einen Autorennamen in das Tupel (Vorname, Nachname),
@@ -186,114 +369,112 @@ def _split_title_series(full_title):
 
 
 # --- Die Hauptfunktion für deinen Scan ---
-def get_epub_metadata(epub_file_path) -> Dict[str, Any]:
+def get_epub_metadata(epub_file_path, detect_text_language=True) -> Dict[str, Any]:
     """
     Extrahiert alle priorisierten Metadaten aus einem EPUB und gibt sie
     in einem Dictionary gemäß dem finalen Schema der BookData-Klasse zurück.
+    detect_text_language=False spart Textprobe und Spracherkennung ('_text_language' ist dann None),
+    z.B. wenn ein Sprach-Ordner die Sprache ohnehin festlegt.
     """
     try:
         # Pfad sofort normalisieren (Umlaute/Slashes)
         epub_file_path = sanitize_path(epub_file_path)
 
-        # --- A. MAGIC BYTES CHECK (Vorab-Check) ---
+        # Die Datei wird genau einmal geöffnet: Magic Bytes, Central Directory, container.xml, OPF
         with open(epub_file_path, 'rb') as f:
-            header = f.read(4)
-
-        if header == b'%PDF':
-            new_path = epub_file_path.rsplit('.', 1)[0] + '.pdf'
-            os.rename(epub_file_path, new_path)
-            return {'_RESCUED_PATH': new_path}
-
-        # --- B. REGULÄRES EPUB PARSING ---
-        if not zipfile.is_zipfile(epub_file_path):
-            return {}
-
-        with zipfile.ZipFile(epub_file_path, 'r') as zf:
-            opf_root, opf_path = _get_opf_root(zf, epub_file_path)
-            if opf_root is None:
-                tqdm.write(f"WARNUNG: Konnte Metadaten aus {epub_file_path} nicht lesen.")
-                return {}
-
-            # --- Metadaten-Rohdaten einlesen ---
-            raw_title = _get_dc_element(opf_root, 'title')
-            raw_description = _get_dc_element(opf_root, 'description')
-            book_description = clean_description(raw_description) if raw_description else ""
-            raw_authors = _get_all_dc_elements(opf_root, 'creator')
-            keywords_epub = _get_all_dc_elements(opf_root, 'subject')
-            raw_identifier = _get_dc_element(opf_root, 'identifier')
-            raw_language = _get_dc_element(opf_root, 'language')
-
-            # --- Cover-Pfad finden und BILD EXTRAHIEREN ---
-            internal_cover_path = _get_cover_image_relative_path(opf_root, opf_path)
-            image_path = _extract_and_save_cover(zf, internal_cover_path)
-
-            # --- 1. Autoren-Normalisierung ---
-            normalized_authors = []
-            for raw_author_string in raw_authors:
-                author_parts = re.split(r'[;]', raw_author_string)
-                for part in author_parts:
-                    normalized_tuple = _normalize_author_name(part.strip())
-                    if normalized_tuple:
-                        normalized_authors.append(normalized_tuple)
-
-            # --- 2. Titel-Zerlegung (Serie, Nummer, Titel) ---
+            # --- A. MAGIC BYTES CHECK (Vorab-Check) ---
+            is_pdf = f.read(4) == b'%PDF'
+            if not is_pdf:
+                # --- B. REGULÄRES EPUB PARSING (BadZipFile statt vorherigem is_zipfile) ---
+                f.seek(0)
+                with zipfile.ZipFile(f) as zf:
+                    try:
+                        package = read_opf_metadata(zf)
+                    except (KeyError, ET.ParseError):
+                        package = None
+                    if package is None:
+                        tqdm.write(f"WARNUNG: Konnte Metadaten aus {epub_file_path} nicht lesen.")
+                        return {}
+                    # --- Cover: entpackt wird nur, wenn diese Dateiversion noch nicht im Cover-Cache ist ---
+                    with stage('epub.cover', epub_file_path):
+                        image_path = _extract_and_save_cover(zf, package['cover'], epub_file_path)
+                    text_sample = None
+                    if detect_text_language:
+                        with stage('epub.text', epub_file_path):
+                            text_sample = read_text_sample(zf, package['documents'])
+
+        if is_pdf:
+            # Umbenannt wird im Hauptprozess (prepare_book): hier laufen ggf. Worker-Prozesse
+            return {'_IS_PDF': True}
+
+        # --- Metadaten-Rohdaten einlesen ---
+        raw_title = _dc_first(package, 'title')
+        raw_description = _dc_first(package, 'description')
+        book_description = clean_description(raw_description) if raw_description else ""
+        raw_authors = _dc_all(package, 'creator')
+        keywords_epub = _dc_all(package, 'subject')
+        raw_language = _dc_first(package, 'language')
+
+        # --- 1. Autoren-Normalisierung ---
+        normalized_authors = []
+        for raw_author_string in raw_authors:
+            author_parts = re.split(r'[;]', raw_author_string)
+            for part in author_parts:
+                normalized_tuple = _normalize_author_name(part.strip())
+                if normalized_tuple:
+                    normalized_authors.append(normalized_tuple)
+
+        # --- 2. Serie: gepflegte Angaben (Calibre/EPUB3) vor der Titel-Zerlegung ---
+        series_name, series_number, series_source = _series_from_package(package)
+        if series_source:
+            title = raw_title
+        else:
             title, series_name, series_number = _split_title_series(raw_title)
-            # ISBN-Extraktion
-            isbn = raw_identifier.split(':')[-1] if raw_identifier and ':' in raw_identifier else raw_identifier
-            isbn = re.sub(r'[^\dX]', '', str(isbn))  # Nur Zahlen und X behalten
-
-            # --- 3. Erstellung des BookData-Objekts (Wurzel-Korrektur) ---
-            # Wenn BookData verfügbar ist, geben wir ein Objekt zurück, sonst ein sauberes Dict
-
-            # Extraktion und Validierung des Jahres
-            raw_date = _get_dc_element(opf_root, 'date')
-            clean_year = None
-            if raw_date:
-                # Extrahiere die ersten 4 Ziffern (Jahr)
-                match = re.search(r'\d{4}', raw_date)
-                if match:
-                    extracted_year = match.group(0)
-                    # "0101" ist der typische Platzhalter für "unbekannt"
-                    if extracted_year != "0101":
-                        clean_year = extracted_year
-            data_content = {
-                'path': epub_file_path,  # Geändert von file_path auf path
-                'title': title or "Unbekannter Titel",
-                'authors': normalized_authors,
-                'isbn': isbn,
-                'year': clean_year,
-                'language': raw_language,
-                'series_name': series_name,
-                'series_number': series_number,
-                'description': book_description,
-                'keywords': keywords_epub,
-                'image_path': image_path,  # Mapping auf Attributname in BookData
-                'is_read': 0
-            }
-            # --- FINAL: Dictionary MAPPING AUF BOOKMETADATA-SCHLÜSSEL ---
-            return data_content
+        isbn = _isbn_from_package(package)
+
+        # --- 3. Erstellung des BookData-Objekts (Wurzel-Korrektur) ---
+        # Wenn BookData verfügbar ist, geben wir ein Objekt zurück, sonst ein sauberes Dict
+
+        # Extraktion und Validierung des Jahres
+        raw_date = _dc_first(package, 'date')
+        clean_year = None
+        if raw_date:
+            # Extrahiere die ersten 4 Ziffern (Jahr)
+            match = re.search(r'\d{4}', raw_date)
+            if match:
+                extracted_year = match.group(0)
+                # "0101" ist der typische Platzhalter für "unbekannt"
+                if extracted_year != "0101":
+                    clean_year = extracted_year
+        # Sprache aus dem Text (Beschreibung nur, wenn das Buch selbst zu wenig Text hergibt)
+        text_language = None
+        if detect_text_language:
+            with stage('epub.language', epub_file_path):
+                text_language = _text_language(text_sample, book_description)
+
+        data_content = {
+            'path': epub_file_path,  # Geändert von file_path auf path
+            'title': title or "Unbekannter Titel",
+            'authors': normalized_authors,
+            'isbn': isbn,
+            'year': clean_year,
+            'language': raw_language,
+            'series_name': series_name,
+            'series_number': series_number,
+            'series_source': series_source or "",
+            'stars': _stars_from_package(package),
+            'description': book_description,
+            'keywords': keywords_epub,
+            'image_path': image_path,  # Mapping auf Attributname in BookData
+            'is_read': 0,
+            '_text_language': text_language,  # (sprache, konfidenz) für resolve_language, kein BookData-Feld
+        }
+        # --- FINAL: Dictionary MAPPING AUF BOOKMETADATA-SCHLÜSSEL ---
+        return data_content
 
     except zipfile.BadZipFile:
-        # 1. Prüfen, ob es wirklich ein PDF ist (Magic Bytes Check)
-        try:
-            with open(epub_file_path, 'rb') as f:
-                header = f.read(4)
-
-            if header == b'%PDF':
-                new_path = epub_file_path.rsplit('.', 1)[0] + '.pdf'
-                tqdm.write(f"✅ Rescue: PDF-Header erkannt. Benenne um zu: {os.path.basename(new_path)}")
-
-                # Datei physisch umbenennen
-                os.rename(epub_file_path, new_path)
-
-                # Spezial-Rückgabe für den Haupt-Scanner
-                return {'_RESCUED_AS_PDF': new_path}
-            else:
-                tqdm.write(f"❌ Rescue fehlgeschlagen: Datei ist auch kein PDF.")
-                return {}
-        except Exception as e:
-            tqdm.write(f"❌ Kritischer Fehler beim Rescue-Versuch: {e}")
-            return {}
+        # Weder PDF (Header oben schon geprüft) noch gültiges ZIP
+        return {}
 
     except Exception as e:
         tqdm.write(f"Kritischer Fehler in get_epub_metadata: {e}")
@@ -344,17 +525,12 @@ def fast_fix_extensions(root_dir):
     repariert = 0
     fehler = 0
 
-    # Wir sammeln erst alle EPUBs, um den Fortschrittsbalken zu füttern
-    print("Sammle Dateiliste...")
-    epub_files = []
-    for root, _, files in os.walk(root_dir):
-        for f in files:
-            if f.lower().endswith('.epub'):
-                epub_files.append(os.path.join(root, f))
-
-    print(f"Prüfe {len(epub_files)} EPUB-Dateien auf PDF-Inhalt...")
+    # Geprüft wird, sobald die Suche eine Datei liefert; die Gesamtzahl ist nur geschätzt (Bücher in der DB)
+    print(f"Prüfe EPUB-Dateien unter {root_dir} auf PDF-Inhalt...")
+    estimate = BookData.count_in_folder(sanitize_path(root_dir)) if BookData else None
 
-    for path in tqdm(epub_files, desc="Analyse"):
+    for entry in progress(iter_files(root_dir, ('.epub',)), estimate, desc="Analyse"):
+        path = entry.path
         try:
             # 1. Schneller Header-Check (Magic Bytes)
             with open(path, 'rb') as f:
@@ -382,24 +558,96 @@ def fast_fix_extensions(root_dir):
 
 import subprocess
 def convert_mobi_to_epub(root_path):
-    for root, dirs, files in os.walk(root_path):
-        for file in files:
-            if file.lower().endswith(".mobi"):
-                mobi_path = os.path.join(root, file)
-                epub_path = mobi_path.rsplit(".", 1)[0] + ".epub"
-
-                if not os.path.exists(epub_path):
-                    print(f"Konvertiere: {file}...")
-                    # Calibre ebook-convert nutzen
-                    try:
-                        subprocess.run(['ebook-convert', mobi_path, epub_path], check=True)
-                        print(f"✅ Erfolg: {epub_path}")
-                    except Exception as e:
-                        print(f"❌ Fehler bei {file}: {e}")
+    for entry in iter_files(root_path, ('.mobi',)):
+        file = entry.name
+        mobi_path = entry.path
+        epub_path = mobi_path.rsplit(".", 1)[0] + ".epub"
+
+        if not os.path.exists(epub_path):
+            print(f"Konvertiere: {file}...")
+            # Calibre ebook-convert nutzen
+            try:
+                subprocess.run(['ebook-convert', mobi_path, epub_path], check=True)
+                print(f"✅ Erfolg: {epub_path}")
+            except Exception as e:
+                print(f"❌ Fehler bei {file}: {e}")
 
 # Aufruf: convert_mobi_to_epub("D:/Bücher")
 
 
-# --- Beispiel-Aufruf (zum Testen) ---
-# if __name__ == '__main__':
-#     # ... (deine Apps-Logik)
\ No newline at end of file
+# ----------------------------------------------------------------------
+# BENCHMARK: schlanker Leser vs. bisheriger Weg
+# ----------------------------------------------------------------------
+def _etree_baseline(epub_file_path):
+    """Der bisherige Weg zum Vergleich: 3x öffnen (Magic Bytes, is_zipfile, ZipFile), ganzer OPF-Baum, .find('.//...')."""
+    with open(epub_file_path, 'rb') as f:
+        f.read(4)
+    if not zipfile.is_zipfile(epub_file_path):
+        return None
+    with zipfile.ZipFile(epub_file_path, 'r') as zf:
+        try:
+            container = ET.fromstring(zf.read('META-INF/container.xml'))
+            rootfile = container.find('.//ocf:rootfile', NS_OCF)
+            if rootfile is None or not rootfile.get('full-path'):
+                return None
+            opf_path = rootfile.get('full-path')
+            opf_root = ET.fromstring(zf.read(opf_path))
+        except (KeyError, ET.ParseError):
+            return None  # kaputtes EPUB: wie get_epub_metadata überspringen
+        first = {}
+        for tag in ('title', 'description', 'identifier', 'language', 'date'):
+            element = opf_root.find(f".//dc:{tag}", NS_DC)
+            first[tag] = element.text.strip() if element is not None and element.text else None
+        creators = [el.text.strip() for el in opf_root.findall(".//dc:creator", NS_DC) if el.text]
+        subjects = [el.text.strip() for el in opf_root.findall(".//dc:subject", NS_DC) if el.text]
+        cover = None
+        cover_meta = opf_root.find(".//opf:metadata/opf:meta[@name='cover']", NS_OPF)
+        if cover_meta is not None:
+            item = opf_root.find(f".//opf:manifest/opf:item[@id='{cover_meta.get('content')}']", NS_OPF)
+            if item is not None:
+                cover = os.path.join(os.path.dirname(opf_path), item.get('href')).replace('\\', '/')
+    return first, creators, subjects, cover
+
+
+def _lean_reader(epub_file_path):
+    """Der neue Weg: einmal öffnen, OPF per Pull-Parser bis zum Manifest."""
+    try:
+        with open(epub_file_path, 'rb') as f:
+            f.read(4)
+            f.seek(0)
+            with zipfile.ZipFile(f) as zf:
+                package = read_opf_metadata(zf)
+    except (zipfile.BadZipFile, KeyError, ET.ParseError):
+        return None  # wie _etree_baseline: kein ZIP bzw. kaputtes EPUB
+    if package is None:
+        return None  # keine OPF
+    first = {tag: _dc_first(package, tag) for tag in ('title', 'description', 'identifier', 'language', 'date')}
+    return first, _dc_all(package, 'creator'), _dc_all(package, 'subject'), package['cover']
+
+
+def benchmark_epub_reader(folder, repeat=3):
+    """Misst beide Wege über alle EPUBs unter folder (bester von repeat Läufen) und vergleicht die Ergebnisse."""
+    import time
+    files = [entry.path for entry in iter_files(folder, ('.epub',))]
+    if not files:
+        print(f"Keine EPUBs unter {folder}")
+        return
+    results = {}
+    print(f"--- EPUB-Metadaten: {len(files)} Dateien, bester von {repeat} Läufen ---")
+    for name, reader in (("bisher (ElementTree)", _etree_baseline), ("read_opf_metadata", _lean_reader)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = [reader(path) for path in files]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:<22} {best:>7.3f}s  {best / len(files) * 1000:>6.2f} ms/Datei")
+    old, new = results.values()
+    # Abweichungen nur, wo der neue Leser zusätzlich das EPUB3-Cover (properties="cover-image") findet
+    differences = sum(1 for a, b in zip(old, new) if a != b and not (a and a[3] is None and a[:3] == b[:3]))
+    print(f"Abweichende Ergebnisse: {differences}")
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_epub_reader(sys.argv[1] if len(sys.argv) > 1 else "D:/Bücher")
\ No newline at end of file
@@ -14,8 +14,11 @@ BESCHREIBUNG: Kümmert sich um das Auslesen der Daten aus dem Pfadnamen und File
 import re
 import os
 import unicodedata
+from functools import lru_cache
 
 from Gemini.file_utils import EM_DASH, sanitize_path, normalize_author_tuple
+from Gemini.discovery import iter_files
+from Gemini.lang_detect import MIN_CONFIDENCE
 CURRENT_SCANNER_VERSION = "1.3.1"  # Dein neuer Versionsstempel
 
 # ----------------------------------------------------------------------
@@ -24,61 +27,69 @@ CURRENT_SCANNER_VERSION = "1.3.1"  # Dein neuer Versionsstempel
 def derive_metadata_from_path(file_path):
     """
     Leitet Sprache, Region, Genre und Keywords aus der neuen Ordnerstruktur ab.
+    Hängt nur vom Ordner ab -> wird pro Ordner einmal berechnet (_derive_metadata_from_dir).
     """
-    clean_p = sanitize_path(file_path)
-    path_parts = clean_p.split('/')
+    return _path_result(_derive_metadata_from_dir(os.path.dirname(file_path)))
+
+
+def _path_result(cached):
+    # Jede Datei bekommt ihr eigenes dict (der Aufrufer darf es verändern)
+    return {**cached, 'keywords': list(cached['keywords'])}
+
+
+@lru_cache(maxsize=4096)
+def _derive_metadata_from_dir(directory):
+    """Die eigentliche Pfad-Analyse für einen Ordner; das Ergebnis ist gemeinsam genutzt und nicht zu verändern."""
+    dir_parts = sanitize_path(directory).split('/')
     region = None
     manual_genre = None
     keywords = []
 
-    # 1. Sprache erkennen (Deutsch oder Englisch)
-    language = get_final_language(file_path)
+    def parts_after(anchor):
+        # Ordner unterhalb des Ankers (der Dateiname gehört nicht dazu)
+        return dir_parts[dir_parts.index(anchor) + 1:]
+
+    # 1. Sprache erkennen (aus dem Ordner, nicht aus dem Titel); ohne Sprach-Ordner entscheidet resolve_language
+    language = language_from_path(directory + '/')
 
     # 2. Themen-Pfad für Business-Bücher (als Keywords)
     # Falls der Pfad über "Business" läuft, extrahieren wir die Hierarchie
-    if 'Business' in path_parts:
-        idx = path_parts.index('Business')
-        # Alles nach 'Business' bis vor den Dateinamen
-        topic_parts = path_parts[idx + 1:-1]
+    if 'Business' in dir_parts:
+        topic_parts = parts_after('Business')
         if topic_parts:
             keywords.append(os.sep.join(topic_parts))
         manual_genre = "Sachbuch"
 
-    # 3. Spezial-Ordner auswerten (Genre, Region, Sprache, Easy Reader)
-    for i, part in enumerate(path_parts):
-        if 'Reisen' in path_parts:
-            idx = path_parts.index('Reisen')
-            manual_genre = 'Reisebericht'
-            region_parts = path_parts[idx + 1: -1]  # Alles danach bis zum File
-            if region_parts:
-                region = " / ".join(region_parts)
-                keywords.extend(region_parts)
-        elif '_byGenre' in path_parts:
-            idx = path_parts.index('_byGenre')
-            manual_genre = path_parts[idx + 1] if idx + 1 < len(path_parts) else None
-            if manual_genre: keywords.append(manual_genre)
-        elif '_bytRegion' in path_parts:
-            idx = path_parts.index('_bytRegion')
-            region = path_parts[idx + 1] if idx + 1 < len(path_parts) else None
-            if region: keywords.append(region)
-        elif '_Sprache' in path_parts:
-            manual_genre = 'Sprachbuch'
-            keywords.append('Sprache lernen')
-        # Easy Reader (z.B. A1 - 500 Wörter)
-        elif '_Easy Reader' in path_parts:
-            manual_genre = 'Easy Reader'
-            if i + 1 < len(path_parts):
-                # Das Niveau (A1 etc.) als Keyword speichern
-                keywords.append(f"Niveau: {path_parts[i + 1]}")
-        # BUSINESS (Der allgemeine Auffang-Topf für Sachbücher)
-        elif 'Business' in path_parts:
-            manual_genre = "Sachbuch"
-            idx = path_parts.index('Business')
-            # Da Reisen oben schon abgefangen wurde, sind das hier nur Themen
-            topic_parts = path_parts[idx + 1: -1]
-            if topic_parts:
-                keywords.extend(topic_parts)
-    # Rückgabe als Dictionary für BookData.from_dict
+    # 3. Spezial-Ordner auswerten (Genre, Region, Sprache, Easy Reader) – der erste Treffer gilt
+    if 'Reisen' in dir_parts:
+        manual_genre = 'Reisebericht'
+        region_parts = parts_after('Reisen')
+        if region_parts:
+            region = " / ".join(region_parts)
+            keywords.extend(region_parts)
+    elif '_byGenre' in dir_parts:
+        following = parts_after('_byGenre')
+        manual_genre = following[0] if following else None
+        if manual_genre: keywords.append(manual_genre)
+    elif '_bytRegion' in dir_parts:
+        following = parts_after('_bytRegion')
+        region = following[0] if following else None
+        if region: keywords.append(region)
+    elif '_Sprache' in dir_parts:
+        manual_genre = 'Sprachbuch'
+        keywords.append('Sprache lernen')
+    # Easy Reader (z.B. A1 - 500 Wörter)
+    elif '_Easy Reader' in dir_parts:
+        manual_genre = 'Easy Reader'
+        following = parts_after('_Easy Reader')
+        if following:
+            # Das Niveau (A1 etc.) als Keyword speichern
+            keywords.append(f"Niveau: {following[0]}")
+    # BUSINESS (Der allgemeine Auffang-Topf für Sachbücher)
+    elif 'Business' in dir_parts:
+        # Da Reisen oben schon abgefangen wurde, sind das hier nur Themen
+        keywords.extend(parts_after('Business'))
+
     final_region = region
     if region and " / " in region:
         # Falls durch einen Fehler 'Frankreich / Frankreich' entstanden wäre:
@@ -88,20 +99,26 @@ def derive_metadata_from_path(file_path):
         'language': language,
         'region': final_region,
         'genre': manual_genre,
-        'keywords': list(set(keywords))
+        'keywords': tuple(dict.fromkeys(keywords))
     }
 
 # ----------------------------------------------------------------------
 # Analysiere den Filename IN SCHRITTEN
 # ----------------------------------------------------------------------
+FILENAME_SEPARATORS = (EM_DASH, " – ", " - ")
+_AUTHOR_SPLIT = re.compile(r'[&;]| et ')
+_YEAR = re.compile(r'\((\d{4})\)')
+_BRACKET_SERIES = re.compile(r'\[(.*?)[-\s](\d+)\]')           # [Serie-1]
+_DASH_SERIES = re.compile(r'^(.+?)[-\s](\d{1,3})[-\s]+(.*)$')   # Serie-01-Titel oder Serie 01-Titel
+_TITLE_TRIM = re.compile(r'^[\s\-\–\—]+|[\s\-\–\—]+$')
+
+
 def extract_info_from_filename(file_path):
     filename = os.path.basename(file_path)
     # Startpunkt: Der komplette Name ohne Endung
     remaining, extension = os.path.splitext(filename)
     remaining = remaining.strip()
 
-    # print(f"\nDEBUG SCAN START: '{remaining}'")
-
     info = {
         'authors': [],
         'series_name': None,
@@ -113,56 +130,116 @@ def extract_info_from_filename(file_path):
     }
 
     # A. Autoren isolieren & entfernen
-    separators = [EM_DASH, " – ", " - "]
-    for sep in separators:
+    for sep in FILENAME_SEPARATORS:
         if sep in remaining:
-            parts = remaining.split(sep, 1)
-            authors_raw = parts[0].strip()
-            remaining = parts[1].strip()  # Hier wird der String gekürzt!
+            authors_raw, remaining = remaining.split(sep, 1)
+            authors_raw = authors_raw.strip()
+            remaining = remaining.strip()  # Hier wird der String gekürzt!
 
             if authors_raw:
-                for a in re.split(r'[&;]| et ', authors_raw):
+                for a in _AUTHOR_SPLIT.split(authors_raw):
                     info['authors'].append(_normalize_author_name(a.strip()))
-            # print(f"DEBUG nach Autor:  '{remaining}'")
             break
 
     # B. Jahr isolieren & entfernen
-    year_match = re.search(r'\((\d{4})\)', remaining)
+    year_match = _YEAR.search(remaining)
     if year_match:
         info['year'] = year_match.group(1)
         if info['year'] == "0101":
             info['year'] = None
         remaining = remaining.replace(year_match.group(0), "").strip()
-        # print(f"DEBUG nach Jahr:   '{remaining}'")
 
     # C. Serie isolieren & entfernen
-    # Suche [Serie-1]
-    bracket_match = re.search(r'\[(.*?)[-\s](\d+)\]', remaining)
-
-    # NEU: Suche Serie-01-Titel oder Serie 01-Titel
-    # Erkennt: "Maison de la nuit-01-Marquee" -> Serie: Maison de la nuit, Nr: 01, Rest: Marquee
-    dash_series_match = re.search(r'^(.+?)[-\s](\d{1,3})[-\s]+(.*)$', remaining)
-
+    bracket_match = _BRACKET_SERIES.search(remaining)
     if bracket_match:
         info['series_name'] = bracket_match.group(1).strip()
         info['series_number'] = bracket_match.group(2).strip()
         remaining = remaining.replace(bracket_match.group(0), "").strip()
-        # print(f"DEBUG nach Serie (Klammer): '{remaining}'")
-
-    elif dash_series_match:
-        info['series_name'] = dash_series_match.group(1).strip()
-        info['series_number'] = dash_series_match.group(2).strip()
-        # Der rest_string wird hier direkt auf den Titel-Teil (Gruppe 3) gesetzt
-        remaining = dash_series_match.group(3).strip()
-        # print(f"DEBUG nach Serie (Bindestrich): '{remaining}'")
+    else:
+        # Erkennt: "Maison de la nuit-01-Marquee" -> Serie: Maison de la nuit, Nr: 01, Rest: Marquee
+        dash_series_match = _DASH_SERIES.search(remaining)
+        if dash_series_match:
+            info['series_name'] = dash_series_match.group(1).strip()
+            info['series_number'] = dash_series_match.group(2).strip()
+            # Der rest_string wird hier direkt auf den Titel-Teil (Gruppe 3) gesetzt
+            remaining = dash_series_match.group(3).strip()
 
     # D. Der Rest ist der Titel
     # Wir säubern noch führende/hängende Bindestriche
-    info['title'] = re.sub(r'^[\s\-\–\—]+|[\s\-\–\—]+$', '', remaining).strip()
-    # print(f"DEBUG FINAL TITLE: '{info['title']}'")
+    info['title'] = _TITLE_TRIM.sub('', remaining).strip()
 
     return info
 
+# ----------------------------------------------------------------------
+# Massen-Analyse (viele Pfade auf einmal)
+# ----------------------------------------------------------------------
+def parse_paths(paths):
+    """
+    Dateiname + Pfad für viele Dateien: [{'file_info': ..., 'path_info': ...}] in der Reihenfolge von paths.
+    Die Pfade werden nach Ordner gruppiert, die Pfad-Analyse läuft pro Ordner nur einmal.
+    """
+    by_dir = {}
+    for index, path in enumerate(paths):
+        by_dir.setdefault(os.path.dirname(path), []).append(index)
+
+    results = [None] * len(paths)
+    for directory, indices in by_dir.items():
+        path_info = _derive_metadata_from_dir(directory)
+        for index in indices:
+            results[index] = {
+                'file_info': extract_info_from_filename(paths[index]),
+                'path_info': _path_result(path_info),
+            }
+    return results
+
+def _synthetic_paths(n, files_per_dir=20):
+    """Künstliche Bibliothek für den Benchmark (nur Pfade, keine Dateien)."""
+    trees = ["D:/Bücher/Deutsch/{a}", "D:/Bücher/English/{a}/Serie {d}", "D:/Bücher/Business/IT-Bücher/Python/{a}",
+             "D:/Bücher/Reisen/Frankreich/Paris/{a}", "D:/Bücher/_byGenre/Krimi/{a}",
+             "D:/Bücher/_Easy Reader/A1 - 500 Wörter/{a}", "D:/Bücher/Franz/{a}/Romane {d}"]
+    names = ["Hans Autor{i} — Titel Nummer {i} (2005).epub",
+             "Anna Muster{i} & Paul Beispiel — Die Serie-{k:02d}-Der Titel {i}.pdf",
+             "Nachname{i}, Vorname — [Zyklus-{k}] Ein langer Titel {i} (1999).epub",
+             "Jean Écrivain{i} - Maison de la nuit 0{k}-Marquée {i}.mobi"]
+    paths = []
+    for i in range(n):
+        d = i // files_per_dir
+        directory = trees[d % len(trees)].format(a=f"Autor {d}", d=d)
+        paths.append(f"{directory}/{names[i % len(names)].format(i=i, k=i % 30 + 1)}")
+    return paths
+
+
+def benchmark_path_parser(n=100_000, files_per_dir=20):
+    """
+    Durchsatz Einzel-Aufrufe (ohne Ordner-Cache) vs. parse_paths auf n künstlichen Pfaden.
+    Die Pfad-Analyse wird zusätzlich allein gemessen: einmal pro Datei, einmal pro Ordner.
+    """
+    import time
+    paths = _synthetic_paths(n, files_per_dir)
+    directories = list(dict.fromkeys(os.path.dirname(path) for path in paths))
+    print(f"--- Pfad-/Dateinamen-Analyse: {n} Pfade, {files_per_dir} pro Ordner ---")
+
+    def timed(label, run):
+        start = time.perf_counter()
+        # Ergebnisse bis nach der Messung behalten (sonst misst man den Garbage Collector mit)
+        results = run()
+        elapsed = time.perf_counter() - start
+        del results
+        print(f"{label:<28} {elapsed:>7.2f}s  {n / elapsed:>10,.0f} Pfade/s")
+
+    timed('nur Dateinamen', lambda: [extract_info_from_filename(path) for path in paths])
+    timed('nur Pfad, pro Datei',
+          lambda: [_derive_metadata_from_dir.__wrapped__(os.path.dirname(path)) for path in paths])
+    timed(f'nur Pfad, pro Ordner ({len(directories)})',
+          lambda: [_derive_metadata_from_dir.__wrapped__(directory) for directory in directories])
+    timed('einzeln, Pfad pro Datei',
+          lambda: [{'file_info': extract_info_from_filename(path),
+                    'path_info': _path_result(_derive_metadata_from_dir.__wrapped__(os.path.dirname(path)))}
+                   for path in paths])
+
+    _derive_metadata_from_dir.cache_clear()
+    timed('parse_paths (pro Ordner)', lambda: parse_paths(paths))
+
 # ----------------------------------------------------------------------
 # Hilfsfunktionen
 # ----------------------------------------------------------------------
@@ -173,38 +250,47 @@ def clean_file_names(root_directory):
     long_dash_with_spaces = " – "  # Das ist der längere En-Dash (–)
     i = 0
 
-    for root, dirs, files in os.walk(root_directory):
-        for filename in files:
-            new_filename = None
-            # 1. Priorität: Suche nach " - "
-            if short_dash_with_spaces in filename:
-                new_filename = filename.replace(short_dash_with_spaces, long_dash_with_spaces, 1)
-            # 2. Priorität: Falls " - " nicht da, suche nach " -"
-            elif short_dash_suffix in filename:
-                new_filename = filename.replace(short_dash_suffix, long_dash_with_spaces, 1)
-            if new_filename:
-                old_path = os.path.join(root, filename)
-                new_path = os.path.join(root, new_filename)
-                i = i + 1
-                try:
-                    os.rename(old_path, new_path)
-                    # print(f"Umbernannt: {filename} -> {new_filename}")
-                except OSError as e:
-                    print(f"Fehler beim Umbenennen von {filename}: {e}")
+    # Alle Dateien (extensions=None); umbenannt wird, während die Suche weiterläuft
+    for entry in iter_files(root_directory, extensions=None):
+        filename = entry.name
+        new_filename = None
+        # 1. Priorität: Suche nach " - "
+        if short_dash_with_spaces in filename:
+            new_filename = filename.replace(short_dash_with_spaces, long_dash_with_spaces, 1)
+        # 2. Priorität: Falls " - " nicht da, suche nach " -"
+        elif short_dash_suffix in filename:
+            new_filename = filename.replace(short_dash_suffix, long_dash_with_spaces, 1)
+        if new_filename:
+            old_path = entry.path
+            new_path = os.path.join(os.path.dirname(old_path), new_filename)
+            i = i + 1
+            try:
+                os.rename(old_path, new_path)
+                # print(f"Umbernannt: {filename} -> {new_filename}")
+            except OSError as e:
+                print(f"Fehler beim Umbenennen von {filename}: {e}")
     return i
 
 # ----------------------------------------------------------------------
 # Language
 # ----------------------------------------------------------------------
-def get_final_language(file_path, api_lang=None):
-    """Erzwingt deine Sprachregeln."""
+def language_from_path(file_path):
+    """Sprache laut Ordnername (Deutsch, English, ...) oder None."""
     path_lower = file_path.lower()
-    # 1. Priorität: Der Ordnername
     if "deutsch" in path_lower: return "de"
     if "english" in path_lower: return "en"
     if "french" in path_lower or "franz" in path_lower: return "fr"
     if "italien" in path_lower: return "it"
     if "spanisch" in path_lower: return "es"
+    return None
+
+
+def get_final_language(file_path, api_lang=None):
+    """Erzwingt deine Sprachregeln."""
+    # 1. Priorität: Der Ordnername
+    path_language = language_from_path(file_path)
+    if path_language:
+        return path_language
 
     # 2. Priorität: API/EPUB Mapping (nur die erlaubten)
     allowed = {'de', 'en', 'fr', 'it', 'es'}
@@ -214,6 +300,19 @@ def get_final_language(file_path, api_lang=None):
             return clean_api
     return "de"  # Fallback
 
+
+def resolve_language(file_path, epub_raw=None):
+    """
+    Sprache eines Buchs: Sprach-Ordner > erkannte Textsprache (Gemini.lang_detect, ab MIN_CONFIDENCE)
+    > dc:language > 'de'. dc:language steht hinten, weil es in vielen EPUBs schlicht falsch ist.
+    """
+    directory = os.path.dirname(file_path) + '/'
+    epub_raw = epub_raw or {}
+    detected, confidence = epub_raw.get('_text_language') or (None, 0.0)
+    if detected and confidence >= MIN_CONFIDENCE and not language_from_path(directory):
+        return detected
+    return get_final_language(directory, epub_raw.get('language'))
+
 # ----------------------------------------------------------------------
 # Normalise Auther
 # ----------------------------------------------------------------------
@@ -312,6 +411,8 @@ if __name__ == '__main__':
     path3 = 'D:/Books/Autor/Titel ohne alles.epub'
     print(f"File 3: {extract_info_from_filename(path3)}")
 
+    benchmark_path_parser()
+
     # Pfad hier anpassen (z.B. "C:/MeinOrdner" oder ein relativer Pfad ".")
     target_path = r"D:\Bücher\Brain-Teasers"
     res = clean_file_names(target_path)
@@ -1,28 +1,30 @@
-import fitz  # PyMuPDF
 from PIL import Image
-import io
 
+from Gemini.cover_cache import get_cover_cache, render_first_page
+from Gemini.read_epub import read_cover_bytes
 
-def get_book_cover(file_path):
+
+def _load_cover(file_path):
+    """Bilddaten für den Cover-Cache: beim EPUB das Cover aus dem Manifest, sonst Seite 1 gerendert."""
     if file_path.lower().endswith('.epub'):
-        # Hier bleibt dein bisheriger funktionierender Code für EPUB
-        pass
+        data = read_cover_bytes(file_path)
+        if data:
+            return data
+    try:
+        return render_first_page(file_path)
+    except Exception as e:
+        print(f"Fehler beim PDF-Cover-Extrakt: {e}")
+        return None  # wird als "kein Cover" gemerkt, bis sich die Datei ändert
 
-    elif file_path.lower().endswith('.pdf'):
-        try:
-            # PDF öffnen
-            doc = fitz.open(file_path)
-            # Erste Seite laden
-            page = doc.load_page(0)
-            # Seite als Bild (Pixmap) rendern
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # 0.5 für schnellere Vorschau/kleineres Bild
 
-            # Pixmap in PIL Image umwandeln (damit dein Editor es anzeigen kann)
-            img_data = pix.tobytes("png")
-            return Image.open(io.BytesIO(img_data))
+def get_book_cover_path(file_path, size='view'):
+    """Pfad des Cover-Thumbnails (JPEG) aus dem Cover-Cache; gerendert wird nur einmal pro Dateiversion."""
+    if not file_path.lower().endswith(('.epub', '.pdf', '.mobi')):
+        return None
+    return get_cover_cache().cover_for(file_path, lambda: _load_cover(file_path), size)
 
-        except Exception as e:
-            print(f"Fehler beim PDF-Cover-Extrakt: {e}")
-            return None  # Oder ein Standard-Platzhalterbild
 
-    return None
\ No newline at end of file
+def get_book_cover(file_path, size='view'):
+    """Cover als PIL-Image (damit dein Editor es anzeigen kann) oder None."""
+    path = get_book_cover_path(file_path, size)
+    return Image.open(path) if path else None
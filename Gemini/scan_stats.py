@@ -0,0 +1,133 @@
+"""
+DATEI: scan_stats.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: Zeitmessung pro Scan-Schritt (Dateiname, EPUB, Cover, APIs, Klassifizierung, Umbenennen, DB ...).
+              Pro Schritt: Aufrufe, Summe, Maximum (mit Datei); dazu Zähler und die langsamsten Dateien.
+              Am Ende eine Tabelle auf der Konsole und ein JSON-Report.
+
+              with stage('epub', path): ...        misst einen Schritt
+              with collect() as timings: ...       sammelt stattdessen lokal (für Worker-Prozesse,
+                                                   das Ergebnis reist mit und wird per merge() verbucht)
+              Geschachtelte Schritte heißen 'epub.cover' – ihre Zeit steckt auch in 'epub'.
+"""
+import heapq
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class ScanStats:
+    """Sammelt Zeiten und Zähler eines Laufs (ein Objekt pro Prozess, siehe get_stats)."""
+    SLOWEST = 10  # so viele langsamste Dateien im Report
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.stages = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'max': 0.0, 'max_path': None})
+            self.counters = defaultdict(int)
+            self.file_seconds = defaultdict(float)
+
+    def add(self, name, seconds, path=None):
+        with self._lock:
+            s = self.stages[name]
+            s['count'] += 1
+            s['seconds'] += seconds
+            if seconds > s['max']:
+                s['max'], s['max_path'] = seconds, path
+            # Geschachtelte Schritte nicht doppelt auf die Datei buchen
+            if path and '.' not in name:
+                self.file_seconds[path] += seconds
+
+    def merge(self, timings, path=None):
+        """Zeiten aus collect() (z.B. aus einem Worker-Prozess) verbuchen."""
+        for name, seconds in (timings or {}).items():
+            self.add(name, seconds, path)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def slowest(self, n=None):
+        with self._lock:
+            return heapq.nlargest(n or self.SLOWEST, self.file_seconds.items(), key=lambda item: item[1])
+
+    # ------------------------------------------------------------------
+    # AUSGABE
+    # ------------------------------------------------------------------
+    def as_dict(self, **extra):
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            stages = {name: {**s, 'avg': s['seconds'] / s['count'] if s['count'] else 0.0}
+                      for name, s in sorted(self.stages.items())}
+            counters = dict(self.counters)
+        return {
+            'wall_seconds': wall,
+            'stages': stages,
+            'counters': counters,
+            'slowest_files': [{'path': p, 'seconds': sec} for p, sec in self.slowest()],
+            **extra,
+        }
+
+    def report(self):
+        data = self.as_dict()
+        print(f"--- SCAN-STATISTIK (Laufzeit {data['wall_seconds']:.1f}s) ---")
+        print(f"{'Schritt':<18} | {'Aufrufe':>8} | {'Summe s':>9} | {'Ø ms':>8} | {'Max ms':>8} | langsamste Datei")
+        for name, s in sorted(data['stages'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"{name:<18} | {s['count']:>8} | {s['seconds']:>9.2f} | {s['avg'] * 1000:>8.1f} | "
+                  f"{s['max'] * 1000:>8.1f} | {s['max_path'] or '-'}")
+        print("(APIs laufen nebenläufig: ihre Summe kann größer als die Laufzeit sein)")
+        if data['counters']:
+            print("Zähler: " + ", ".join(f"{k}={v}" for k, v in sorted(data['counters'].items())))
+        for entry in data['slowest_files']:
+            print(f"  {entry['seconds']:>7.2f}s  {entry['path']}")
+
+    def write_json(self, path, **extra):
+        """Maschinenlesbarer Report; extra z.B. api_cache=get_cache().stats."""
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.as_dict(**extra), f, ensure_ascii=False, indent=2, default=str)
+            print(f"✅ Statistik unter {path} gespeichert.")
+        except OSError as e:
+            print(f"❌ Fehler beim Schreiben der Statistik: {e}")
+
+
+_stats = ScanStats()
+_collecting = None  # dict, solange collect() aktiv ist
+
+
+def get_stats() -> ScanStats:
+    return _stats
+
+
+def record(name, seconds, path=None):
+    if _collecting is not None:
+        _collecting[name] = _collecting.get(name, 0.0) + seconds
+    else:
+        _stats.add(name, seconds, path)
+
+
+@contextmanager
+def stage(name, path=None):
+    """Misst die Wanduhr-Zeit des Blocks als Schritt name (auch wenn er mit einer Exception endet)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, path)
+
+
+@contextmanager
+def collect():
+    """Schritte im Block nicht verbuchen, sondern in ein dict {schritt: sekunden} sammeln."""
+    global _collecting
+    previous, _collecting = _collecting, {}
+    try:
+        yield _collecting
+    finally:
+        _collecting = previous
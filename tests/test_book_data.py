@@ -0,0 +1,76 @@
+"""
+DATEI: test_book_data.py
+PROJEKT: MyBook-Management (v1.3.2)
+BESCHREIBUNG: BookData.save_many / save / delete: nach einem gescheiterten Batch dürfen keine erfundenen IDs
+              oder doppelten Autoren übrig bleiben, nach dem Löschen keine verwaisten Zeilen.
+              python -m pytest tests
+"""
+import sqlite3
+
+import pytest
+
+from Apps.book_data import BookData
+from Gemini import create_db
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "books.db")
+    conn = sqlite3.connect(path)
+    create_db.create_db(conn)
+    for col, typ in [("scanner_version", "TEXT"), ("is_manual_description", "INTEGER DEFAULT 0"),
+                     ("rating_ol", "REAL"), ("ratings_count_ol", "INTEGER"), ("regions", "TEXT"),
+                     ("api_source", "TEXT"), ("image_path", "TEXT")]:
+        conn.execute(f"ALTER TABLE books ADD COLUMN {col} {typ}")
+    conn.commit()
+    create_db.migrate_database(conn)
+    conn.close()
+    monkeypatch.setattr(BookData, "db_path", path)
+    return path
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT id, path FROM books ORDER BY id").fetchall()
+
+
+def test_save_many_batch_fails_after_insert(db_path):
+    books = [BookData(path=f"/b/{i}.epub", title=f"T{i}", authors=[("Hans", f"Autor{i}")]) for i in range(3)]
+    books[1].authors = [("kaputt",)]  # scheitert erst bei der Autoren-Verknüpfung, nach dem INSERT
+    failed = []
+
+    saved = BookData.save_many(books, failed=failed)
+
+    assert saved == 2
+    assert failed == [books[1]]
+    assert books[1].id == 0
+    assert _rows(db_path) == sorted((b.id, b.path) for b in (books[0], books[2]))
+
+
+def test_save_update_of_missing_row_fails(db_path):
+    book = BookData(id=42, path="/b/weg.epub", title="Weg")
+    assert book.save() is False
+    assert _rows(db_path) == []
+
+
+def test_save_many_no_duplicate_authors_after_fallback(db_path):
+    books = [BookData(path=f"/b/{i}.epub", title=f"T{i}", authors=[("Hans", "Neu")]) for i in range(4)]
+    books[1].authors = [("kaputt",)]  # erster Batch fällt auf einzelnes save() zurück, das "Neu" anlegt
+
+    assert BookData.save_many(books, batch_size=2) == 3
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM authors WHERE lastname = 'Neu'").fetchone()[0] == 1
+
+
+def test_delete_removes_enrichment_job(db_path):
+    book = BookData(path="/b/job.epub", title="Job", authors=[("Hans", "Autor")])
+    assert BookData.save_many([book]) == 1
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO enrichment_jobs (book_id) VALUES (?)", (book.id,))
+
+    assert book.delete()
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM enrichment_jobs").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM book_authors").fetchone()[0] == 0